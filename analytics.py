@@ -0,0 +1,177 @@
+import csv
+import math
+import numpy as np
+
+RISE_LOW = 0.1
+RISE_HIGH = 0.9
+
+MOVE_FIELDS = [
+    "os", "start (s)", "wartosc poczatkowa", "wartosc zadana", "probki", "blad RMS",
+    "czas narastania (s)", "czas ustalania (s)", "przeregulowanie (%)", "uchyb ustalony",
+]
+
+
+class RunningStats:
+    # Welford; paczki scalane wzorem Chana, więc koszt nie zależy od długości historii
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        n = len(values)
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    @property
+    def variance(self):
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def rms(self):
+        return math.sqrt(self.variance + self.mean ** 2) if self.n else math.nan
+
+
+class AxisResponse:
+    def __init__(self, name, start_time, start_value, target, tolerance):
+        self.name = name
+        self.start_time = start_time
+        self.start_value = start_value
+        self.target = target
+        self.tolerance = tolerance
+        self.step = target - start_value
+        self.error = RunningStats()
+        self.steady = RunningStats()
+        self.t_low = None
+        self.t_high = None
+        self.peak = -math.inf
+        self.last_outside = None
+        self.inside = False
+
+    def update(self, t, values):
+        error = values - self.target
+        self.error.update(error)
+
+        outside = np.flatnonzero(np.abs(error) > self.tolerance)
+        if len(outside):
+            self.last_outside = float(t[outside[-1]])
+            self.steady.reset()
+            self.steady.update(error[outside[-1] + 1:])
+            self.inside = outside[-1] != len(error) - 1
+        else:
+            self.steady.update(error)
+            self.inside = True
+
+        if abs(self.step) <= self.tolerance:
+            return
+        progress = (values - self.start_value) / self.step
+        self.peak = max(self.peak, float(progress.max()))
+        if self.t_low is None:
+            hits = np.flatnonzero(progress >= RISE_LOW)
+            if len(hits):
+                self.t_low = float(t[hits[0]])
+        if self.t_high is None:
+            hits = np.flatnonzero(progress >= RISE_HIGH)
+            if len(hits):
+                self.t_high = float(t[hits[0]])
+
+    def rise_time(self):
+        if self.t_low is None or self.t_high is None:
+            return None
+        return self.t_high - self.t_low
+
+    def settle_time(self):
+        if not self.inside:
+            return None
+        if self.last_outside is None:
+            return 0.0
+        return self.last_outside - self.start_time
+
+    def overshoot(self):
+        if self.peak == -math.inf:
+            return None
+        return max(0.0, (self.peak - 1.0) * 100.0)
+
+    def summary(self):
+        return {
+            "os": self.name,
+            "start (s)": self.start_time,
+            "wartosc poczatkowa": self.start_value,
+            "wartosc zadana": self.target,
+            "probki": self.error.n,
+            "blad RMS": self.error.rms,
+            "czas narastania (s)": self.rise_time(),
+            "czas ustalania (s)": self.settle_time(),
+            "przeregulowanie (%)": self.overshoot(),
+            "uchyb ustalony": self.steady.mean if self.steady.n else None,
+        }
+
+
+def _changed(a, b):
+    return ~((a == b) | (np.isnan(a) & np.isnan(b)))
+
+
+class TrackingAnalytics:
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.moves = []
+        self.current = None
+        self.target = (math.nan, math.nan)
+
+    def clear(self):
+        self.moves = []
+        self.current = None
+        self.target = (math.nan, math.nan)
+
+    def update(self, rows):
+        if not len(rows):
+            return
+        sx = rows['x_setpoint']
+        sy = rows['y_setpoint']
+        starts = np.flatnonzero(_changed(sx[1:], sx[:-1]) | _changed(sy[1:], sy[:-1])) + 1
+        first_changed = _changed(np.array([sx[0], sy[0]]), np.array(self.target)).any()
+        bounds = ([0] if first_changed else []) + starts.tolist()
+        edges = [0] + bounds + [len(rows)]
+        for begin, end in zip(edges, edges[1:]):
+            if begin == end:
+                continue
+            if begin in bounds:
+                self._start_move(rows[begin])
+            if self.current is not None:
+                segment = rows[begin:end]
+                self.current[0].update(segment['t'], segment['x'])
+                self.current[1].update(segment['t'], segment['y'])
+
+    def _start_move(self, row):
+        if self.current is not None:
+            self.moves.extend(axis.summary() for axis in self.current)
+        self.target = (float(row['x_setpoint']), float(row['y_setpoint']))
+        if math.isnan(self.target[0]) or math.isnan(self.target[1]):
+            self.current = None
+            return
+        tol_x, tol_y = self.tolerance()
+        t = float(row['t'])
+        self.current = (
+            AxisResponse("X", t, float(row['x']), self.target[0], tol_x),
+            AxisResponse("Y", t, float(row['y']), self.target[1], tol_y),
+        )
+
+    def all_moves(self):
+        current = [axis.summary() for axis in self.current] if self.current else []
+        return self.moves + current
+
+    def save_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=MOVE_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.all_moves())
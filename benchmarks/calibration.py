@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from calibration import (
+    EncoderCalibration, COUNTS_PER_DEGREE, load_calibration, save_calibration, table_cache_path,
+)
+
+DEFAULT_BATCHES = [20, 1000, 100_000]
+CALIBRATION_POINTS = 401
+
+
+def per_sample(frames, zero, table_m, table_e):
+    # Punkt odniesienia: przeliczanie ramka po ramce w Pythonie, z rozpakowaniem struct każdej ramki
+    out = []
+    for data in (frame.tobytes() for frame in frames):
+        x, y = struct.unpack('ii', data)
+        x = (x - zero) / COUNTS_PER_DEGREE
+        y = (y - zero) / COUNTS_PER_DEGREE
+        out.append((x + float(np.interp(x, table_m, table_e)), y + float(np.interp(y, table_m, table_e))))
+    return out
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Przeliczanie liczników enkodera na stopnie z tablicą poprawek")
+    parser.add_argument("--batches", default=",".join(map(str, DEFAULT_BATCHES)))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="calibration_")
+    result = {}
+    try:
+        measured = np.linspace(-180, 180, CALIBRATION_POINTS)
+        points = {axis: [[float(m), float(m + 0.05 * np.sin(np.radians(m) * 36))] for m in measured]
+                  for axis in ("x", "y")}
+        path = os.path.join(directory, "encoder.json")
+        save_calibration(path, EncoderCalibration(), points)
+        started = time.perf_counter()
+        calibration = load_calibration(path)
+        result["table_build_ms"] = (time.perf_counter() - started) * 1000
+        result["table_cached_ms"] = timed(lambda: load_calibration(path), args.repeat) * 1000
+        result["table_cache_kb"] = os.path.getsize(table_cache_path(path)) / 1024
+        table_m = measured
+        table_e = np.array([reference - m for m, reference in points["x"]])
+
+        uncorrected = calibration.linear()
+        rng = np.random.default_rng(0)
+        for batch in [int(value) for value in args.batches.split(",")]:
+            positions = rng.uniform(-170, 170, (batch, 2))
+            frames = (np.round(positions * COUNTS_PER_DEGREE).astype(np.int64) & 0xFFFFFFFF).astype('<u4')
+            vectorized = timed(lambda: calibration.to_degrees(frames), args.repeat)
+            linear = timed(lambda: uncorrected.to_degrees(frames), args.repeat)
+            result[f"batch_{batch}_us"] = vectorized * 1e6
+            result[f"batch_{batch}_linear_us"] = linear * 1e6
+            result[f"batch_{batch}_mframes_per_s"] = batch / vectorized / 1e6
+            if batch <= 1000:
+                result[f"batch_{batch}_per_sample_us"] = timed(
+                    lambda: per_sample(frames, 0, table_m, table_e), max(1, args.repeat // 4)) * 1e6
+    finally:
+        shutil.rmtree(directory)
+
+    print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                   for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
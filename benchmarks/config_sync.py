@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication
+from mounts import MountManager
+from processing import STATE_CONNECTED
+from protocol import PROTOCOL_FRAMED
+from simulator import SimulatorServer, DEFAULT_CONFIG
+
+DEFAULT_COUNTS = [1, 8, 16]
+SIMULATORS_PER_PROCESS = 4
+
+
+def pump(app, seconds, condition=None):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if condition is not None and condition():
+            return True
+        time.sleep(0.0005)
+    return condition is None or condition()
+
+
+def push(app, manager, values, timeout=10.0):
+    results = []
+    started = time.perf_counter()
+    job = manager.push_config(list(manager.mounts), values)
+    job.finished.connect(results.append)
+    job.start(values)
+    pump(app, timeout, lambda: results)
+    return time.perf_counter() - started, results[0] if results else {}
+
+
+def serve_simulators(count, config_delay, ack_loss, pipe):
+    # Symulatory w osobnym procesie, żeby ich fizyka nie konkurowała o GIL z mierzonym klientem
+    servers = [SimulatorServer(port=0, rate_hz=200, protocol=PROTOCOL_FRAMED, config_delay=config_delay,
+                               ack_loss=ack_loss) for _ in range(count)]
+    for server in servers:
+        server.start()
+    pipe.send([server.port for server in servers])
+    pipe.recv()
+    for server in servers:
+        server.stop()
+
+
+def run(app, count, rounds, config_delay, ack_loss):
+    # Najwyżej SIMULATORS_PER_PROCESS symulatorów na proces - inaczej opóźnienie mierzyłoby GIL symulatora
+    pipes = []
+    processes = []
+    for first in range(0, count, SIMULATORS_PER_PROCESS):
+        pipe, child_pipe = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=serve_simulators, args=(min(SIMULATORS_PER_PROCESS, count - first), config_delay, ack_loss,
+                                           child_pipe), daemon=True)
+        process.start()
+        pipes.append(pipe)
+        processes.append(process)
+    manager = MountManager(PROTOCOL_FRAMED)
+    ports = [port for pipe in pipes for port in pipe.recv()]
+    for i, port in enumerate(ports):
+        manager.add_mount(f"M{i}", "127.0.0.1", port)
+    manager.start()
+    try:
+        if not pump(app, 10.0, lambda: all(mount.client.state == STATE_CONNECTED
+                                           for mount in manager.mounts.values())):
+            raise RuntimeError("Nie wszystkie symulatory połączone")
+        # Pierwsza wysyłka pełna, kolejne zmieniają jedno wzmocnienie - wysyłane są tylko różnice
+        values = list(DEFAULT_CONFIG)
+        full_total, _ = push(app, manager, values)
+        totals = []
+        latencies = []
+        failures = 0
+        for i in range(rounds):
+            values[0] = 1.0 + 0.01 * (i + 1)
+            total, results = push(app, manager, values)
+            totals.append(total)
+            for ok, detail in results.values():
+                if ok:
+                    latencies.append(detail)
+                else:
+                    failures += 1
+        latencies = np.array(latencies) * 1000
+        totals = np.array(totals) * 1000
+        return {
+            "mounts": count,
+            "full_push_ms": full_total * 1000,
+            "delta_push_all_ms_p50": float(np.percentile(totals, 50)),
+            "delta_push_all_ms_max": float(totals.max()),
+            "per_mount_ack_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+            "per_mount_ack_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+            "failed": failures,
+        }
+    finally:
+        manager.stop()
+        for pipe, process in zip(pipes, processes):
+            pipe.send("stop")
+            process.join(timeout=5.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wysyłka konfiguracji z potwierdzeniem do wielu kontrolerów")
+    parser.add_argument("--counts", default=",".join(map(str, DEFAULT_COUNTS)))
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--config-delay", type=float, default=0.005, help="czas zapisu konfiguracji w symulatorze [s]")
+    parser.add_argument("--ack-loss", type=float, default=0.0, help="odsetek gubionych potwierdzeń")
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv[:1])
+    results = []
+    for count in [int(value) for value in args.counts.split(",")]:
+        result = run(app, count, args.rounds, args.config_delay, args.ack_loss)
+        results.append(result)
+        print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
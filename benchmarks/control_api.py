@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from simulator import SimulatorServer
+
+DEFAULT_COMMANDS = 20000
+DEFAULT_REQUESTS = 500
+DEFAULT_SUBSCRIBE_SECONDS = 3.0
+
+
+class RpcConnection:
+    def __init__(self, port):
+        self.socket = socket.create_connection(("127.0.0.1", port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rb")
+        self.next_id = 0
+
+    def notify(self, method, *params):
+        return json.dumps({"jsonrpc": "2.0", "method": method, "params": list(params)}).encode() + b"\n"
+
+    def call(self, method, *params):
+        self.next_id += 1
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": list(params)}
+        self.socket.sendall(json.dumps(request).encode() + b"\n")
+        return self.wait_response(self.next_id)
+
+    def wait_response(self, request_id):
+        # Powiadomienia telemetrii przychodzące między odpowiedziami są pomijane
+        while True:
+            message = json.loads(self.file.readline())
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise RuntimeError(message["error"]["message"])
+                return message["result"]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+def start_headless(simulator_port):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--headless", "--no-record", "--control-port", "0",
+         "--port", str(simulator_port)],
+        stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    line = process.stdout.readline()
+    if "nasłuchuje" not in line:
+        process.kill()
+        raise RuntimeError(f"Tryb bez okna nie wystartował: {line!r}")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def wait_connected(rpc, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while rpc.call("status")["state"] != "connected":
+        if time.monotonic() > deadline:
+            raise RuntimeError("Brak połączenia z symulatorem")
+        time.sleep(0.05)
+
+
+def bench_pipelined(rpc, commands):
+    # Strumień komend joysticka jako powiadomienia JSON-RPC (bez odpowiedzi), zamknięty jednym status
+    rng = np.random.default_rng(0)
+    payload = b"".join(rpc.notify("analog", float(x), float(y)) for x, y in rng.uniform(-1.0, 1.0, (commands, 2)))
+    status = rpc.call("status")
+    sent_before = status["commands_sent"].get("analog", 0)
+    dropped_before = status["dropped_commands"]
+    started = time.perf_counter()
+    rpc.socket.sendall(payload)
+    rpc.call("status")
+    accepted = time.perf_counter() - started
+    # Komendy odrzucone przy pełnej kolejce klienta też się liczą jako obsłużone
+    deadline = time.monotonic() + 10.0
+    sent = dropped = 0
+    while sent + dropped < commands and time.monotonic() < deadline:
+        status = rpc.call("status")
+        sent = status["commands_sent"].get("analog", 0) - sent_before
+        dropped = status["dropped_commands"] - dropped_before
+    elapsed = time.perf_counter() - started
+    return {
+        "commands": commands,
+        "accepted_per_s": commands / accepted,
+        "sent_per_s": sent / elapsed,
+        "commands_sent": sent,
+        "dropped_commands": dropped,
+    }
+
+
+def bench_sequential(rpc, requests):
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        rpc.call("goto", float(i % 10), 0.0)
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "goto_ms_p50": float(np.percentile(latencies, 50)),
+        "goto_ms_p99": float(np.percentile(latencies, 99)),
+    }
+
+
+def bench_subscription(rpc, seconds):
+    rpc.call("subscribe")
+    samples = 0
+    notifications = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        message = json.loads(rpc.file.readline())
+        if message.get("method") == "telemetry":
+            notifications += 1
+            samples += len(message["params"]["t"])
+    elapsed = time.perf_counter() - started
+    rpc.call("unsubscribe")
+    return {"telemetry_samples_per_s": samples / elapsed, "notifications_per_s": notifications / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Przepustowość lokalnego API sterowania (main.py --headless)")
+    parser.add_argument("--commands", type=int, default=DEFAULT_COMMANDS)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--subscribe-seconds", type=float, default=DEFAULT_SUBSCRIBE_SECONDS)
+    parser.add_argument("--rate", type=int, default=1000, help="częstotliwość telemetrii symulatora [Hz]")
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    server = SimulatorServer(port=0, rate_hz=args.rate)
+    server.start()
+    process, control_port = start_headless(server.port)
+    rpc = RpcConnection(control_port)
+    try:
+        wait_connected(rpc)
+        result = {}
+        result.update(bench_pipelined(rpc, args.commands))
+        result.update(bench_sequential(rpc, args.requests))
+        result.update(bench_subscription(rpc, args.subscribe_seconds))
+        rpc.call("stop")
+        rpc.call("shutdown")
+    finally:
+        rpc.close()
+        try:
+            process.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.stop()
+
+    print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                   for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
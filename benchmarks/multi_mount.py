@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+from context import AppContext
+from mounts import MountManager, MountGridView
+from processing import STATE_CONNECTED
+from simulator import SimulatorServer
+from metrics import rss_bytes
+
+DEFAULT_COUNTS = [1, 8, 32]
+
+
+def pump(app, seconds, condition=None):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if condition is not None and condition():
+            return True
+        time.sleep(0.001)
+    return condition is None or condition()
+
+
+def serve_simulators(count, rate, pipe):
+    # Symulatory w osobnym procesie, żeby ich fizyka nie konkurowała o GIL z mierzonym GUI
+    servers = [SimulatorServer(port=0, rate_hz=rate, autopilot_interval=1.0) for _ in range(count)]
+    for server in servers:
+        server.start()
+    pipe.send([server.port for server in servers])
+    while pipe.recv() == "count":
+        pipe.send([server.frames_sent for server in servers])
+    for server in servers:
+        server.stop()
+
+
+def run(app, count, rate, duration):
+    pipe, child_pipe = multiprocessing.Pipe()
+    simulators = multiprocessing.Process(target=serve_simulators, args=(count, rate, child_pipe), daemon=True)
+    simulators.start()
+    ports = pipe.recv()
+    rss_start = rss_bytes()
+    manager = MountManager()
+    for i, port in enumerate(ports):
+        manager.add_mount(f"M{i + 1}", "127.0.0.1", port)
+    view = MountGridView(AppContext(port=1, record=False), manager)
+    view.resize(1600, 1000)
+    view.show()
+    started = time.perf_counter()
+    manager.start()
+    connected = pump(app, 10.0, lambda: all(
+        mount.client.state == STATE_CONNECTED for mount in manager.mounts.values()))
+    connect_s = time.perf_counter() - started
+
+    pipe.send("count")
+    sent_before = pipe.recv()
+    processed_before = [mount.worker.processed for mount in manager.mounts.values()]
+    refresh_times = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        app.processEvents()
+        refresh_started = time.perf_counter()
+        view.refresh()
+        refresh_times.append(time.perf_counter() - refresh_started)
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    not_stopped = manager.stop_all()
+    pump(app, 0.5, lambda: all(mount.client.stop_latencies for mount in manager.mounts.values()))
+    stop_latencies = [mount.client.stop_latencies[-1] for mount in manager.mounts.values()
+                      if mount.client.stop_latencies]
+    pipe.send("count")
+    sent = np.array(pipe.recv()) - sent_before
+    processed = np.array([mount.worker.processed for mount in manager.mounts.values()]) - processed_before
+    rss_end = rss_bytes()
+
+    view.close()
+    manager.stop()
+    pipe.send("stop")
+    simulators.join()
+    refresh_ms = np.array(refresh_times) * 1000
+    return {
+        "mounts": count,
+        "all_connected": connected,
+        "connect_s": connect_s,
+        "sent_fps_total": float(sent.sum() / elapsed),
+        "ingest_fps_total": float(processed.sum() / elapsed),
+        "ingest_ratio_min": float((processed / np.maximum(sent, 1)).min()),
+        "grid_refresh_ms_p50": float(np.percentile(refresh_ms, 50)),
+        "grid_refresh_ms_p99": float(np.percentile(refresh_ms, 99)),
+        "stop_all_acked": count - len(not_stopped),
+        "stop_all_on_wire": len(stop_latencies),
+        "stop_all_ms_max": max(stop_latencies, default=float("nan")) * 1000,
+        "rss_mb_per_mount": (rss_end - rss_start) / 2 ** 20 / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skalowanie obsługi wielu montaży w jednym procesie")
+    parser.add_argument("--counts", default=",".join(str(count) for count in DEFAULT_COUNTS))
+    parser.add_argument("--rate", type=float, default=200, help="częstotliwość telemetrii każdego montażu [Hz]")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    results = []
+    for count in [int(count) for count in args.counts.split(",")]:
+        result = run(app, count, args.rate, args.duration)
+        results.append(result)
+        print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0 if all(result["all_connected"] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
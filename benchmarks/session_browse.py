@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from recorder import RECORD_HEADER, RECORD_RX, RECORD_TX, SEGMENT_SIZE
+from processing import CommandBuilder
+from comparison import RecordedSession
+
+DEFAULT_SIZE_MB = 512
+FRAMES_PER_RECORD = 20
+RATE_HZ = 1000
+MOVE_INTERVAL = 10.0
+ZOOM_FRACTIONS = [1.0, 0.1, 0.01, 0.001, 0.0001]
+PLOT_WIDTH = 1600
+
+
+def anon_rss_bytes():
+    # Strony zmapowanych plików nie są liczone - interesuje nas tylko pamięć własna procesu
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def write_recording(directory, size_mb):
+    # Nagranie jak z TCPClient: rekordy po FRAMES_PER_RECORD ramek co 20 ms, GOTO co MOVE_INTERVAL
+    record = np.dtype([('kind', 'u1'), ('time', '<f8'), ('length', '<u4'),
+                       ('frames', '<u4', (FRAMES_PER_RECORD, 2))])
+    per_segment = SEGMENT_SIZE // record.itemsize
+    total = size_mb * 1024 * 1024 // record.itemsize
+    start = time.time()
+    rng = np.random.default_rng(0)
+    written = 0
+    segment = 0
+    while written < total:
+        n = min(per_segment, total - written)
+        index = np.arange(written, written + n)
+        rows = np.empty(n, dtype=record)
+        rows['kind'] = RECORD_RX
+        rows['time'] = start + index * FRAMES_PER_RECORD / RATE_HZ
+        rows['length'] = FRAMES_PER_RECORD * 8
+        sample = index[:, None] * FRAMES_PER_RECORD + np.arange(FRAMES_PER_RECORD)
+        position = 1000 + 500 * np.sin(sample / (MOVE_INTERVAL * RATE_HZ) * np.pi)
+        rows['frames'][:, :, 0] = position + rng.normal(0, 2, position.shape)
+        rows['frames'][:, :, 1] = position[:, ::-1]
+        rows.tofile(os.path.join(directory, f"segment_{segment:05d}.bin"))
+        written += n
+        segment += 1
+    duration = total * FRAMES_PER_RECORD / RATE_HZ
+    with open(os.path.join(directory, f"segment_{segment:05d}.bin"), "wb") as f:
+        config = CommandBuilder.build_config_packet(1.0, 0.1, 0.05, 1.0, 0.1, 0.05, 10.0, 10.0, 0.01, 0.01)
+        f.write(RECORD_HEADER.pack(RECORD_TX, start, len(config)) + config)
+        for t in np.arange(1.0, duration, MOVE_INTERVAL):
+            message = CommandBuilder.build_goto_command(float(t), 0.0)
+            f.write(RECORD_HEADER.pack(RECORD_TX, start + t, len(message)) + message)
+    return total * FRAMES_PER_RECORD, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Przeglądanie dużych nagrań w widoku porównania")
+    parser.add_argument("--size-mb", type=int, default=DEFAULT_SIZE_MB, help="rozmiar generowanego nagrania")
+    parser.add_argument("--queries", type=int, default=50, help="zapytań o widok na każdy poziom zoomu")
+    parser.add_argument("--directory", help="istniejące nagranie zamiast generowanego")
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    temporary = None
+    if args.directory:
+        directory = args.directory
+    else:
+        temporary = tempfile.mkdtemp(prefix="session_browse_")
+        directory = temporary
+        write_recording(directory, args.size_mb)
+    try:
+        result = {"size_mb": sum(os.path.getsize(os.path.join(directory, name))
+                                 for name in os.listdir(directory) if name.endswith(".bin")) / 2 ** 20}
+        rss_before = anon_rss_bytes()
+        for label in ("index_cold_s", "index_cached_s"):
+            started = time.perf_counter()
+            session = RecordedSession(directory)
+            result[label] = time.perf_counter() - started
+            if label == "index_cold_s":
+                session.close()
+        started = time.perf_counter()
+        session.build()
+        result["overview_build_s"] = time.perf_counter() - started
+        result["frames"] = session.reader.frame_count()
+        session.align(1)
+
+        rng = np.random.default_rng(1)
+        span = session.end_time() - session.start_time()
+        for fraction in ZOOM_FRACTIONS:
+            width = span * fraction
+            times = []
+            for _ in range(args.queries):
+                t_start = session.start_time() - session.offset + rng.uniform(0, span - width)
+                started = time.perf_counter()
+                session.window(t_start, t_start + width, PLOT_WIDTH)
+                times.append(time.perf_counter() - started)
+            times = np.array(times) * 1000
+            result[f"view_{fraction:g}_ms_p50"] = float(np.percentile(times, 50))
+            result[f"view_{fraction:g}_ms_max"] = float(times.max())
+        result["anon_rss_growth_mb"] = (anon_rss_bytes() - rss_before) / 2 ** 20
+        session.close()
+    finally:
+        if temporary:
+            shutil.rmtree(temporary)
+
+    print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                   for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 1.25
+
+
+def serve_frames(server):
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return
+        try:
+            conn.sendall(struct.pack('II', 0, 0) * 16)
+            conn.recv(1024)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+def run_once(port):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--port", str(port), "--no-record",
+         "--exit-after-first-frame"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+    wall = time.perf_counter() - started
+    for line in result.stdout.splitlines():
+        if line.startswith("{"):
+            times = json.loads(line)
+            times["process_s"] = wall
+            return times
+    raise RuntimeError(f"Brak raportu startu:\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="plik JSON z wynikami odniesienia")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    threading.Thread(target=serve_frames, args=(server,), daemon=True).start()
+
+    runs = [run_once(server.getsockname()[1]) for _ in range(args.runs)]
+    server.close()
+    medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    print(json.dumps(medians, indent=4))
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(medians, f, indent=4)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = [key for key, value in medians.items() if key in baseline and value > baseline[key] * TOLERANCE]
+    for key in regressions:
+        print(f"Regresja {key}: {medians[key]:.3f} s (odniesienie {baseline[key]:.3f} s)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from processing import TCPClient, CommandBuilder, STATE_CONNECTED
+from protocol import PROTOCOL_LEGACY, PROTOCOL_FRAMED
+from simulator import SimulatorServer
+
+DEFAULT_STOPS = 50
+DEFAULT_BOUND_MS = 10.0
+
+
+def flood(client, running):
+    # Strumień komend joysticka i GOTO szybszy niż kontroler je odbiera - kolejka stale pełna
+    rng = np.random.default_rng()
+    while running.is_set():
+        x, y = rng.uniform(-1.0, 1.0, 2)
+        client.send(CommandBuilder.build_analog_manual_command(x, y))
+        client.send(CommandBuilder.build_goto_command(x * 90, y * 90))
+
+
+def run(protocol, stops, interval):
+    server = SimulatorServer(port=0, rate_hz=1000, protocol=protocol)
+    server.start()
+    client = TCPClient("127.0.0.1", server.port, protocol=protocol)
+    client.start()
+    deadline = time.monotonic() + 5.0
+    while client.state != STATE_CONNECTED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if client.state != STATE_CONNECTED:
+        raise RuntimeError("Brak połączenia z symulatorem")
+
+    running = threading.Event()
+    running.set()
+    flooder = threading.Thread(target=flood, args=(client, running), daemon=True)
+    flooder.start()
+    time.sleep(0.2)
+    for _ in range(stops):
+        client.send(CommandBuilder.build_stop_command())
+        time.sleep(interval)
+    running.clear()
+    flooder.join()
+    time.sleep(0.1)
+    client.stop()
+    server.stop()
+
+    latencies = np.array(client.stop_latencies) * 1000
+    return {
+        "protocol": protocol,
+        "stops_sent": len(latencies),
+        "stop_ms_p50": float(np.percentile(latencies, 50)),
+        "stop_ms_p99": float(np.percentile(latencies, 99)),
+        "stop_ms_max": float(latencies.max()),
+        "purged_commands": client.purged_commands,
+        "dropped_commands": client.dropped_commands,
+        "rejected_commands": client.rejected_commands,
+        "command_seq_gaps": server.command_seq_gaps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Opóźnienie STOP przy zapchanej kolejce komend")
+    parser.add_argument("--stops", type=int, default=DEFAULT_STOPS)
+    parser.add_argument("--interval", type=float, default=0.02, help="odstęp między kolejnymi STOP [s]")
+    parser.add_argument("--bound-ms", type=float, default=DEFAULT_BOUND_MS, help="dopuszczalne p99 opóźnienia")
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for protocol in (PROTOCOL_LEGACY, PROTOCOL_FRAMED):
+        result = run(protocol, args.stops, args.interval)
+        results.append(result)
+        print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in result.items()), flush=True)
+        if result["stops_sent"] < args.stops or result["stop_ms_p99"] > args.bound_ms:
+            print(f"BŁĄD: STOP p99 {result['stop_ms_p99']:.3f} ms przekracza {args.bound_ms} ms "
+                  f"lub nie wszystkie STOP zostały wysłane", flush=True)
+            failed = True
+        if result["command_seq_gaps"]:
+            # Kontroler widzi lukę w numeracji jako zgubione ramki - numery muszą być ciągłe mimo usuwania komend
+            print(f"BŁĄD: {result['command_seq_gaps']} luk w numerach sekwencji komend", flush=True)
+            failed = True
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
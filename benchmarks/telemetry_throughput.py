@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+from context import AppContext
+from control_panel import ControlPanel
+from simulator import SimulatorServer
+from metrics import rss_bytes
+
+DEFAULT_RATES = [1000, 10000, 50000, 100000]
+
+
+class Probe:
+    # Przetwarzanie odbywa się w wątku TelemetryWorker, więc zaległość liczymy z jego licznika
+    def __init__(self, panel, worker):
+        self.panel = panel
+        self.worker = worker
+        self.emitted = 0
+        self.max_backlog = 0
+        self.frame_times = []
+        panel.client.batch_received.connect(self.on_emitted, Qt.ConnectionType.DirectConnection)
+        self.update_plot = panel.update_plot
+        panel.plot_timer.timeout.disconnect(panel.update_plot)
+        panel.plot_timer.timeout.connect(self.on_plot)
+
+    @property
+    def handled(self):
+        return self.worker.processed
+
+    def on_emitted(self, timestamps, frames):
+        self.emitted += len(frames)
+
+    def on_plot(self):
+        self.max_backlog = max(self.max_backlog, self.emitted - self.handled)
+        started = time.perf_counter()
+        self.update_plot()
+        self.frame_times.append(time.perf_counter() - started)
+
+
+def run(app, rate, duration):
+    server = SimulatorServer(port=0, rate_hz=rate, noise=0.001, autopilot_interval=2.0)
+    server.start()
+    context = AppContext(port=server.port, record=False)
+    panel = ControlPanel(context)
+    panel.resize(1600, 1000)
+    panel.show()
+    probe = Probe(panel, context.worker)
+    context.start()
+
+    rss_start = rss_bytes()
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        app.processEvents()
+    elapsed = time.perf_counter() - started
+    rss_end = rss_bytes()
+
+    context.stop()
+    server.stop()
+    panel.plot_timer.stop()
+    panel.close()
+    frame_times = np.array(probe.frame_times or [0.0]) * 1000
+    return {
+        "rate_hz": rate,
+        "sent_fps": server.frames_sent / elapsed,
+        "ingest_fps": probe.handled / elapsed,
+        "max_backlog_frames": probe.max_backlog,
+        "final_backlog_frames": probe.emitted - probe.handled,
+        "plot_ms_p50": float(np.percentile(frame_times, 50)),
+        "plot_ms_p99": float(np.percentile(frame_times, 99)),
+        "rss_growth_mb": (rss_end - rss_start) / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", default=",".join(str(rate) for rate in DEFAULT_RATES))
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    results = []
+    for rate in [int(rate) for rate in args.rates.split(",")]:
+        result = run(app, rate, args.duration)
+        results.append(result)
+        print(" ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                       for key, value in result.items()), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+COUNTS_PER_DEGREE = 1000.0
+ENCODER_BITS = 32
+LUT_SIZE = 4096
+CALIBRATION_DIR = "calibration"
+DEFAULT_CALIBRATION_PATH = os.path.join(CALIBRATION_DIR, "encoder.json")
+AXES = ("x", "y")
+
+# Przebieg kalibracji: pozycja uznana za ustaloną, gdy przez STILL_WINDOW s obie osie stoją w STILL_THRESHOLD
+STILL_WINDOW = 0.3
+STILL_THRESHOLD = 0.002
+STEP_TIMEOUT = 30.0
+POLL_INTERVAL_MS = 50
+
+
+class CorrectionTable:
+    # Poprawka nieliniowości na równomiernej siatce dla obu osi naraz: indeks komórki liczony wprost
+    # z pozycji (bez wyszukiwania binarnego), poza zakresem kalibracji - poprawka z brzegu
+    def __init__(self, start, step, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.step = np.asarray(step, dtype=np.float64)
+        self.values = values
+        self.size = values.shape[1]
+        self.inverse_step = 1.0 / self.step
+        self.base = values[:, :-1].ravel()
+        self.slopes = np.diff(values, axis=1).ravel()
+        self.axis_offset = np.arange(len(values)) * (self.size - 1)
+
+    @classmethod
+    def build(cls, points, size=LUT_SIZE):
+        # points: dla każdej osi pary (pozycja zmierzona, pozycja odniesienia) w stopniach
+        starts, steps, tables = [], [], []
+        for axis in AXES:
+            pairs = np.asarray(points.get(axis, []), dtype=np.float64).reshape(-1, 2)
+            measured, indices = np.unique(pairs[:, 0], return_inverse=True)
+            # Powtórzone pomiary tej samej pozycji uśredniane
+            error = np.bincount(indices, pairs[:, 1] - pairs[:, 0]) / np.bincount(indices) if len(pairs) else []
+            if len(measured) < 2:
+                starts.append(0.0)
+                steps.append(1.0)
+                tables.append(np.full(size, error[0] if len(measured) else 0.0))
+                continue
+            grid = np.linspace(measured[0], measured[-1], size)
+            starts.append(grid[0])
+            steps.append(grid[1] - grid[0])
+            tables.append(np.interp(grid, measured, error))
+        return cls(starts, steps, tables)
+
+    def lookup(self, degrees):
+        position = (degrees - self.start) * self.inverse_step
+        np.clip(position, 0, self.size - 1 - 1e-9, out=position)
+        index = position.astype(np.intp)
+        fraction = position - index
+        index += self.axis_offset
+        return self.base[index] + fraction * self.slopes[index]
+
+
+class EncoderCalibration:
+    # Surowe liczniki enkodera (N, 2) uint32 -> stopnie (N, 2) float64 jednym przebiegiem wektorowym.
+    # Licznik o bits bitach się przewija, więc pozycja to różnica od zera modulo 2^bits ze znakiem.
+    def __init__(self, counts_per_degree=(COUNTS_PER_DEGREE, COUNTS_PER_DEGREE), zero_offset=(0, 0),
+                 bits=ENCODER_BITS, table=None):
+        if not 1 < bits <= 32:
+            raise ValueError("Liczba bitów enkodera musi być w zakresie 2-32")
+        if not all(np.isfinite(counts_per_degree)) or not all(counts_per_degree):
+            raise ValueError("Liczba impulsów na stopień musi być niezerowa")
+        self.counts_per_degree = tuple(float(value) for value in counts_per_degree)
+        self.zero_offset = tuple(int(value) % (1 << bits) for value in zero_offset)
+        self.bits = bits
+        self.table = table
+        self.scale = 1.0 / np.array(self.counts_per_degree)
+        self.zero = np.array(self.zero_offset, dtype=np.uint32)
+        self.shift = np.uint32(32 - bits)
+
+    def to_degrees(self, frames):
+        relative = np.subtract(frames, self.zero, dtype=np.uint32)
+        if self.shift:
+            # Rozszerzenie znaku z bits bitów: przesunięcie w lewo, potem arytmetycznie w prawo
+            relative <<= self.shift
+            counts = relative.view(np.int32) >> np.int32(self.shift)
+        else:
+            counts = relative.view(np.int32)
+        degrees = counts * self.scale
+        if self.table is not None:
+            degrees += self.table.lookup(degrees)
+        return degrees
+
+    def linear(self):
+        return EncoderCalibration(self.counts_per_degree, self.zero_offset, self.bits)
+
+    def parameters(self):
+        return {"counts_per_degree": list(self.counts_per_degree), "zero_offset": list(self.zero_offset),
+                "bits": self.bits}
+
+
+def table_cache_path(path):
+    return os.path.splitext(path)[0] + ".lut.npz"
+
+
+def load_calibration(path=DEFAULT_CALIBRATION_PATH, size=LUT_SIZE):
+    # Plik JSON z parametrami i punktami przebiegu kalibracji; tablica poprawek jest budowana raz
+    # i trzymana obok (.lut.npz), dopóki plik kalibracji się nie zmieni
+    with open(path, "rb") as f:
+        raw = f.read()
+    config = json.loads(raw)
+    stamp = hashlib.sha1(raw + str(size).encode()).hexdigest()
+    calibration = EncoderCalibration(config.get("counts_per_degree", (COUNTS_PER_DEGREE, COUNTS_PER_DEGREE)),
+                                     config.get("zero_offset", (0, 0)), int(config.get("bits", ENCODER_BITS)))
+    points = config.get("points")
+    if not points:
+        return calibration
+    cache = table_cache_path(path)
+    table = None
+    try:
+        with np.load(cache) as data:
+            if str(data["stamp"]) == stamp:
+                table = CorrectionTable(data["start"], data["step"], data["values"])
+    except (OSError, KeyError, ValueError):
+        pass
+    if table is None:
+        table = CorrectionTable.build(points, size)
+        try:
+            np.savez(cache, stamp=np.array(stamp), start=table.start, step=table.step, values=table.values)
+        except OSError:
+            pass
+    calibration.table = table
+    return calibration
+
+
+def save_calibration(path, calibration, points=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    config = calibration.parameters()
+    if points:
+        config["points"] = points
+    with open(path, "w") as f:
+        json.dump(config, f, indent=4)
+
+
+class CalibrationRun(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    # Przejazd po pozycjach odniesienia: GOTO, czekanie aż obie osie staną i uśrednienie odczytu
+    # enkodera bez poprawki. Odniesieniem są wartości zadane, więc kontroler powinien mieć na czas
+    # przebiegu małą tolerancję (albo osobny czujnik odniesienia).
+    def __init__(self, context, positions, still_window=STILL_WINDOW, still_threshold=STILL_THRESHOLD,
+                 step_timeout=STEP_TIMEOUT, parent=None):
+        super().__init__(parent)
+        self.context = context
+        self.positions = [(float(x), float(y)) for x, y in positions]
+        self.still_window = still_window
+        self.still_threshold = still_threshold
+        self.step_timeout = step_timeout
+        self.points = {axis: [] for axis in AXES}
+        self.index = 0
+        self.previous = None
+        self.step_started = 0.0
+        self.timer = QTimer(self)
+        self.timer.setInterval(POLL_INTERVAL_MS)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.previous = self.context.calibration
+        self.context.set_calibration(self.previous.linear())
+        self.points = {axis: [] for axis in AXES}
+        self.index = 0
+        self.next_position()
+
+    def next_position(self):
+        if self.index >= len(self.positions):
+            self.finish()
+            self.finished.emit(self.points)
+            return
+        if not self.context.send_goto(*self.positions[self.index]):
+            self.fail(f"GOTO nie został wysłany - {self.context.client.send_error()}")
+            return
+        self.step_started = time.time()
+        self.timer.start()
+
+    def poll(self):
+        now = time.time()
+        samples = self.context.worker.recent(self.still_window)
+        # Całe okno po wysłaniu GOTO - inaczej oś, która jeszcze nie ruszyła, wyglądałaby na ustaloną
+        if (len(samples) > 1 and samples['t'][0] >= self.step_started
+                and np.ptp(samples['x']) <= self.still_threshold and np.ptp(samples['y']) <= self.still_threshold):
+            self.timer.stop()
+            for axis, reference in zip(AXES, self.positions[self.index]):
+                self.points[axis].append([float(np.mean(samples[axis])), reference])
+            self.index += 1
+            self.progress.emit(self.index, len(self.positions))
+            self.next_position()
+        elif now - self.step_started > self.step_timeout:
+            self.fail(f"Pozycja {self.positions[self.index]} nie ustaliła się w {self.step_timeout:.0f} s")
+
+    def fail(self, message):
+        self.finish()
+        self.failed.emit(message)
+
+    def finish(self):
+        self.timer.stop()
+        if self.previous is not None:
+            self.context.set_calibration(self.previous)
+            self.previous = None
+
+
+def parse_range(text):
+    start, stop, step = (float(value) for value in text.split(":"))
+    return np.arange(start, stop + step / 2, step)
+
+
+def main():
+    from PyQt6.QtCore import QCoreApplication
+    from processing import DEFAULT_HOST, DEFAULT_PORT
+    from protocol import PROTOCOL_LEGACY, PROTOCOL_FRAMED
+    from context import AppContext
+
+    parser = argparse.ArgumentParser(description="Przebieg kalibracji enkoderów goniometru")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--protocol", choices=[PROTOCOL_LEGACY, PROTOCOL_FRAMED], default=PROTOCOL_LEGACY)
+    parser.add_argument("--range", type=parse_range, default=parse_range("-10:10:0.5"),
+                        help="pozycje odniesienia start:stop:krok [°], te same dla obu osi")
+    parser.add_argument("--counts-per-degree", type=float, nargs=2, default=None)
+    parser.add_argument("--zero-offset", type=int, nargs=2, default=None, help="liczniki enkodera w pozycji zero")
+    parser.add_argument("--bits", type=int, default=None)
+    parser.add_argument("--output", default=DEFAULT_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    try:
+        calibration = load_calibration(args.output).linear()
+    except (OSError, ValueError):
+        calibration = EncoderCalibration()
+    calibration = EncoderCalibration(args.counts_per_degree or calibration.counts_per_degree,
+                                     args.zero_offset or calibration.zero_offset, args.bits or calibration.bits)
+
+    app = QCoreApplication(sys.argv[:1])
+    context = AppContext(args.host, args.port, record=False, protocol=args.protocol, calibration=calibration)
+    run = CalibrationRun(context, [(position, position) for position in args.range])
+    result = {}
+    run.progress.connect(lambda done, total: print(f"{done}/{total}", flush=True))
+    run.finished.connect(lambda points: (result.update(points=points), app.quit()))
+    run.failed.connect(lambda message: (result.update(error=message), app.quit()))
+    context.client.connected.connect(run.start)
+    context.start()
+    app.exec()
+    context.stop()
+    if "error" in result:
+        print(f"Kalibracja przerwana: {result['error']}")
+        return 1
+    save_calibration(args.output, calibration, result["points"])
+    table = load_calibration(args.output).table
+    print(f"Zapisano {args.output}, największa poprawka: "
+          + ", ".join(f"{axis} {np.abs(values).max():.4f}°" for axis, values in zip(AXES, table.values)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import os
+import struct
+import numpy as np
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from protocol import (
+    LEGACY_COMMANDS, CMD_CONFIG, CMD_GOTO, CMD_TRAJECTORY, MSG_CONFIG_SET, CONFIG_SET_HEADER, CONFIG_VALUES,
+    apply_config_set,
+)
+from recorder import SessionReader
+from calibration import EncoderCalibration
+from plotting import MinMaxDecimator, min_max_bins
+
+LOAD_CHUNK_FRAMES = 262_144
+OVERVIEW_BIN_SIZE = 256
+# Zakres z najwyżej tyloma próbkami na punkt ekranu czytany surowo z mmap, szerszy - z piramidy
+RAW_SAMPLES_PER_POINT = OVERVIEW_BIN_SIZE
+MOVE_COMMANDS = (CMD_GOTO, CMD_TRAJECTORY)
+
+
+class RecordedSession:
+    # Nagranie otwarte do porównań: surowe dane zostają w plikach (mmap), w pamięci jest tylko
+    # indeks rekordów i zgrubna piramida min/max (ok. 1/256 liczby próbek)
+    def __init__(self, directory, calibration=None):
+        self.directory = directory
+        self.name = os.path.basename(os.path.normpath(directory))
+        self.reader = SessionReader(directory)
+        self.calibration = calibration or EncoderCalibration()
+        self.overview = MinMaxDecimator(2, bin_size=OVERVIEW_BIN_SIZE)
+        self.move_times = np.empty(0)
+        self.configs = []
+        self.offset = float(self.reader.times[0]) if len(self.reader) else 0.0
+
+    def build(self, progress=None):
+        total = self.reader.frame_count()
+        done = 0
+        for t, frames in self.reader.iter_frames(LOAD_CHUNK_FRAMES):
+            self.overview.extend(t, self.calibration.to_degrees(frames))
+            done += len(frames)
+            if progress is not None and total:
+                progress(done, total)
+        move_times = []
+        for timestamp, message in self.reader.commands():
+            if message[0] in MOVE_COMMANDS:
+                move_times.append(timestamp)
+            elif message[0] == CMD_CONFIG:
+                self.configs.append((timestamp, LEGACY_COMMANDS[CMD_CONFIG].unpack(message)[1:]))
+            elif message[0] == MSG_CONFIG_SET:
+                # Zmiana tylko części pól - pozostałe z poprzedniej konfiguracji w nagraniu
+                _, mask = CONFIG_SET_HEADER.unpack_from(message, 1)
+                changed = struct.unpack_from(f'<{bin(mask).count("1")}f', message, 1 + CONFIG_SET_HEADER.size)
+                previous = self.configs[-1][1] if self.configs else [float("nan")] * CONFIG_VALUES
+                self.configs.append((timestamp, apply_config_set(previous, mask, changed)))
+        self.move_times = np.array(move_times)
+
+    def start_time(self):
+        return float(self.reader.times[0]) if len(self.reader) else 0.0
+
+    def end_time(self):
+        return float(self.reader.times[-1]) if len(self.reader) else 0.0
+
+    def align(self, move_index):
+        # Czas zero = wysłanie move_index-tej komendy ruchu; bez niej - początek nagrania
+        if move_index < len(self.move_times):
+            self.offset = float(self.move_times[move_index])
+            return True
+        self.offset = self.start_time()
+        return False
+
+    def config_at(self, timestamp):
+        values = None
+        for config_time, config in self.configs:
+            if config_time > timestamp:
+                break
+            values = config
+        return values
+
+    def label(self):
+        config = self.config_at(self.offset)
+        if config is None:
+            return self.name
+        return f"{self.name} (P={config[0]:.3g} I={config[1]:.3g} D={config[2]:.3g})"
+
+    def window(self, t_start, t_end, max_points):
+        # Czasy względem początku ruchu; zwraca (t, wartości (N, 2)) gotowe do narysowania
+        start, end = t_start + self.offset, t_end + self.offset
+        first = max(int(np.searchsorted(self.reader.times, start, side="left")) - 1, 0)
+        last = min(int(np.searchsorted(self.reader.times, end, side="right")) + 1, len(self.reader))
+        if self.reader.frame_count(first, last) <= RAW_SAMPLES_PER_POINT * max_points:
+            t, frames = self.reader.frames(first, last)
+            t, values = min_max_bins(t, self.calibration.to_degrees(frames), max_points)
+        else:
+            t, values = self.overview.query_range(start, end, max_points)
+        return t - self.offset, values
+
+    def close(self):
+        self.reader.close()
+
+
+class SessionLoader(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, directory, calibration=None):
+        super().__init__()
+        self.directory = directory
+        self.calibration = calibration
+
+    def run(self):
+        try:
+            session = RecordedSession(self.directory, self.calibration)
+            if not len(session.reader):
+                session.close()
+                raise ValueError(f"Brak danych w nagraniu {self.directory}")
+            session.build(lambda done, total: self.progress.emit(int(100 * done / total)))
+            self.finished.emit(session)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def start_loading(parent, directory, calibration=None):
+    thread = QThread(parent)
+    loader = SessionLoader(directory, calibration)
+    loader.moveToThread(thread)
+    thread.started.connect(loader.run)
+    loader.finished.connect(thread.quit)
+    loader.failed.connect(thread.quit)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread, loader
@@ -0,0 +1,112 @@
+import pyqtgraph as pg
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QFileDialog
+from PyQt6.QtCore import QTimer
+from comparison import start_loading
+
+REFRESH_DELAY_MS = 30
+SESSION_COLORS = ['b', 'r', 'g', 'm', 'c', 'y', 'w']
+
+
+class ComparisonPanel(QWidget):
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+        self.sessions = []
+        self.loading = {}
+
+        layout = QVBoxLayout()
+        options = QHBoxLayout()
+        self.add_button = QPushButton("Dodaj nagranie")
+        self.add_button.clicked.connect(self.add_session)
+        self.clear_button = QPushButton("Wyczyść")
+        self.clear_button.clicked.connect(self.clear_sessions)
+        self.move_index = QSpinBox()
+        self.move_index.setMinimum(1)
+        self.move_index.setMaximum(10000)
+        self.move_index.valueChanged.connect(self.realign)
+        options.addWidget(self.add_button)
+        options.addWidget(self.clear_button)
+        options.addWidget(QLabel("Wyrównaj do ruchu nr:"))
+        options.addWidget(self.move_index)
+        options.addStretch()
+        layout.addLayout(options)
+
+        self.graph_x = pg.PlotWidget(title="Pozycja X")
+        self.graph_x.addLegend()
+        layout.addWidget(self.graph_x, stretch=2)
+        self.graph_y = pg.PlotWidget(title="Pozycja Y")
+        self.graph_y.setLabel('bottom', "Czas od początku ruchu [s]")
+        self.graph_y.setXLink(self.graph_x)
+        layout.addWidget(self.graph_y, stretch=2)
+        for graph in (self.graph_x, self.graph_y):
+            graph.getViewBox().setAutoVisible(y=True)
+
+        self.status_label = QLabel("Wybierz nagrania z katalogu sessions/")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        # Dane dla widocznego zakresu doczytywane z nagrań dopiero, gdy przesuwanie/zoom ustanie
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.graph_x.getViewBox().sigXRangeChanged.connect(self.refresh_timer.start)
+
+    def add_session(self):
+        directory = QFileDialog.getExistingDirectory(self, "Wybierz nagranie", "sessions")
+        if not directory or directory in self.loading:
+            return
+        if any(session.directory == directory for session, _, _ in self.sessions):
+            return
+        thread, loader = start_loading(self, directory, self.context.calibration)
+        self.loading[directory] = (thread, loader)
+        loader.progress.connect(lambda percent: self.status_label.setText(f"Wczytywanie {directory}... {percent}%"))
+        loader.finished.connect(self.on_session_loaded)
+        loader.failed.connect(lambda message: self.on_loading_failed(directory, message))
+
+    def on_loading_failed(self, directory, message):
+        self.loading.pop(directory, None)
+        self.status_label.setText(f"Błąd wczytywania: {message}")
+
+    def on_session_loaded(self, session):
+        self.loading.pop(session.directory, None)
+        aligned = session.align(self.move_index.value() - 1)
+        color = SESSION_COLORS[len(self.sessions) % len(SESSION_COLORS)]
+        curve_x = self.graph_x.plot(pen=color, name=session.label())
+        curve_y = self.graph_y.plot(pen=color)
+        self.sessions.append((session, curve_x, curve_y))
+        self.status_label.setText(f"Wczytano {session.name}: {session.reader.frame_count()} próbek"
+                                  + ("" if aligned else " (brak ruchu o tym numerze - od początku nagrania)"))
+        self.show_all()
+
+    def realign(self):
+        missing = [session.name for session, _, _ in self.sessions if not session.align(self.move_index.value() - 1)]
+        for session, curve_x, _ in self.sessions:
+            self.graph_x.plotItem.legend.getLabel(curve_x).setText(session.label())
+        if missing:
+            self.status_label.setText(f"Bez ruchu nr {self.move_index.value()}: {', '.join(missing)}")
+        self.show_all()
+
+    def show_all(self):
+        if not self.sessions:
+            return
+        start = min(session.start_time() - session.offset for session, _, _ in self.sessions)
+        end = max(session.end_time() - session.offset for session, _, _ in self.sessions)
+        self.graph_x.setXRange(start, end, padding=0.02)
+        self.refresh()
+
+    def refresh(self):
+        t_start, t_end = self.graph_x.viewRange()[0]
+        width = max(self.graph_x.width(), 100)
+        for session, curve_x, curve_y in self.sessions:
+            t, values = session.window(t_start, t_end, width)
+            curve_x.setData(t, values[:, 0])
+            curve_y.setData(t, values[:, 1])
+
+    def clear_sessions(self):
+        for session, curve_x, curve_y in self.sessions:
+            self.graph_x.removeItem(curve_x)
+            self.graph_y.removeItem(curve_y)
+            session.close()
+        self.sessions = []
+        self.status_label.setText("Wybierz nagrania z katalogu sessions/")
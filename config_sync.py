@@ -0,0 +1,246 @@
+import time
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from processing import CommandBuilder, STATE_CONNECTED
+from protocol import (
+    MSG_CONFIG_ACK, MSG_CONFIG_STATE, CONFIG_VALUES, CONFIG_STATUS_OK, PROTOCOL_FRAMED,
+    build_config_set, build_config_read,
+)
+
+ACK_TIMEOUT = 0.25
+MAX_ATTEMPTS = 4
+ALL_FIELDS = (1 << CONFIG_VALUES) - 1
+
+
+def as_float32(values):
+    # Kontroler trzyma konfigurację jako float32, więc porównania po takim samym zaokrągleniu
+    return [float(value) for value in np.asarray(values, dtype=np.float32)]
+
+
+def changed_mask(values, reference):
+    if reference is None:
+        return ALL_FIELDS
+    return sum(1 << i for i in range(CONFIG_VALUES) if values[i] != reference[i])
+
+
+class ConfigRequest:
+    def __init__(self, token, message, mask=0, values=None, push_id=0):
+        self.token = token
+        self.push_id = push_id
+        self.message = message
+        self.mask = mask
+        self.values = values
+        self.attempts = 0
+        self.started = time.perf_counter()
+
+
+class ConfigSync(QObject):
+    applied = pyqtSignal(object, float)
+    failed = pyqtSignal(str)
+    unconfirmed = pyqtSignal(object)
+    read_back = pyqtSignal(object, object)
+    read_failed = pyqtSignal(str)
+    # Zakończenie konkretnego push(): (numer z push(), powodzenie, opóźnienie [s] / None / opis)
+    completed = pyqtSignal(int, bool, object)
+    # Żądania z innych wątków (np. serwera sterowania) trafiają do wątku, w którym działają timery
+    push_requested = pyqtSignal(object)
+    read_requested = pyqtSignal()
+
+    # Śledzi ostatnią konfigurację potwierdzoną przez kontroler i wysyła tylko zmienione pola.
+    # Każde żądanie czeka na odpowiedź z tym samym tokenem i jest ponawiane po ACK_TIMEOUT.
+    # Protokół bez ramek nie ma kanału zwrotnego - wtedy wysyłany jest pełny pakiet bez potwierdzenia.
+    def __init__(self, client, timeout=ACK_TIMEOUT, max_attempts=MAX_ATTEMPTS, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.acked = None
+        # Pola wysłane bez potwierdzenia - kontroler mógł je przyjąć lub nie, więc idą w kolejnej zmianie
+        self.uncertain = 0
+        self.target = None
+        self.next_token = 1
+        self.next_push_id = 1
+        self.push_request = None
+        self.read_request = None
+        self.push_timer = QTimer(self)
+        self.push_timer.setSingleShot(True)
+        self.push_timer.timeout.connect(self._push_timeout)
+        self.read_timer = QTimer(self)
+        self.read_timer.setSingleShot(True)
+        self.read_timer.timeout.connect(self._read_timeout)
+        self.push_requested.connect(self.push)
+        self.read_requested.connect(self.read)
+        client.config_reply.connect(self._on_reply)
+        client.connected.connect(self.read)
+        client.disconnected.connect(self.forget)
+
+    def confirmed(self):
+        return self.client.protocol == PROTOCOL_FRAMED
+
+    def forget(self):
+        # Po utracie połączenia kontroler mógł się zrestartować - następna zmiana idzie w całości
+        self.acked = None
+        self.uncertain = 0
+
+    def _token(self):
+        token = self.next_token
+        self.next_token = self.next_token % 0xFFFF + 1
+        return token
+
+    def push(self, values):
+        # Zwraca numer żądania (0, gdy nie wysłano); jego wynik przychodzi w completed, czasem
+        # jeszcze przed powrotem z push()
+        values = as_float32(values)
+        self.target = values
+        if self.client.state != STATE_CONNECTED:
+            return 0
+        push_id = self.next_push_id
+        self.next_push_id += 1
+        if not self.confirmed():
+            if not self.client.send(CommandBuilder.build_config_packet(*values)):
+                self.failed.emit(f"Konfiguracja nie została wysłana - {self.client.send_error()}")
+                return 0
+            self.unconfirmed.emit(values)
+            self.completed.emit(push_id, True, None)
+            return push_id
+        if self.push_request is not None:
+            # Szybka zmiana presetów: nowsza konfiguracja zastępuje oczekującą, jej pola są niepewne
+            superseded = self.push_request
+            self.uncertain |= superseded.mask
+            self.push_timer.stop()
+            self.push_request = None
+            self.completed.emit(superseded.push_id, True, "zastąpiona nowszą konfiguracją")
+        mask = changed_mask(values, self.acked) | self.uncertain
+        if not mask:
+            self.applied.emit(values, 0.0)
+            self.completed.emit(push_id, True, 0.0)
+            return push_id
+        token = self._token()
+        self.push_request = ConfigRequest(token, build_config_set(token, mask, values), mask, values, push_id)
+        if not self._send(self.push_request, self.push_timer):
+            self.push_request = None
+            self.uncertain |= mask
+            self.failed.emit(f"Konfiguracja nie została wysłana - {self.client.send_error()}")
+            return 0
+        return push_id
+
+    def read(self):
+        if self.client.state != STATE_CONNECTED or not self.confirmed():
+            return False
+        if self.read_request is None:
+            token = self._token()
+            self.read_request = ConfigRequest(token, build_config_read(token))
+            return self._send(self.read_request, self.read_timer)
+        return True
+
+    def _send(self, request, timer):
+        request.attempts += 1
+        if not self.client.send(request.message):
+            return False
+        timer.start(int(self.timeout * 1000))
+        return True
+
+    def _push_timeout(self):
+        request = self.push_request
+        if request is None:
+            return
+        if request.attempts < self.max_attempts and self._send(request, self.push_timer):
+            return
+        self.push_request = None
+        self.uncertain |= request.mask
+        message = f"Brak potwierdzenia konfiguracji po {request.attempts} próbach"
+        self.failed.emit(message)
+        self.completed.emit(request.push_id, False, message)
+
+    def _read_timeout(self):
+        request = self.read_request
+        if request is None:
+            return
+        if request.attempts < self.max_attempts and self._send(request, self.read_timer):
+            return
+        self.read_request = None
+        self.read_failed.emit(f"Brak odczytu konfiguracji po {request.attempts} próbach")
+
+    def _on_reply(self, msg_type, values):
+        token = values[0]
+        request = self.push_request
+        if msg_type == MSG_CONFIG_ACK and request is not None and token == request.token:
+            self.push_timer.stop()
+            self.push_request = None
+            if values[2] != CONFIG_STATUS_OK:
+                self.uncertain |= request.mask
+                self.failed.emit("Kontroler odrzucił konfigurację")
+                self.completed.emit(request.push_id, False, "Kontroler odrzucił konfigurację")
+                return
+            acked = list(self.acked) if self.acked is not None else list(request.values)
+            for i in range(CONFIG_VALUES):
+                if request.mask & (1 << i):
+                    acked[i] = request.values[i]
+            self.acked = acked
+            self.uncertain &= ~request.mask
+            latency = time.perf_counter() - request.started
+            self.applied.emit(list(acked), latency)
+            self.completed.emit(request.push_id, True, latency)
+        elif msg_type == MSG_CONFIG_STATE and self.read_request is not None and token == self.read_request.token:
+            self.read_timer.stop()
+            self.read_request = None
+            live = list(values[1:])
+            # Odczyt zwrotny jest najpewniejszym stanem kontrolera
+            if self.push_request is None:
+                self.acked = live
+                self.uncertain = 0
+            self.read_back.emit(live, self.differences(live))
+
+    def differences(self, live):
+        if self.target is None:
+            return []
+        return [(i, self.target[i], live[i]) for i in range(CONFIG_VALUES) if self.target[i] != live[i]]
+
+
+class ParallelConfigPush(QObject):
+    finished = pyqtSignal(object)
+
+    # Ta sama konfiguracja do wielu kontrolerów naraz; wynik per cel: (True, opóźnienie [s]),
+    # (True, None) bez potwierdzenia, (True, opis) gdy zastąpiona nowszą albo (False, opis).
+    # Liczy się tylko zakończenie własnego żądania - inne wysyłki i odczyty tych samych celów są pomijane
+    def __init__(self, syncs, parent=None):
+        super().__init__(parent)
+        self.syncs = syncs
+        self.results = {}
+        self.push_ids = {}
+        self.early = {}
+        self.connections = []
+
+    def start(self, values):
+        self.results = {}
+        self.push_ids = {}
+        self.early = {name: {} for name in self.syncs}
+        for name, sync in self.syncs.items():
+            self.connections.append((sync.completed, sync.completed.connect(
+                lambda push_id, ok, detail, name=name: self._completed(name, push_id, ok, detail))))
+        for name, sync in self.syncs.items():
+            push_id = sync.push(values)
+            if not push_id:
+                self._done(name, False, sync.client.send_error())
+                continue
+            self.push_ids[name] = push_id
+            # Wynik mógł przyjść jeszcze w trakcie push() (brak zmian, protokół bez potwierdzeń)
+            if push_id in self.early[name]:
+                self._done(name, *self.early[name].pop(push_id))
+
+    def _completed(self, name, push_id, ok, detail):
+        if name not in self.push_ids:
+            self.early[name][push_id] = (ok, detail)
+        elif push_id == self.push_ids[name]:
+            self._done(name, ok, detail)
+
+    def _done(self, name, ok, detail):
+        if name in self.results:
+            return
+        self.results[name] = (ok, detail)
+        if len(self.results) == len(self.syncs):
+            for signal, connection in self.connections:
+                signal.disconnect(connection)
+            self.connections = []
+            self.early = {}
+            self.finished.emit(self.results)
@@ -0,0 +1,125 @@
+import threading
+from PyQt6.QtCore import Qt, QThread
+from processing import TCPClient, CommandBuilder, DEFAULT_HOST, DEFAULT_PORT, STATE_CONNECTED
+from protocol import PROTOCOL_LEGACY
+from recorder import SessionRecorder
+from metrics import MetricsCollector
+from config_sync import ConfigSync
+from export import ExportWorker
+from telemetry import DEFAULT_CAPACITY
+from worker import TelemetryWorker, HISTORY_WINDOW
+
+CONFIG_FIELDS = [
+    "p_x", "i_x", "d_x", "p_y", "i_y", "d_y",
+    "max_speed_x", "max_speed_y", "tolerance_x", "tolerance_y",
+]
+DEFAULT_TOLERANCE = 0.01
+
+
+class AppContext:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, record=True, sessions_dir="sessions",
+                 protocol=PROTOCOL_LEGACY, buffer_capacity=DEFAULT_CAPACITY, spill_path=None,
+                 history_window=HISTORY_WINDOW, metrics_path=None, calibration=None):
+        self.client = TCPClient(host, port, protocol=protocol, calibration=calibration)
+        self.calibration = self.client.calibration
+        self.record = record
+        self.sessions_dir = sessions_dir
+        self.recorder = None
+        self.active_config = {}
+
+        self.worker = TelemetryWorker(self.tolerance, buffer_capacity, spill_path, history_window)
+        self.worker_thread = QThread()
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.start_timer)
+        # finished jest emitowany jeszcze w wątku workera, więc timer zatrzymujemy tam, gdzie powstał
+        self.worker_thread.finished.connect(self.worker.stop_timer, Qt.ConnectionType.DirectConnection)
+        self.client.batch_received.connect(self.worker.handle_batch)
+        self.client.setpoint_echo.connect(self.worker.set_setpoint)
+        self.metrics = MetricsCollector(self.client, self.worker, metrics_path)
+        self.config_sync = ConfigSync(self.client)
+
+    def set_active_config(self, values):
+        self.active_config = dict(zip(CONFIG_FIELDS, values))
+
+    def set_calibration(self, calibration):
+        self.calibration = calibration
+        self.client.calibration = calibration
+
+    def tolerance(self):
+        return (self.active_config.get("tolerance_x", DEFAULT_TOLERANCE),
+                self.active_config.get("tolerance_y", DEFAULT_TOLERANCE))
+
+    # Komendy bez widżetów - wspólne dla paneli GUI i trybu bez okna (control_server)
+    def send_goto(self, x, y):
+        if not self.client.send(CommandBuilder.build_goto_command(x, y)):
+            return False
+        self.worker.set_setpoint(x, y)
+        return True
+
+    def send_stop(self):
+        return self.client.send(CommandBuilder.build_stop_command(), urgent=True)
+
+    def send_manual(self, direction_code):
+        return self.client.send(CommandBuilder.build_manual_command(direction_code))
+
+    def send_analog(self, x, y):
+        return self.client.send(CommandBuilder.build_analog_manual_command(x, y))
+
+    def send_trajectory(self, coeffs_x, coeffs_y):
+        return self.client.send(CommandBuilder.build_trajectory_command(coeffs_x, coeffs_y))
+
+    def send_config(self, values):
+        # Wynik (potwierdzenie, opóźnienie albo błąd) przychodzi sygnałami config_sync
+        if self.client.state != STATE_CONNECTED:
+            return False
+        self.set_active_config(values)
+        self.config_sync.push_requested.emit(list(values))
+        return True
+
+    def read_config(self):
+        if self.client.state != STATE_CONNECTED or not self.config_sync.confirmed():
+            return False
+        self.config_sync.read_requested.emit()
+        return True
+
+    def start_recording(self):
+        if self.recorder is None:
+            self.recorder = SessionRecorder.create(self.sessions_dir)
+            self.client.recorder = self.recorder
+        return self.recorder.directory
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return None
+        directory = self.recorder.directory
+        self.client.recorder = None
+        self.recorder.close()
+        self.recorder = None
+        return directory
+
+    def export(self, file_path, finished, failed):
+        # Zapis w osobnym wątku; finished(liczba próbek) albo failed(opis) wywoływane w tym wątku
+        parts, start_time = self.worker.export_parts()
+        job = ExportWorker(parts, file_path, start_time)
+        samples = sum(len(part) for part in job.parts)
+        job.finished.connect(lambda _: finished(samples), Qt.ConnectionType.DirectConnection)
+        job.failed.connect(failed, Qt.ConnectionType.DirectConnection)
+        thread = threading.Thread(target=job.run, daemon=True)
+        thread.start()
+        return thread
+
+    def start(self):
+        if not self.worker_thread.isRunning():
+            self.worker_thread.start()
+        if self.record:
+            self.start_recording()
+        self.client.start()
+        self.metrics.start()
+
+    def stop(self):
+        self.metrics.stop()
+        self.client.stop()
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+        self.worker.close()
+        self.stop_recording()
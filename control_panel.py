@@ -1,15 +1,21 @@
 import struct
-import csv
 import time
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit, QHBoxLayout,
     QRadioButton, QButtonGroup, QGraphicsView, QGraphicsScene, QGraphicsEllipseItem,
-    QGridLayout, QStackedLayout, QFileDialog, QSpacerItem, QSizePolicy
+    QGridLayout, QStackedLayout, QFileDialog, QSpacerItem, QSizePolicy, QComboBox
 )
 from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QKeySequence, QShortcut
 import pyqtgraph as pg
 from math import sqrt
-from processing import CommandBuilder, tcp_client
+from processing import AnalogCommandScheduler, STATE_CONNECTED, STATE_CONNECTING
+from protocol import MANUAL_DIRECTIONS, CMD_GOTO, CMD_TRAJECTORY, CMD_CONFIG, LEGACY_COMMANDS
+from export import start_export
+from recorder import SessionReader, SessionReplayer
+from waypoints import WaypointQueue, load_waypoints
+from trajectory import evaluate_trajectory, horner, speed_violations
+from sidereal import TrackingStreamer, plan_tracking, segment_profile, MOUNT_ALTAZ, MOUNT_EQUATORIAL
 
 
 class JoystickWidget(QGraphicsView):
@@ -73,17 +79,32 @@ class JoystickWidget(QGraphicsView):
 
 
 class ControlPanel(QWidget):
-    def __init__(self):
+    def __init__(self, context):
         super().__init__()
-        self.client = tcp_client
-        self.client.data_received.connect(self.handle_data)
-
-        self.x_data = []
-        self.y_data = []
-        self.x_setpoint = []
-        self.y_setpoint = []
-
-        self.direction_map = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+        self.context = context
+        self.client = context.client
+        self.worker = context.worker
+        self.worker.oscillation_detected.connect(self.show_oscillation_warning)
+        self.client.state_changed.connect(self.update_connection_state)
+        self.client.stop_sent.connect(self.show_stop_latency)
+        self.metrics = context.metrics
+        self.metrics.sampled.connect(self.update_metrics_overlay)
+        self.plotted_version = -1
+        self.export_job = None
+        self.replayer = None
+        self.config_before_replay = {}
+
+        self.direction_map = MANUAL_DIRECTIONS
+        self.analog_scheduler = AnalogCommandScheduler(self.client, parent=self)
+        self.waypoint_queue = WaypointQueue(self.client, context.tolerance, parent=self)
+        self.waypoint_queue.waypoint_dispatched.connect(self.on_waypoint_dispatched)
+        self.waypoint_queue.waypoint_reached.connect(self.on_waypoint_reached)
+        self.waypoint_queue.failed.connect(self.on_waypoint_failed)
+        self.waypoint_queue.finished.connect(self.on_waypoints_finished)
+        self.waypoints_path = None
+        self.tracking = TrackingStreamer(self.client, parent=self)
+        self.tracking.segment_sent.connect(self.on_tracking_segment_sent)
+        self.tracking.finished.connect(self.on_tracking_finished)
 
         self.init_ui()
 
@@ -96,14 +117,30 @@ class ControlPanel(QWidget):
 
         self.graph_x = pg.PlotWidget(title="Pozycja X")
         self.curve_x = self.graph_x.plot(pen='b')
-        self.curve_x_setpoint = self.graph_x.plot(pen='r', symbol='x')
+        self.curve_x_setpoint = self.graph_x.plot(pen='r', connect='finite')
+        self.curve_x_trajectory = self.graph_x.plot(pen=pg.mkPen('r', style=Qt.PenStyle.DashLine))
         layout.addWidget(self.graph_x, stretch=2)
 
+        # Nakładka z metrykami wydajności w rogu wykresu X
+        self.metrics_overlay = QLabel(self.graph_x)
+        self.metrics_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: white; font-family: monospace; padding: 4px;")
+        self.metrics_overlay.move(60, 30)
+        self.metrics_overlay.hide()
+
         self.graph_y = pg.PlotWidget(title="Pozycja Y")
         self.curve_y = self.graph_y.plot(pen='b')
-        self.curve_y_setpoint = self.graph_y.plot(pen='r', symbol='x')
+        self.curve_y_setpoint = self.graph_y.plot(pen='r', connect='finite')
+        self.curve_y_trajectory = self.graph_y.plot(pen=pg.mkPen('r', style=Qt.PenStyle.DashLine))
         layout.addWidget(self.graph_y, stretch=2)
 
+        self.analytics_label = QLabel()
+        layout.addWidget(self.analytics_label)
+
+        self.oscillation_label = QLabel()
+        self.oscillation_label.setStyleSheet("color: red; font-weight: bold;")
+        layout.addWidget(self.oscillation_label)
+
         self.up_btn = QPushButton("↑")
         self.down_btn = QPushButton("↓")
         self.left_btn = QPushButton("←")
@@ -124,7 +161,11 @@ class ControlPanel(QWidget):
         joystick_and_buttons = QWidget()
         joystick_layout = QHBoxLayout()
         self.joystick = JoystickWidget(self.handle_joystick_move)
-        joystick_layout.addWidget(self.joystick)
+        self.joystick_stats = QLabel()
+        joystick_column = QVBoxLayout()
+        joystick_column.addWidget(self.joystick)
+        joystick_column.addWidget(self.joystick_stats)
+        joystick_layout.addLayout(joystick_column)
         joystick_layout.addWidget(self.nav_widget)
         joystick_and_buttons.setLayout(joystick_layout)
 
@@ -134,6 +175,9 @@ class ControlPanel(QWidget):
         # trajektoria widget
         self.coeff_inputs_x = [QLineEdit() for _ in range(5)]
         self.coeff_inputs_y = [QLineEdit() for _ in range(5)]
+        self.traj_duration = QLineEdit("1")
+        self.preview_traj_button = QPushButton("Podgląd trajektorii")
+        self.preview_traj_button.clicked.connect(self.preview_trajectory)
         self.send_traj_button = QPushButton("Zadaj trajektorię")
         self.send_traj_button.clicked.connect(self.send_trajectory)
 
@@ -160,8 +204,41 @@ class ControlPanel(QWidget):
         traj_y.addLayout(inputs_y)
         traj_layout.addLayout(traj_y)
 
+        duration_layout = QHBoxLayout()
+        duration_layout.addWidget(QLabel("Czas trwania T [s]:"))
+        duration_layout.addWidget(self.traj_duration)
+        traj_layout.addLayout(duration_layout)
+        traj_layout.addWidget(self.preview_traj_button)
         traj_layout.addWidget(self.send_traj_button)
 
+        # Śledzenie obiektu: tor rozbity na kolejne segmenty wielomianowe wysyłane na bieżąco
+        traj_layout.addWidget(QLabel("Śledzenie obiektu (RA [h], Dec [°], szer./dł. geogr. [°], czas [h])"))
+        self.track_ra = QLineEdit()
+        self.track_dec = QLineEdit()
+        self.track_lat = QLineEdit()
+        self.track_lon = QLineEdit()
+        self.track_hours = QLineEdit("8")
+        track_inputs = QGridLayout()
+        for i, (label, edit) in enumerate([("RA", self.track_ra), ("Dec", self.track_dec), ("Szer.", self.track_lat),
+                                           ("Dł.", self.track_lon), ("Czas", self.track_hours)]):
+            track_inputs.addWidget(QLabel(label), 0, i)
+            track_inputs.addWidget(edit, 1, i)
+        traj_layout.addLayout(track_inputs)
+        self.track_mount = QComboBox()
+        self.track_mount.addItem("Alt-az", MOUNT_ALTAZ)
+        self.track_mount.addItem("Paralaktyczny", MOUNT_EQUATORIAL)
+        traj_layout.addWidget(self.track_mount)
+        track_buttons = QHBoxLayout()
+        self.track_button = QPushButton("Planuj i śledź")
+        self.track_button.clicked.connect(self.start_tracking)
+        self.track_stop_button = QPushButton("Zatrzymaj śledzenie")
+        self.track_stop_button.clicked.connect(self.stop_tracking)
+        track_buttons.addWidget(self.track_button)
+        track_buttons.addWidget(self.track_stop_button)
+        traj_layout.addLayout(track_buttons)
+        self.tracking_label = QLabel()
+        traj_layout.addWidget(self.tracking_label)
+
         self.traj_widget = QWidget()
         self.traj_widget.setLayout(traj_layout)
 
@@ -175,8 +252,11 @@ class ControlPanel(QWidget):
 
         control_box = QVBoxLayout()
 
+        self.connection_label = QLabel()
+        control_box.addWidget(self.connection_label)
+
         self.reset_button = QPushButton("Resetuj wykres")
-        self.reset_button.clicked.connect(self.reset_plot)
+        self.reset_button.clicked.connect(lambda: self.reset_plot())
         control_box.addWidget(self.reset_button)
 
         self.home_button = QPushButton("Powrót do pozycji początkowej")
@@ -187,6 +267,25 @@ class ControlPanel(QWidget):
         self.save_button.clicked.connect(self.save_to_csv)
         control_box.addWidget(self.save_button)
 
+        self.analytics_button = QPushButton("Eksportuj analizę ruchów")
+        self.analytics_button.clicked.connect(self.save_analytics)
+        control_box.addWidget(self.analytics_button)
+
+        self.metrics_button = QPushButton("Metryki (F12)")
+        self.metrics_button.setCheckable(True)
+        self.metrics_button.toggled.connect(self.toggle_metrics_overlay)
+        control_box.addWidget(self.metrics_button)
+        QShortcut(QKeySequence("F12"), self, activated=self.metrics_button.toggle)
+
+        replay_layout = QHBoxLayout()
+        self.replay_button = QPushButton("Odtwórz nagranie")
+        self.replay_button.clicked.connect(self.replay_session)
+        self.replay_speed = QComboBox()
+        self.replay_speed.addItems(["1x", "2x", "10x", "100x"])
+        replay_layout.addWidget(self.replay_button)
+        replay_layout.addWidget(self.replay_speed)
+        control_box.addLayout(replay_layout)
+
         self.mode_group = QButtonGroup(self)
         self.angle_mode = QRadioButton("Sterowanie GOTO")
         self.dir_mode = QRadioButton("Sterowanie kierunkowe")
@@ -209,8 +308,19 @@ class ControlPanel(QWidget):
         input_layout.addWidget(self.y_input)
         input_layout.addWidget(self.send_button)
 
+        waypoints_layout = QHBoxLayout()
+        self.waypoints_button = QPushButton("Wczytaj listę punktów")
+        self.waypoints_button.clicked.connect(self.toggle_waypoints)
+        self.waypoints_label = QLabel()
+        waypoints_layout.addWidget(self.waypoints_button)
+        waypoints_layout.addWidget(self.waypoints_label)
+
+        goto_layout = QVBoxLayout()
+        goto_layout.addLayout(input_layout)
+        goto_layout.addLayout(waypoints_layout)
+
         self.goto_inputs_widget = QWidget()
-        self.goto_inputs_widget.setLayout(input_layout)
+        self.goto_inputs_widget.setLayout(goto_layout)
         control_box.addWidget(self.goto_inputs_widget)
 
         self.emergency_btn = QPushButton("⛔ EMERGENCY STOP ⛔")
@@ -235,16 +345,20 @@ class ControlPanel(QWidget):
 
         self.setup_navigation_buttons()
         self.update_nav_buttons_state()
+        self.update_connection_state(self.client.state)
 
     def setup_navigation_buttons(self):
         def make_move_handler(direction):
             direction_code = self.direction_map[direction]
-            return lambda: self.client.send(
-                CommandBuilder.build_manual_command(direction_code)) if self.dir_mode.isChecked() else None
+
+            def move():
+                if self.dir_mode.isChecked() and not self.context.send_manual(direction_code):
+                    print(f"Komenda {direction} nie została wysłana - {self.client.send_error()}")
+            return move
 
         def stop_move():
             if self.dir_mode.isChecked():
-                self.client.send(CommandBuilder.build_stop_command())
+                self.context.send_stop()
 
         for btn, cmd in zip(
                 [self.up_btn, self.down_btn, self.left_btn, self.right_btn],
@@ -270,82 +384,345 @@ class ControlPanel(QWidget):
         self.goto_inputs_widget.setVisible(is_goto)
         self.send_traj_button.setEnabled(is_traj)
 
-    def handle_data(self, data: bytes):
-        try:
-            x, y = struct.unpack('II', data)
-            self.x_data.append(x)
-            self.y_data.append(y)
-        except struct.error:
-            pass
+    def update_connection_state(self, state):
+        address = f"{self.client.host}:{self.client.port}"
+        if state == STATE_CONNECTED:
+            self.connection_label.setText(f"Połączono z {address}")
+            self.connection_label.setStyleSheet("color: green;")
+        elif state == STATE_CONNECTING:
+            self.connection_label.setText(f"Łączenie z {address}...")
+            self.connection_label.setStyleSheet("color: orange;")
+        else:
+            self.connection_label.setText(f"Brak połączenia z {address}")
+            self.connection_label.setStyleSheet("color: red;")
+
+    def update_link_stats(self):
+        decoder = self.client.decoder
+        if decoder.framed and (decoder.dropped or decoder.corrupt):
+            self.connection_label.setToolTip(
+                f"Utracone ramki: {decoder.dropped}, uszkodzone: {decoder.corrupt}, "
+                f"pominięte bajty: {decoder.skipped_bytes}")
+            self.connection_label.setStyleSheet("color: orange;")
 
     def update_plot(self):
-        self.curve_x.setData(self.x_data)
-        self.curve_y.setData(self.y_data)
-        self.curve_x_setpoint.setData(self.x_setpoint)
-        self.curve_y_setpoint.setData(self.y_setpoint)
+        self.worker.plot_width = self.graph_x.width()
+        snapshot = self.worker.snapshot
+        if snapshot is None or snapshot.version == self.plotted_version:
+            return
+        started = time.perf_counter()
+        self.plotted_version = snapshot.version
+        self.update_analytics_label(snapshot.moves)
+        self.update_link_stats()
+        curves = [self.curve_x, self.curve_y, self.curve_x_setpoint, self.curve_y_setpoint]
+        for i, curve in enumerate(curves):
+            curve.setData(snapshot.t, snapshot.values[:, i])
+        self.metrics.record_plot(time.perf_counter() - started)
+
+    def show_oscillation_warning(self, axis, frequency, rms):
+        name = "XY"[axis]
+        self.oscillation_label.setText(
+            f"⚠ Oscylacje osi {name}: {frequency:.1f} Hz, RMS {rms:.3g} - sprawdź nastawy PID "
+            f"({time.strftime('%H:%M:%S')})")
+        print(f"Oscylacje osi {name}: {frequency:.1f} Hz, RMS {rms:.3g}")
+
+    def toggle_metrics_overlay(self, visible):
+        self.metrics_overlay.setVisible(visible)
+        if visible and self.metrics.last:
+            self.update_metrics_overlay(self.metrics.last)
+
+    def update_metrics_overlay(self, sample):
+        if not self.metrics_overlay.isVisible():
+            return
+        commands = ", ".join(f"{key[4:-6]} {value:.0f}" for key, value in sample.items()
+                             if key.startswith("cmd_") and value)
+        self.metrics_overlay.setText(
+            f"ramki/s   {sample['frames_per_s']:10.0f}\n"
+            f"kB/s      {sample['bytes_per_s'] / 1024:10.1f}\n"
+            f"kolejka   {sample['queue_depth_frames']:10d}\n"
+            f"wykres ms {sample['plot_ms_p50']:5.1f} / {sample['plot_ms_p99']:.1f} (p50/p99)\n"
+            f"RSS MB    {sample['rss_mb']:10.1f}\n"
+            f"komendy/s {commands or '-'}")
+        self.metrics_overlay.adjustSize()
+
+    def update_analytics_label(self, moves):
+        if not moves:
+            self.analytics_label.setText("")
+            return
 
-    def reset_plot(self):
-        self.x_data.clear()
-        self.y_data.clear()
-        self.x_setpoint.clear()
-        self.y_setpoint.clear()
+        def fmt(value, unit=""):
+            return "-" if value is None else f"{value:.3g}{unit}"
+
+        lines = []
+        for summary in moves:
+            lines.append(
+                f"{summary['os']}: RMS {fmt(summary['blad RMS'])} | "
+                f"narastanie {fmt(summary['czas narastania (s)'], ' s')} | "
+                f"ustalanie {fmt(summary['czas ustalania (s)'], ' s')} | "
+                f"przeregulowanie {fmt(summary['przeregulowanie (%)'], '%')} | "
+                f"uchyb ustalony {fmt(summary['uchyb ustalony'])}")
+        self.analytics_label.setText("\n".join(lines))
+
+    def save_analytics(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Eksportuj analizę ruchów", "ruchy.csv", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        try:
+            self.worker.save_analytics(file_path)
+            print(f"Analiza zapisana do {file_path}")
+        except OSError as e:
+            print(f"Błąd zapisu analizy: {e}")
+
+    def reset_plot(self, start_time=None):
+        self.worker.clear(start_time)
+        self.oscillation_label.setText("")
+        for curve in [self.curve_x, self.curve_y, self.curve_x_setpoint, self.curve_y_setpoint]:
+            curve.clear()
+        self.curve_x_trajectory.clear()
+        self.curve_y_trajectory.clear()
 
     def send_angles(self):
         if self.angle_mode.isChecked():
             try:
                 x = float(self.x_input.text())
                 y = float(self.y_input.text())
-                cmd = CommandBuilder.build_goto_command(x, y)
-                self.client.send(cmd)
-                self.x_setpoint.append(x)
-                self.y_setpoint.append(y)
             except ValueError:
-                pass
+                return
+            if not self.context.send_goto(x, y):
+                print(f"Komenda GOTO nie została wysłana - {self.client.send_error()}")
+
+    def toggle_waypoints(self):
+        if self.waypoint_queue.active():
+            self.waypoint_queue.stop()
+            self.on_waypoints_finished()
+            return
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Wczytaj listę punktów", "", "Punkty (*.csv *.txt *.json)")
+        if not file_path:
+            return
+        try:
+            points = load_waypoints(file_path)
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            print(f"Błąd wczytywania punktów: {e}")
+            return
+        if not len(points):
+            return
+        self.waypoints_path = file_path
+        self.waypoint_queue.load(points)
+        self.waypoints_button.setText("Zatrzymaj kolejkę")
+        self.waypoint_queue.start()
+
+    def on_waypoint_dispatched(self, index, x, y):
+        self.worker.set_setpoint(x, y)
+        self.waypoints_label.setText(f"Punkt {index + 1}/{len(self.waypoint_queue.points)}")
+
+    def on_waypoint_reached(self, index, settle):
+        print(f"Punkt {index + 1} osiągnięty po {settle:.3f} s")
+
+    def on_waypoint_failed(self, index, reason):
+        print(f"Punkt {index + 1} nie został wysłany - {reason}, kolejka zatrzymana")
+        self.on_waypoints_finished()
+
+    def on_waypoints_finished(self):
+        self.waypoints_button.setText("Wczytaj listę punktów")
+        if self.waypoints_path and self.waypoint_queue.log:
+            log_path = self.waypoints_path + ".settle.csv"
+            self.waypoint_queue.save_log(log_path)
+            print(f"Czasy ustalania zapisane do {log_path}")
 
     def go_home_position(self):
-        cmd = CommandBuilder.build_goto_command(0.0, 0.0)
-        self.client.send(cmd)
+        if not self.context.send_goto(0.0, 0.0):
+            print(f"Komenda GOTO nie została wysłana - {self.client.send_error()}")
 
     def send_emergency_stop(self):
-        self.client.send(CommandBuilder.build_stop_command())
+        # Kolejka punktów działa w wątku transportu - zatrzymana przed STOP, żeby nie wysłała kolejnego GOTO
+        was_active = self.waypoint_queue.active()
+        self.waypoint_queue.stop()
+        if was_active:
+            self.on_waypoints_finished()
+        self.tracking.stop()
+        self.context.send_stop()
+
+    def show_stop_latency(self, latency):
+        stats = self.client.stop_latency_stats()
+        self.emergency_btn.setToolTip(
+            f"Ostatni STOP: {latency * 1000:.2f} ms (mediana {stats['median'] * 1000:.2f} ms, "
+            f"maks. {stats['max'] * 1000:.2f} ms), usunięte komendy ruchu: {self.client.purged_commands}")
 
     def save_to_csv(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Zapisz dane do CSV", "dane.csv", "CSV Files (*.csv)")
+        if self.export_job is not None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Zapisz dane do CSV", "dane.csv", "CSV Files (*.csv);;NumPy Files (*.npy)")
         if not file_path:
             return
+        parts, start_time = self.worker.export_parts()
+        self.export_job = start_export(self, parts, file_path, start_time)
+        _, worker = self.export_job
+        worker.progress.connect(self.on_export_progress)
+        worker.finished.connect(self.on_export_finished)
+        worker.failed.connect(self.on_export_failed)
+        self.save_button.setEnabled(False)
+
+    def on_export_progress(self, percent):
+        self.save_button.setText(f"Zapisywanie... {percent}%")
+
+    def on_export_finished(self, file_path):
+        self.export_job = None
+        self.save_button.setText("Zapisz dane do CSV")
+        self.save_button.setEnabled(True)
+        print(f"Dane zapisane do {file_path}")
+
+    def on_export_failed(self, message):
+        self.export_job = None
+        self.save_button.setText("Zapisz dane do CSV")
+        self.save_button.setEnabled(True)
+        print(f"Błąd zapisu CSV: {message}")
+
+    def replay_session(self):
+        if self.replayer is not None:
+            self.stop_replay()
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Wybierz nagranie", "sessions")
+        if not directory:
+            return
+        reader = SessionReader(directory)
+        if not len(reader):
+            print(f"Brak danych w nagraniu {directory}")
+            return
+        self.reset_plot(reader.times[0])
+        speed = float(self.replay_speed.currentText().rstrip("x"))
+        self.config_before_replay = self.context.active_config
+        self.replayer = SessionReplayer(reader, speed, calibration=self.context.calibration, parent=self)
+        self.replayer.batch_received.connect(self.worker.handle_batch)
+        self.replayer.command_replayed.connect(self.apply_replayed_command)
+        self.replayer.finished.connect(self.stop_replay)
+        self.replay_button.setText("Zatrzymaj odtwarzanie")
+        self.replayer.start()
+
+    def stop_replay(self):
+        self.replayer.stop()
+        self.replayer.deleteLater()
+        self.replayer = None
+        self.context.active_config = self.config_before_replay
+        self.replay_button.setText("Odtwórz nagranie")
+
+    def apply_replayed_command(self, message):
+        command = message[0] if message else None
+        if command not in (CMD_GOTO, CMD_TRAJECTORY, CMD_CONFIG):
+            return
         try:
-            with open(file_path, "w", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(["czas (s)", "index", "x", "y"])
-                start_time = time.time()
-                for i, (x, y) in enumerate(zip(self.x_data, self.y_data)):
-                    t = round(time.time() - start_time, 3)
-                    writer.writerow([t, i, x, y])
-            print(f"Dane zapisane do {file_path}")
-        except Exception as e:
-            print(f"Błąd zapisu CSV: {e}")
+            values = LEGACY_COMMANDS[command].unpack(message)[1:]
+        except struct.error:
+            return
+        if command == CMD_GOTO:
+            self.worker.set_setpoint(*values)
+        elif command == CMD_TRAJECTORY:
+            # Nagranie nie zawiera czasu trwania - jak przy wysyłaniu, czas z pola na panelu
+            try:
+                duration = float(self.traj_duration.text())
+            except ValueError:
+                return
+            self.worker.set_setpoint(float(horner(values[:5], duration)), float(horner(values[5:], duration)))
+        else:
+            # Tolerancje z nagrania dla analizy śledzenia; konfiguracja sprzed odtwarzania wraca w stop_replay
+            self.context.set_active_config(values)
+
+    def read_trajectory(self):
+        coeffs_x = [float(e.text()) for e in self.coeff_inputs_x]
+        coeffs_y = [float(e.text()) for e in self.coeff_inputs_y]
+        duration = float(self.traj_duration.text())
+        if duration <= 0:
+            raise ValueError("Czas trwania musi być dodatni")
+        return coeffs_x, coeffs_y, evaluate_trajectory(coeffs_x, coeffs_y, duration)
+
+    def show_trajectory(self, profile, start):
+        t = profile["t"] + start - self.worker.start_time
+        self.curve_x_trajectory.setData(t, profile["x"])
+        self.curve_y_trajectory.setData(t, profile["y"])
+
+    def preview_trajectory(self):
+        try:
+            _, _, profile = self.read_trajectory()
+        except ValueError:
+            print("Błędne współczynniki!")
+            return
+        self.show_trajectory(profile, time.time())
+        for message in self.trajectory_violations(profile):
+            print(message)
+
+    def trajectory_violations(self, profile):
+        config = self.context.active_config
+        return speed_violations(profile, config.get("max_speed_x"), config.get("max_speed_y"))
 
     def send_trajectory(self):
         try:
-            coeffs_x = [float(e.text()) for e in self.coeff_inputs_x]
-            coeffs_y = [float(e.text()) for e in self.coeff_inputs_y]
-            cmd = CommandBuilder.build_trajectory_command(coeffs_x, coeffs_y)
-            self.client.send(cmd)
-            x_final = sum(c * (1.0 ** i) for i, c in enumerate(coeffs_x))
-            y_final = sum(c * (1.0 ** i) for i, c in enumerate(coeffs_y))
-            self.x_setpoint.append(x_final)
-            self.y_setpoint.append(y_final)
-            print("Trajektoria wysłana")
+            coeffs_x, coeffs_y, profile = self.read_trajectory()
         except ValueError:
             print("Błędne współczynniki!")
+            return
+        violations = self.trajectory_violations(profile)
+        if violations:
+            for message in violations:
+                print(message)
+            print("Trajektoria nie została wysłana")
+            return
+        if not self.context.send_trajectory(coeffs_x, coeffs_y):
+            print(f"Trajektoria nie została wysłana - {self.client.send_error()}")
+            return
+        self.show_trajectory(profile, time.time())
+        self.worker.set_setpoint(profile["x"][-1], profile["y"][-1])
+        print("Trajektoria wysłana")
+
+    def start_tracking(self):
+        try:
+            ra = float(self.track_ra.text())
+            dec = float(self.track_dec.text())
+            latitude = float(self.track_lat.text())
+            longitude = float(self.track_lon.text())
+            duration = float(self.track_hours.text()) * 3600.0
+        except ValueError:
+            print("Błędne parametry śledzenia!")
+            return
+        if duration <= 0:
+            print("Czas śledzenia musi być dodatni")
+            return
+        self.tracking.stop()
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            t, path, segments = plan_tracking(ra, dec, latitude, longitude, start, duration,
+                                              self.context.tolerance(), self.track_mount.currentData())
+        except ValueError as e:
+            print(f"Śledzenie nie zostało uruchomione: {e}")
+            return
+        fit_time = time.perf_counter() - started
+        profile = segment_profile(t, path)
+        violations = self.trajectory_violations(profile)
+        if violations:
+            for message in violations:
+                print(message)
+            print("Śledzenie nie zostało uruchomione")
+            return
+        self.show_trajectory(profile, start)
+        self.tracking_label.setText(f"{len(segments)} segmentów, dopasowanie {fit_time * 1000:.0f} ms")
+        self.tracking.start(segments, start)
+
+    def stop_tracking(self):
+        if self.tracking.active():
+            self.tracking.stop()
+            self.tracking_label.setText("Śledzenie przerwane")
+
+    def on_tracking_segment_sent(self, index):
+        segment = self.tracking.segments[index]
+        self.worker.set_setpoint(*segment.end_position())
+        self.tracking_label.setText(f"Wysłano segment {index + 1}/{len(self.tracking.segments)}")
+
+    def on_tracking_finished(self):
+        self.tracking_label.setText("Śledzenie zakończone")
 
     def handle_joystick_move(self, norm_x, norm_y):
         if self.dir_mode.isChecked():
-            if abs(norm_x) < 0.01 and abs(norm_y) < 0.01:
-                self.client.send(CommandBuilder.build_stop_command())
-            else:
-                self.client.send(CommandBuilder.build_analog_manual_command(norm_x, norm_y))
-
-    def closeEvent(self, event):
-        self.client.stop()
-        super().closeEvent(event)
+            self.analog_scheduler.set_vector(norm_x, norm_y)
+            if not self.analog_scheduler.timer.isActive():
+                self.joystick_stats.setText(
+                    f"Wysłane: {self.analog_scheduler.sent}, pominięte: {self.analog_scheduler.coalesced}")
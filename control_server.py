@@ -0,0 +1,350 @@
+import json
+import struct
+import socket
+import selectors
+import numpy as np
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from processing import SelectorLoop, STATE_CONNECTED
+from protocol import MANUAL_DIRECTIONS
+from context import CONFIG_FIELDS
+from metrics import COMMAND_NAMES
+
+CONTROL_HOST = "127.0.0.1"
+DEFAULT_CONTROL_PORT = 8765
+RECV_SIZE = 64 * 1024
+MAX_REQUEST_BYTES = 1024 * 1024
+# Subskrybent, który nie nadąża, traci paczki telemetrii, ale nigdy odpowiedzi na żądania
+MAX_SESSION_BACKLOG = 8 * 1024 * 1024
+SUBSCRIPTION_INTERVAL = 0.05
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+NOT_CONNECTED = -32000
+SERVER_ERROR = -32001
+QUEUE_FULL = -32002
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class DeferredResult:
+    # Wynik metody kończącej się poza pętlą serwera (np. eksport) - odpowiedź wysyłana później
+    def __init__(self):
+        self.respond = None
+
+    def resolve(self, message):
+        if self.respond is not None:
+            self.respond(message)
+
+
+class ControlSession:
+    def __init__(self, sock):
+        self.socket = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.subscribed = False
+        self.decimate = 1
+        self.dropped_batches = 0
+
+
+class ControlServer(QObject):
+    shutdown_requested = pyqtSignal()
+
+    # JSON-RPC 2.0, jedna wiadomość JSON na linię, tylko na localhost. Działa na własnej pętli
+    # selectors, żeby kodowanie JSON nie opóźniało odbioru telemetrii przez TCPClient.
+    def __init__(self, context, host=CONTROL_HOST, port=DEFAULT_CONTROL_PORT, parent=None):
+        super().__init__(parent)
+        self.context = context
+        self.host = host
+        self.requested_port = port
+        self.loop = SelectorLoop()
+        self.server = None
+        self.sessions = {}
+        self.pending_batches = []
+        self.flush_scheduled = False
+        self.requests_handled = 0
+        self.methods = {
+            "goto": self.rpc_goto,
+            "stop": self.rpc_stop,
+            "manual": self.rpc_manual,
+            "analog": self.rpc_analog,
+            "trajectory": self.rpc_trajectory,
+            "config": self.rpc_config,
+            "status": self.rpc_status,
+            "subscribe": self.rpc_subscribe,
+            "unsubscribe": self.rpc_unsubscribe,
+            "record_start": self.rpc_record_start,
+            "record_stop": self.rpc_record_stop,
+            "export": self.rpc_export,
+            "shutdown": self.rpc_shutdown,
+        }
+
+    @property
+    def port(self):
+        return self.server.getsockname()[1]
+
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.requested_port))
+        self.server.listen()
+        self.server.setblocking(False)
+        self.loop.selector.register(self.server, selectors.EVENT_READ, self._on_accept)
+        self.context.client.batch_received.connect(self.on_batch, Qt.ConnectionType.DirectConnection)
+        self.loop.start()
+
+    def stop(self):
+        self.context.client.batch_received.disconnect(self.on_batch)
+        self.loop.call_soon(self._shutdown)
+        self.loop.call_soon(self.loop.stop)
+        if self.loop.thread is not None:
+            self.loop.thread.join(timeout=2.0)
+
+    def _shutdown(self):
+        for session in list(self.sessions.values()):
+            self._close_session(session)
+        if self.server is not None:
+            self.loop.selector.unregister(self.server)
+            self.server.close()
+            self.server = None
+
+    def _on_accept(self, mask):
+        try:
+            sock, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = ControlSession(sock)
+        self.sessions[sock.fileno()] = session
+        self.loop.selector.register(sock, selectors.EVENT_READ, lambda mask: self._on_session_event(session, mask))
+
+    def _close_session(self, session):
+        self.sessions.pop(session.socket.fileno(), None)
+        self.loop.selector.unregister(session.socket)
+        session.socket.close()
+
+    def _on_session_event(self, session, mask):
+        try:
+            if mask & selectors.EVENT_READ:
+                data = session.socket.recv(RECV_SIZE)
+                if not data:
+                    self._close_session(session)
+                    return
+                session.inbox += data
+                self._handle_lines(session)
+        except BlockingIOError:
+            pass
+        except (ConnectionError, OSError):
+            self._close_session(session)
+            return
+        # Odpowiedzi wysyłane od razu, bez czekania na kolejny obrót pętli
+        self._send_pending(session)
+
+    def _send_pending(self, session):
+        if session.socket.fileno() not in self.sessions:
+            return
+        try:
+            if session.outbox:
+                sent = session.socket.send(session.outbox)
+                del session.outbox[:sent]
+        except BlockingIOError:
+            pass
+        except (ConnectionError, OSError):
+            self._close_session(session)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if session.outbox else 0)
+        self.loop.selector.modify(session.socket, events, lambda mask: self._on_session_event(session, mask))
+
+    def _write(self, session, message):
+        session.outbox += json.dumps(message).encode() + b"\n"
+
+    def _handle_lines(self, session):
+        while True:
+            end = session.inbox.find(b"\n")
+            if end < 0:
+                if len(session.inbox) > MAX_REQUEST_BYTES:
+                    self._write(session, self._error(None, INVALID_REQUEST, "Żądanie za długie"))
+                    session.inbox.clear()
+                return
+            line = bytes(session.inbox[:end]).strip()
+            del session.inbox[:end + 1]
+            if line:
+                response = self._dispatch(session, line)
+                if response is not None:
+                    self._write(session, response)
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    def _dispatch(self, session, line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self._error(None, PARSE_ERROR, str(e))
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self._error(None, INVALID_REQUEST, "Brak pola method")
+        request_id = request.get("id")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return self._error(request_id, METHOD_NOT_FOUND, f"Nieznana metoda {request['method']}")
+        params = request.get("params", [])
+        self.requests_handled += 1
+        try:
+            if isinstance(params, dict):
+                result = method(session, **params)
+            else:
+                result = method(session, *params)
+        except RpcError as e:
+            return self._error(request_id, e.code, str(e))
+        except (TypeError, ValueError, KeyError, struct.error) as e:
+            return self._error(request_id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            # Błąd jednego żądania nie może zatrzymać pętli serwera (a z nią komendy stop)
+            return self._error(request_id, SERVER_ERROR, f"{type(e).__name__}: {e}")
+        # Powiadomienia (bez id) nie dostają odpowiedzi - pozwala to wysyłać strumień komend bez czekania
+        if "id" not in request:
+            return None
+        if isinstance(result, DeferredResult):
+            result.respond = lambda message: self._respond_later(session, request_id, message)
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _respond_later(self, session, request_id, message):
+        self._write(session, dict({"jsonrpc": "2.0", "id": request_id}, **message))
+        self._send_pending(session)
+
+    def _sent(self, ok):
+        if not ok:
+            if self.context.client.state != STATE_CONNECTED:
+                raise RpcError(NOT_CONNECTED, "Brak połączenia z kontrolerem")
+            raise RpcError(QUEUE_FULL, "Kolejka komend kontrolera pełna, komenda odrzucona")
+        return True
+
+    @staticmethod
+    def _numbers(values):
+        # Sprawdzenie przed pakowaniem - struct zamienia liczby spoza zakresu float32 na inf
+        numbers = [float(value) for value in values]
+        if not all(abs(number) <= FLOAT32_MAX for number in numbers):
+            raise RpcError(INVALID_PARAMS, "Wartości muszą być skończonymi liczbami w zakresie float32")
+        return numbers
+
+    def rpc_goto(self, session, x, y):
+        return self._sent(self.context.send_goto(*self._numbers((x, y))))
+
+    def rpc_stop(self, session):
+        return self._sent(self.context.send_stop())
+
+    def rpc_manual(self, session, direction):
+        # Kod kierunku albo jego nazwa (UP, DOWN, LEFT, RIGHT)
+        code = MANUAL_DIRECTIONS.get(direction) if isinstance(direction, str) else int(direction)
+        if code not in MANUAL_DIRECTIONS.values():
+            raise RpcError(INVALID_PARAMS, f"Nieznany kierunek {direction}, dozwolone: {', '.join(MANUAL_DIRECTIONS)}")
+        return self._sent(self.context.send_manual(code))
+
+    def rpc_analog(self, session, x, y):
+        return self._sent(self.context.send_analog(*self._numbers((x, y))))
+
+    def rpc_trajectory(self, session, coeffs_x, coeffs_y):
+        return self._sent(self.context.send_trajectory(self._numbers(coeffs_x), self._numbers(coeffs_y)))
+
+    def rpc_config(self, session, values):
+        if isinstance(values, dict):
+            unknown = [field for field in values if field not in CONFIG_FIELDS]
+            if unknown:
+                raise RpcError(INVALID_PARAMS, f"Nieznane pola konfiguracji: {', '.join(unknown)}")
+            # Część pól - reszta z aktywnej konfiguracji
+            merged = dict(self.context.active_config, **values)
+            missing = [field for field in CONFIG_FIELDS if field not in merged]
+            if missing:
+                raise RpcError(INVALID_PARAMS, f"Brak aktywnej konfiguracji dla pól: {', '.join(missing)}")
+            values = [merged[field] for field in CONFIG_FIELDS]
+        if len(values) != len(CONFIG_FIELDS):
+            raise RpcError(INVALID_PARAMS, f"Wymagane {len(CONFIG_FIELDS)} wartości konfiguracji")
+        return self._sent(self.context.send_config(self._numbers(values)))
+
+    def rpc_status(self, session):
+        client = self.context.client
+        return {
+            "state": client.state,
+            "frames_received": client.frames_received,
+            "commands_sent": {COMMAND_NAMES[command]: count for command, count in client.commands_sent.items()},
+            "dropped_commands": client.dropped_commands,
+            "rejected_commands": client.rejected_commands,
+            "active_config": self.context.active_config,
+            "config_acked": self.context.config_sync.acked,
+            "config_pending": self.context.config_sync.push_request is not None,
+            "recording": self.context.recorder.directory if self.context.recorder else None,
+            "metrics": self.context.metrics.last,
+        }
+
+    def rpc_subscribe(self, session, decimate=1):
+        session.subscribed = True
+        session.decimate = max(1, int(decimate))
+        return {"interval": SUBSCRIPTION_INTERVAL, "decimate": session.decimate}
+
+    def rpc_unsubscribe(self, session):
+        session.subscribed = False
+        return {"dropped_batches": session.dropped_batches}
+
+    def rpc_record_start(self, session):
+        return {"directory": self.context.start_recording()}
+
+    def rpc_record_stop(self, session):
+        return {"directory": self.context.stop_recording()}
+
+    def rpc_export(self, session, path):
+        # Eksport w osobnym wątku, żeby nie blokował pętli (i komendy stop); odpowiedź po zakończeniu
+        deferred = DeferredResult()
+        self.context.export(
+            str(path),
+            lambda samples: self.loop.call_soon(lambda: deferred.resolve({"result": {"samples": samples}})),
+            lambda message: self.loop.call_soon(lambda: deferred.resolve(
+                {"error": {"code": SERVER_ERROR, "message": message}})))
+        return deferred
+
+    def rpc_shutdown(self, session):
+        # Sygnał dopiero po wysłaniu odpowiedzi, bo zamknięcie aplikacji zamyka też gniazda sesji
+        self.loop.call_soon(self.shutdown_requested.emit)
+        return True
+
+    def on_batch(self, timestamps, frames):
+        # Wywoływane w wątku pętli TCPClient; paczki zbierane i wysyłane co SUBSCRIPTION_INTERVAL
+        self.loop.call_soon(lambda: self._queue_batch(timestamps, frames))
+
+    def _queue_batch(self, timestamps, frames):
+        if not any(session.subscribed for session in self.sessions.values()):
+            return
+        self.pending_batches.append((timestamps, frames))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_later(SUBSCRIPTION_INTERVAL, self._flush_batches)
+
+    def _flush_batches(self):
+        self.flush_scheduled = False
+        if not self.pending_batches:
+            return
+        t = np.concatenate([batch[0] for batch in self.pending_batches])
+        frames = np.concatenate([batch[1] for batch in self.pending_batches])
+        self.pending_batches = []
+        encoded = {}
+        for session in list(self.sessions.values()):
+            if not session.subscribed:
+                continue
+            if len(session.outbox) > MAX_SESSION_BACKLOG:
+                session.dropped_batches += 1
+                continue
+            if session.decimate not in encoded:
+                step = session.decimate
+                message = {"jsonrpc": "2.0", "method": "telemetry", "params": {
+                    "t": t[::step].tolist(), "x": frames[::step, 0].tolist(), "y": frames[::step, 1].tolist()}}
+                encoded[step] = json.dumps(message).encode() + b"\n"
+            session.outbox += encoded[session.decimate]
+            self._send_pending(session)
@@ -0,0 +1,75 @@
+import numpy as np
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from telemetry import SAMPLE_DTYPE
+
+CSV_HEADER = "czas (s),index,x,y,x_zadane,y_zadane\n"
+CSV_ROW = "%.6f,%d,%r,%r,%r,%r\n"
+CHUNK_SIZE = 100_000
+
+
+class ExportWorker(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parts, file_path, start_time, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.parts = [part for part in parts if len(part)]
+        self.file_path = file_path
+        self.start_time = start_time
+        self.chunk_size = chunk_size
+
+    def run(self):
+        try:
+            if self.file_path.endswith(".npy"):
+                self.write_npy()
+            else:
+                self.write_csv()
+            self.finished.emit(self.file_path)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def chunks(self):
+        total = sum(len(part) for part in self.parts)
+        done = 0
+        for part in self.parts:
+            for start in range(0, len(part), self.chunk_size):
+                chunk = part[start:start + self.chunk_size]
+                yield done, chunk
+                done += len(chunk)
+                self.progress.emit(int(100 * done / total))
+
+    def write_csv(self):
+        with open(self.file_path, "w", newline="") as file:
+            file.write(CSV_HEADER)
+            for index, chunk in self.chunks():
+                block = np.column_stack((
+                    chunk['t'] - self.start_time,
+                    np.arange(index, index + len(chunk)),
+                    chunk['x'], chunk['y'], chunk['x_setpoint'], chunk['y_setpoint'],
+                ))
+                # Jedno formatowanie na cały blok zamiast osobnego writerow na każdą próbkę
+                file.write((CSV_ROW * len(block)) % tuple(block.ravel().tolist()))
+
+    def write_npy(self):
+        total = sum(len(part) for part in self.parts)
+        if not total:
+            np.save(self.file_path, np.empty(0, dtype=SAMPLE_DTYPE))
+            return
+        out = np.lib.format.open_memmap(self.file_path, mode="w+", dtype=SAMPLE_DTYPE, shape=(total,))
+        for index, chunk in self.chunks():
+            out[index:index + len(chunk)] = chunk
+        out.flush()
+        del out
+
+
+def start_export(parent, parts, file_path, start_time):
+    thread = QThread(parent)
+    worker = ExportWorker(parts, file_path, start_time)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.failed.connect(thread.quit)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread, worker
@@ -1,34 +1,67 @@
+import time
+
+STARTUP_T0 = time.perf_counter()
+
+import os
 import sys
+import json
+import signal
+import argparse
 from PyQt6.QtWidgets import QApplication, QWidget, QPushButton, QHBoxLayout, QVBoxLayout, QStackedWidget
+from PyQt6.QtCore import QCoreApplication, QTimer
 from control_panel import ControlPanel
-from settings_panel import SettingsPanel
+from context import AppContext
+from processing import DEFAULT_HOST, DEFAULT_PORT
+from protocol import PROTOCOL_LEGACY, PROTOCOL_FRAMED
+from control_server import ControlServer, DEFAULT_CONTROL_PORT
+from calibration import load_calibration, DEFAULT_CALIBRATION_PATH
+
+IMPORTS_DONE = time.perf_counter()
 
 
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, context, mount_manager=None):
         super().__init__()
         self.setWindowTitle("Goniometr - GUI")
+        self.context = context
+        self.mount_manager = mount_manager
+        self.mounts_view = None
 
         self.stack = QStackedWidget()
-        self.control_panel = ControlPanel()
-        self.settings_panel = SettingsPanel()
+        self.control_panel = ControlPanel(context)
+        self.settings_panel = None
+        self.spectrum_panel = None
+        self.comparison_panel = None
 
         self.stack.addWidget(self.control_panel)
-        self.stack.addWidget(self.settings_panel)
 
         self.control_btn = QPushButton("Sterowanie")
         self.settings_btn = QPushButton("Ustawienia")
+        self.spectrum_btn = QPushButton("Widmo")
+        self.comparison_btn = QPushButton("Porównanie")
 
         self.control_btn.setCheckable(True)
         self.settings_btn.setCheckable(True)
+        self.spectrum_btn.setCheckable(True)
+        self.comparison_btn.setCheckable(True)
         self.control_btn.setChecked(True)
 
         self.control_btn.clicked.connect(self.show_control_panel)
         self.settings_btn.clicked.connect(self.show_settings_panel)
+        self.spectrum_btn.clicked.connect(self.show_spectrum_panel)
+        self.comparison_btn.clicked.connect(self.show_comparison_panel)
 
         button_layout = QVBoxLayout()
         button_layout.addWidget(self.control_btn)
         button_layout.addWidget(self.settings_btn)
+        button_layout.addWidget(self.spectrum_btn)
+        button_layout.addWidget(self.comparison_btn)
+        self.mounts_btn = None
+        if mount_manager is not None:
+            self.mounts_btn = QPushButton("Montaże")
+            self.mounts_btn.setCheckable(True)
+            self.mounts_btn.clicked.connect(self.show_mounts_view)
+            button_layout.addWidget(self.mounts_btn)
         button_layout.addStretch()
 
         main_layout = QHBoxLayout()
@@ -39,17 +72,142 @@ class MainWindow(QWidget):
 
     def show_control_panel(self):
         self.stack.setCurrentWidget(self.control_panel)
-        self.control_btn.setChecked(True)
-        self.settings_btn.setChecked(False)
+        self.update_buttons(self.control_btn)
 
     def show_settings_panel(self):
+        # Panel ustawień tworzony dopiero przy pierwszym wyświetleniu
+        if self.settings_panel is None:
+            from settings_panel import SettingsPanel
+            self.settings_panel = SettingsPanel(self.context)
+            self.stack.addWidget(self.settings_panel)
         self.stack.setCurrentWidget(self.settings_panel)
-        self.settings_btn.setChecked(True)
-        self.control_btn.setChecked(False)
+        self.update_buttons(self.settings_btn)
+
+    def show_spectrum_panel(self):
+        if self.spectrum_panel is None:
+            from spectrum_panel import SpectrumPanel
+            self.spectrum_panel = SpectrumPanel(self.context)
+            self.stack.addWidget(self.spectrum_panel)
+        self.stack.setCurrentWidget(self.spectrum_panel)
+        self.update_buttons(self.spectrum_btn)
+
+    def show_comparison_panel(self):
+        if self.comparison_panel is None:
+            from comparison_panel import ComparisonPanel
+            self.comparison_panel = ComparisonPanel(self.context)
+            self.stack.addWidget(self.comparison_panel)
+        self.stack.setCurrentWidget(self.comparison_panel)
+        self.update_buttons(self.comparison_btn)
+
+    def show_mounts_view(self):
+        if self.mounts_view is None:
+            from mounts import MountGridView
+            self.mounts_view = MountGridView(self.context, self.mount_manager)
+            self.stack.addWidget(self.mounts_view)
+        self.stack.setCurrentWidget(self.mounts_view)
+        self.update_buttons(self.mounts_btn)
+
+    def update_buttons(self, current):
+        for button in [self.control_btn, self.settings_btn, self.spectrum_btn, self.comparison_btn,
+                       self.mounts_btn]:
+            if button is not None:
+                button.setChecked(button is current)
+
+
+class StartupReport:
+    def __init__(self, client, exit_after_first_frame=False):
+        self.times = {"imports_s": IMPORTS_DONE - STARTUP_T0}
+        self.exit_after_first_frame = exit_after_first_frame
+        self.client = client
+        client.batch_received.connect(self.on_first_frame)
+
+    def mark(self, name):
+        self.times[name] = time.perf_counter() - STARTUP_T0
+
+    def on_first_frame(self, timestamps, frames):
+        self.client.batch_received.disconnect(self.on_first_frame)
+        self.mark("first_frame_s")
+        print(json.dumps(self.times), flush=True)
+        if self.exit_after_first_frame:
+            QCoreApplication.instance().quit()
+
+
+def open_calibration(path, required=True):
+    # Bez pliku kalibracji zostaje domyślne przeliczenie COUNTS_PER_DEGREE bez poprawki
+    if not path or (not required and not os.path.exists(path)):
+        return None
+    try:
+        return load_calibration(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Nie wczytano kalibracji {path}: {e}")
+        return None
+
+
+def run_headless(args, qt_args):
+    # Bez okna: rdzeń komend i telemetrii sterowany przez lokalny serwer JSON-RPC
+    app = QCoreApplication(sys.argv[:1] + qt_args)
+    calibration = open_calibration(args.calibration, args.calibration != DEFAULT_CALIBRATION_PATH)
+    context = AppContext(args.host, args.port, record=not args.no_record, protocol=args.protocol,
+                         metrics_path=args.metrics_file, calibration=calibration)
+    server = ControlServer(context, port=args.control_port)
+    server.shutdown_requested.connect(app.quit)
+    server.start()
+    print(f"Serwer sterowania nasłuchuje na {server.host}:{server.port}", flush=True)
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    # Pętla Qt nie oddaje sterowania Pythonowi, więc sygnały są obsługiwane przy tym timerze
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(200)
+    context.start()
+    code = app.exec()
+    server.stop()
+    context.stop()
+    return code
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--protocol", choices=[PROTOCOL_LEGACY, PROTOCOL_FRAMED], default=PROTOCOL_LEGACY)
+    parser.add_argument("--no-record", action="store_true")
+    parser.add_argument("--calibration", default=DEFAULT_CALIBRATION_PATH,
+                        help="plik kalibracji enkoderów (calibration.py), domyślnie jeśli istnieje")
+    parser.add_argument("--mounts", help="plik JSON z listą montaży [{name, host, port, calibration?}, ...]")
+    parser.add_argument("--metrics-file", help="plik metryk (.csv lub JSON lines), rotowany po 5 MB")
+    parser.add_argument("--startup-report", action="store_true")
+    parser.add_argument("--exit-after-first-frame", action="store_true")
+    parser.add_argument("--headless", action="store_true", help="bez okna, sterowanie przez --control-port")
+    parser.add_argument("--control-port", type=int, default=DEFAULT_CONTROL_PORT,
+                        help="port lokalnego serwera JSON-RPC w trybie --headless (0 = dowolny wolny)")
+    args, qt_args = parser.parse_known_args()
+    if args.headless:
+        sys.exit(run_headless(args, qt_args))
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    calibration = open_calibration(args.calibration, args.calibration != DEFAULT_CALIBRATION_PATH)
+    context = AppContext(args.host, args.port, record=not args.no_record, protocol=args.protocol,
+                         metrics_path=args.metrics_file, calibration=calibration)
+    report = None
+    if args.startup_report or args.exit_after_first_frame:
+        report = StartupReport(context.client, args.exit_after_first_frame)
+    mount_manager = None
+    if args.mounts:
+        from mounts import MountManager, load_mounts
+        mount_manager = MountManager(args.protocol)
+        for name, host, port, calibration_path in load_mounts(args.mounts):
+            mount_manager.add_mount(name, host, port, open_calibration(calibration_path))
+    window = MainWindow(context, mount_manager)
     window.showMaximized()
-    sys.exit(app.exec())
+    if report:
+        report.mark("window_shown_s")
+    # Połączenie dopiero po wyświetleniu okna, więc sieć nie opóźnia startu
+    QTimer.singleShot(0, context.start)
+    if mount_manager is not None:
+        QTimer.singleShot(0, mount_manager.start)
+    code = app.exec()
+    context.stop()
+    if mount_manager is not None:
+        mount_manager.stop()
+    sys.exit(code)
@@ -0,0 +1,130 @@
+import os
+import csv
+import json
+import time
+from collections import deque
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from protocol import CMD_STOP, CMD_GOTO, CMD_MANUAL, CMD_ANALOG, CMD_TRAJECTORY, CMD_CONFIG
+
+SAMPLE_INTERVAL_MS = 1000
+PLOT_TIMES_KEPT = 512
+MAX_FILE_BYTES = 5 * 2 ** 20
+BACKUP_COUNT = 3
+COMMAND_NAMES = {
+    CMD_STOP: "stop",
+    CMD_GOTO: "goto",
+    CMD_MANUAL: "manual",
+    CMD_ANALOG: "analog",
+    CMD_TRAJECTORY: "trajectory",
+    CMD_CONFIG: "config",
+}
+METRIC_FIELDS = [
+    "time", "frames_per_s", "bytes_per_s", "queue_depth_frames", "plot_ms_p50", "plot_ms_p99",
+    "plot_ms_max", "rss_mb",
+] + [f"cmd_{name}_per_s" for name in COMMAND_NAMES.values()]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RollingMetricsFile:
+    # Format według rozszerzenia: .csv albo JSON lines; po przekroczeniu max_bytes plik
+    # przechodzi na .1, .2, ... i zapis zaczyna się od nowa
+    def __init__(self, path, max_bytes=MAX_FILE_BYTES, backups=BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.csv = path.lower().endswith(".csv")
+
+    def write(self, sample):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a", newline="") as f:
+            if self.csv:
+                writer = csv.DictWriter(f, fieldnames=METRIC_FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(sample)
+            else:
+                f.write(json.dumps(sample) + "\n")
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class MetricsCollector(QObject):
+    sampled = pyqtSignal(dict)
+
+    # Próbkuje liczniki klienta i workera raz na interval_ms; koszt nie zależy od liczby ramek
+    def __init__(self, client, worker, path=None, interval_ms=SAMPLE_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.worker = worker
+        self.output = RollingMetricsFile(path) if path else None
+        self.plot_times = deque(maxlen=PLOT_TIMES_KEPT)
+        self.last = None
+        self.previous = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sample)
+        self.interval_ms = interval_ms
+
+    def start(self):
+        self.previous = self._counters()
+        self.timer.start(self.interval_ms)
+
+    def stop(self):
+        self.timer.stop()
+
+    def record_plot(self, duration):
+        self.plot_times.append(duration)
+
+    def _counters(self):
+        return (time.perf_counter(), self.client.frames_received, self.client.decoder.bytes_received,
+                dict(self.client.commands_sent))
+
+    def sample(self):
+        current = self._counters()
+        if self.previous is None:
+            self.previous = current
+            return None
+        elapsed = max(current[0] - self.previous[0], 1e-9)
+        plot_ms = np.array(self.plot_times or [0.0]) * 1000
+        self.plot_times.clear()
+        sample = {
+            "time": time.time(),
+            "frames_per_s": (current[1] - self.previous[1]) / elapsed,
+            "bytes_per_s": (current[2] - self.previous[2]) / elapsed,
+            "queue_depth_frames": self.client.frames_emitted - self.worker.processed,
+            "plot_ms_p50": float(np.percentile(plot_ms, 50)),
+            "plot_ms_p99": float(np.percentile(plot_ms, 99)),
+            "plot_ms_max": float(plot_ms.max()),
+            "rss_mb": rss_bytes() / 2 ** 20,
+        }
+        for command, name in COMMAND_NAMES.items():
+            sent = current[3].get(command, 0) - self.previous[3].get(command, 0)
+            sample[f"cmd_{name}_per_s"] = sent / elapsed
+        self.previous = current
+        self.last = sample
+        if self.output is not None:
+            try:
+                self.output.write(sample)
+            except OSError as e:
+                print(f"Nie udało się zapisać metryk do {self.output.path}: {e}")
+                self.output = None
+        self.sampled.emit(sample)
+        return sample
@@ -0,0 +1,249 @@
+import json
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QLabel, QCheckBox, QScrollArea, QMessageBox
+)
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QMetaObject
+import pyqtgraph as pg
+from processing import TCPClient, SelectorLoop, CommandBuilder, STATE_CONNECTED, STATE_CONNECTING
+from protocol import PROTOCOL_LEGACY
+from context import CONFIG_FIELDS, DEFAULT_TOLERANCE
+from worker import TelemetryWorker
+from config_sync import ConfigSync, ParallelConfigPush
+
+MOUNT_BUFFER_CAPACITY = 100_000
+MOUNT_HISTORY_WINDOW = 1.0
+# Paczki z wielu gniazd sklejane co 20 ms - mniej sygnałów do wspólnego wątku workerów
+MOUNT_BATCH_INTERVAL = 0.02
+GRID_COLUMNS = 4
+GRID_REFRESH_MS = 200
+
+
+def load_mounts(path):
+    # [{"name": "M1", "host": "192.168.1.10", "port": 2137, "calibration": "calibration/m1.json"}, ...]
+    with open(path, "r") as f:
+        entries = json.load(f)
+    return [(entry["name"], entry["host"], int(entry["port"]), entry.get("calibration")) for entry in entries]
+
+
+class Mount:
+    def __init__(self, name, client, worker, config_sync):
+        self.name = name
+        self.client = client
+        self.worker = worker
+        self.config_sync = config_sync
+
+
+class MountManager(QObject):
+    # Wszystkie gniazda obsługuje jedna pętla selectors, a przetwarzanie telemetrii wszystkich
+    # montaży - jeden wspólny wątek workerów; każdy montaż ma własny dekoder i bufor
+    def __init__(self, protocol=PROTOCOL_LEGACY, buffer_capacity=MOUNT_BUFFER_CAPACITY,
+                 history_window=MOUNT_HISTORY_WINDOW, parent=None):
+        super().__init__(parent)
+        self.protocol = protocol
+        self.buffer_capacity = buffer_capacity
+        self.history_window = history_window
+        self.loop = SelectorLoop()
+        self.worker_thread = QThread()
+        self.worker_thread.finished.connect(self._stop_timers, Qt.ConnectionType.DirectConnection)
+        self.mounts = {}
+        self.running = False
+
+    def add_mount(self, name, host, port, calibration=None):
+        if name in self.mounts:
+            raise ValueError(f"Montaż {name} już istnieje")
+        client = TCPClient(host, port, batch_interval=MOUNT_BATCH_INTERVAL, loop=self.loop, protocol=self.protocol,
+                           calibration=calibration)
+        worker = TelemetryWorker(lambda: (DEFAULT_TOLERANCE, DEFAULT_TOLERANCE), self.buffer_capacity, None,
+                                 self.history_window)
+        worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(worker.start_timer)
+        client.batch_received.connect(worker.handle_batch)
+        client.setpoint_echo.connect(worker.set_setpoint)
+        mount = Mount(name, client, worker, ConfigSync(client, parent=self))
+        self.mounts[name] = mount
+        if self.running:
+            QMetaObject.invokeMethod(worker, "start_timer", Qt.ConnectionType.QueuedConnection)
+            client.start()
+        return mount
+
+    def start(self):
+        self.running = True
+        self.worker_thread.start()
+        for mount in self.mounts.values():
+            mount.client.start()
+
+    def stop(self):
+        self.running = False
+        for mount in self.mounts.values():
+            mount.client.stop()
+        self.loop.call_soon(self.loop.stop)
+        if self.loop.thread is not None:
+            self.loop.thread.join(timeout=2.0)
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+        for mount in self.mounts.values():
+            mount.worker.close()
+
+    def _stop_timers(self):
+        for mount in self.mounts.values():
+            mount.worker.stop_timer()
+
+    def broadcast(self, message, names=None, urgent=False):
+        targets = self.mounts if names is None else names
+        return [name for name in targets if self.mounts[name].client.send(message, urgent=urgent)]
+
+    def stop_all(self):
+        # Montaże, do których STOP nie trafił (brak połączenia, także po awarii wspólnej pętli gniazd)
+        sent = self.broadcast(CommandBuilder.build_stop_command(), urgent=True)
+        return [name for name in self.mounts if name not in sent]
+
+    def push_config(self, names, values):
+        # Wysyłka równoległa - wynik z opóźnieniem potwierdzenia każdego montażu w sygnale finished
+        push = ParallelConfigPush({name: self.mounts[name].config_sync for name in names}, self)
+        push.finished.connect(push.deleteLater)
+        return push
+
+
+class MountTile(QWidget):
+    def __init__(self, mount):
+        super().__init__()
+        self.mount = mount
+        self.plotted_version = -1
+
+        layout = QVBoxLayout()
+        header = QHBoxLayout()
+        self.select = QCheckBox(mount.name)
+        self.status = QLabel()
+        header.addWidget(self.select)
+        header.addStretch()
+        header.addWidget(self.status)
+        layout.addLayout(header)
+
+        self.plot = pg.PlotWidget()
+        self.plot.setFixedHeight(160)
+        self.plot.hideAxis('bottom')
+        self.plot.setDownsampling(auto=True, mode='peak')
+        self.plot.setClipToView(True)
+        self.curve_x = self.plot.plot(pen='b')
+        self.curve_y = self.plot.plot(pen='g')
+        layout.addWidget(self.plot)
+        self.setLayout(layout)
+
+        mount.client.state_changed.connect(self.update_state)
+        self.update_state(mount.client.state)
+
+    def update_state(self, state):
+        if state == STATE_CONNECTED:
+            self.status.setText("połączono")
+            self.status.setStyleSheet("color: green;")
+        elif state == STATE_CONNECTING:
+            self.status.setText("łączenie...")
+            self.status.setStyleSheet("color: orange;")
+        else:
+            self.status.setText("rozłączono")
+            self.status.setStyleSheet("color: red;")
+
+    def refresh(self):
+        worker = self.mount.worker
+        worker.plot_width = self.plot.width()
+        snapshot = worker.snapshot
+        if snapshot is None or snapshot.version == self.plotted_version:
+            return
+        self.plotted_version = snapshot.version
+        self.curve_x.setData(snapshot.t, snapshot.values[:, 0])
+        self.curve_y.setData(snapshot.t, snapshot.values[:, 1])
+
+
+class MountGridView(QWidget):
+    def __init__(self, context, manager):
+        super().__init__()
+        self.context = context
+        self.manager = manager
+
+        layout = QVBoxLayout()
+        buttons = QHBoxLayout()
+        self.stop_all_btn = QPushButton("⛔ Zatrzymaj wszystkie")
+        self.stop_all_btn.setStyleSheet("background-color: red; color: white; font-weight: bold;")
+        self.stop_all_btn.clicked.connect(self.stop_all)
+        self.config_btn = QPushButton("Wyślij aktywną konfigurację do zaznaczonych")
+        self.config_btn.clicked.connect(self.send_config_to_selected)
+        self.select_all = QCheckBox("Zaznacz wszystkie")
+        self.select_all.toggled.connect(self.toggle_all)
+        buttons.addWidget(self.stop_all_btn)
+        buttons.addWidget(self.config_btn)
+        buttons.addWidget(self.select_all)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+        grid_widget = QWidget()
+        grid = QGridLayout()
+        self.tiles = []
+        for i, mount in enumerate(manager.mounts.values()):
+            tile = MountTile(mount)
+            grid.addWidget(tile, i // GRID_COLUMNS, i % GRID_COLUMNS)
+            self.tiles.append(tile)
+        grid_widget.setLayout(grid)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(grid_widget)
+        layout.addWidget(scroll)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(GRID_REFRESH_MS)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        # Odświeżane są tylko kafelki widoczne w obszarze przewijania
+        for tile in self.tiles:
+            if not tile.visibleRegion().isEmpty():
+                tile.refresh()
+
+    def stop_all(self):
+        # Także główny kontroler z panelu sterowania - ma własne połączenie poza menedżerem montaży
+        failed = [f"{name}: {self.manager.mounts[name].client.send_error()}" for name in self.manager.stop_all()]
+        if not self.context.send_stop():
+            failed.insert(0, f"główny kontroler: {self.context.client.send_error()}")
+        if failed:
+            QMessageBox.critical(self, "STOP nie wysłany", "STOP nie został wysłany do:\n" + "\n".join(failed))
+
+    def toggle_all(self, checked):
+        for tile in self.tiles:
+            tile.select.setChecked(checked)
+
+    def selected(self):
+        return [tile.mount.name for tile in self.tiles if tile.select.isChecked()]
+
+    def send_config_to_selected(self):
+        names = self.selected()
+        if not names:
+            QMessageBox.warning(self, "Brak wyboru", "Zaznacz montaże, do których wysłać konfigurację")
+            return
+        if not self.context.active_config:
+            QMessageBox.warning(self, "Brak konfiguracji", "Najpierw wyślij konfigurację w panelu ustawień")
+            return
+        values = [self.context.active_config[field] for field in CONFIG_FIELDS]
+        self.config_btn.setEnabled(False)
+        push = self.manager.push_config(names, values)
+        push.finished.connect(self.show_config_report)
+        push.start(values)
+
+    def show_config_report(self, results):
+        self.config_btn.setEnabled(True)
+        lines = []
+        for name in sorted(results):
+            ok, detail = results[name]
+            if not ok:
+                lines.append(f"{name}: błąd - {detail}")
+            elif detail is None:
+                lines.append(f"{name}: wysłano bez potwierdzenia")
+            elif isinstance(detail, str):
+                lines.append(f"{name}: {detail}")
+            else:
+                lines.append(f"{name}: potwierdzono po {detail * 1000:.1f} ms")
+        if all(ok for ok, _ in results.values()):
+            QMessageBox.information(self, "Konfiguracja wysłana", "\n".join(lines))
+        else:
+            QMessageBox.warning(self, "Konfiguracja", "\n".join(lines))
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def min_max_bins(t, values, bins):
+    # Decymacja min/max w locie dla danych czytanych bezpośrednio z nagrania
+    size = -(-len(t) // bins)
+    if size <= 1:
+        return t, values
+    complete = len(t) - len(t) % size
+    blocks = np.ascontiguousarray(values[:complete].T).reshape(values.shape[1], -1, size)
+    lo, hi = np.fmin.reduce(blocks, axis=2).T, np.fmax.reduce(blocks, axis=2).T
+    if complete < len(t):
+        lo = np.vstack((lo, np.fmin.reduce(values[complete:], axis=0)))
+        hi = np.vstack((hi, np.fmax.reduce(values[complete:], axis=0)))
+    starts = t[::size]
+    return np.repeat(starts, 2), np.stack((lo, hi), axis=1).reshape(-1, values.shape[1])
+
+
+class _Level:
+    def __init__(self, channels, capacity=1024):
+        self.t = np.empty(capacity)
+        self.lo = np.empty((capacity, channels))
+        self.hi = np.empty((capacity, channels))
+        self.size = 0
+
+    def append(self, t, lo, hi):
+        n = len(t)
+        if self.size + n > len(self.t):
+            capacity = max(2 * len(self.t), self.size + n)
+            for name in ('t', 'lo', 'hi'):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:])
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+        self.t[self.size:self.size + n] = t
+        self.lo[self.size:self.size + n] = lo
+        self.hi[self.size:self.size + n] = hi
+        self.size += n
+
+
+class MinMaxDecimator:
+    # Piramida min/max: poziom 0 to przedziały po bin_size próbek, każdy kolejny
+    # łączy pary przedziałów z poprzedniego. Zachowuje ekstrema, więc oscylacje
+    # pozostają widoczne niezależnie od stopnia decymacji.
+    def __init__(self, channels, bin_size=64, levels=16):
+        self.channels = channels
+        self.bin_size = bin_size
+        self.levels = [_Level(channels) for _ in range(levels)]
+        self.pending_t = np.empty(0)
+        self.pending_v = np.empty((0, channels))
+
+    def clear(self):
+        self.__init__(self.channels, self.bin_size, len(self.levels))
+
+    def extend(self, t, values):
+        t = np.concatenate((self.pending_t, t))
+        values = np.concatenate((self.pending_v, values))
+        complete = len(t) - len(t) % self.bin_size
+        if complete:
+            # Kanały jako pierwszy wymiar - redukcja po ciągłej pamięci jest kilkukrotnie szybsza
+            bins = np.ascontiguousarray(values[:complete].T).reshape(self.channels, -1, self.bin_size)
+            self.levels[0].append(
+                t[:complete:self.bin_size],
+                np.fmin.reduce(bins, axis=2).T,
+                np.fmax.reduce(bins, axis=2).T,
+            )
+            self._propagate()
+        self.pending_t = t[complete:]
+        self.pending_v = values[complete:]
+
+    def _propagate(self):
+        for lower, upper in zip(self.levels, self.levels[1:]):
+            start = 2 * upper.size
+            end = lower.size - (lower.size - start) % 2
+            if end <= start:
+                return
+            lo = lower.lo[start:end].reshape(-1, 2, self.channels)
+            hi = lower.hi[start:end].reshape(-1, 2, self.channels)
+            upper.append(lower.t[start:end:2], np.fmin.reduce(lo, axis=1), np.fmax.reduce(hi, axis=1))
+
+    def query(self, t_end, max_bins):
+        for level in self.levels:
+            end = np.searchsorted(level.t[:level.size], t_end)
+            if end <= max_bins:
+                break
+        t = np.repeat(level.t[:end], 2)
+        values = np.stack((level.lo[:end], level.hi[:end]), axis=1).reshape(-1, self.channels)
+        return t, values
+
+    def query_range(self, t_start, t_end, max_bins):
+        # Najdrobniejszy poziom, na którym zakres [t_start, t_end] mieści się w max_bins przedziałach
+        for level in self.levels:
+            t = level.t[:level.size]
+            start = max(int(np.searchsorted(t, t_start, side="right")) - 1, 0)
+            end = int(np.searchsorted(t, t_end, side="right"))
+            if end - start <= max_bins:
+                break
+        t = np.repeat(level.t[start:end], 2)
+        values = np.stack((level.lo[start:end], level.hi[start:end]), axis=1).reshape(-1, self.channels)
+        return t, values
@@ -0,0 +1,126 @@
+import os
+import json
+from PyQt6.QtCore import QObject, QAbstractListModel, QModelIndex, QFileSystemWatcher, Qt, pyqtSignal
+from context import CONFIG_FIELDS
+
+PRESETS_DIR = "presets"
+
+
+def parse_preset(path):
+    with open(path, "r") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("Preset nie jest obiektem JSON")
+    missing = [field for field in CONFIG_FIELDS if field not in config]
+    if missing:
+        raise ValueError(f"Brak pól: {', '.join(missing)}")
+    # Stare presety trzymają liczby jako tekst - w indeksie zawsze float
+    return {field: float(config[field]) for field in CONFIG_FIELDS}
+
+
+def diff_config(preset, active):
+    return [(field, preset[field], active.get(field)) for field in CONFIG_FIELDS
+            if active.get(field) != preset[field]]
+
+
+class PresetRepository(QObject):
+    changed = pyqtSignal()
+
+    # Indeks sparsowanych presetów w pamięci; po zdarzeniu watchera ponownie czytane są tylko
+    # pliki ze zmienionym mtime/rozmiarem
+    def __init__(self, directory=PRESETS_DIR, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.presets = {}
+        self.errors = {}
+        self.stamps = {}
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(directory)
+        self.watcher.directoryChanged.connect(self.refresh)
+        self.watcher.fileChanged.connect(self.refresh_file)
+        self.refresh()
+
+    def names(self):
+        return sorted(self.presets)
+
+    def get(self, name):
+        return self.presets.get(name)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def refresh(self, *_):
+        seen = set()
+        updated = False
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                updated |= self._load(entry.name, entry.stat())
+        for name in set(self.stamps) - seen:
+            self._forget(name)
+            updated = True
+        if updated:
+            self.changed.emit()
+
+    def refresh_file(self, path):
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._forget(name)
+            self.changed.emit()
+            return
+        if self._load(name, stat):
+            self.changed.emit()
+
+    def _load(self, name, stat):
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self.stamps.get(name) == stamp:
+            return False
+        path = self.path(name)
+        if name not in self.stamps:
+            self.watcher.addPath(path)
+        self.stamps[name] = stamp
+        try:
+            self.presets[name] = parse_preset(path)
+            self.errors.pop(name, None)
+        except (OSError, ValueError, TypeError) as e:
+            self.presets.pop(name, None)
+            self.errors[name] = str(e)
+        return True
+
+    def _forget(self, name):
+        self.stamps.pop(name, None)
+        self.presets.pop(name, None)
+        self.errors.pop(name, None)
+        self.watcher.removePath(self.path(name))
+
+
+class PresetListModel(QAbstractListModel):
+    def __init__(self, repository, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+        self.names = repository.names()
+        repository.changed.connect(self.reload)
+
+    def reload(self):
+        self.beginResetModel()
+        self.names = self.repository.names()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            config = self.repository.get(name)
+            return ", ".join(f"{field}={config[field]:g}" for field in CONFIG_FIELDS)
+        return None
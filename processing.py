@@ -1,78 +1,639 @@
-import struct
+import os
+import heapq
 import socket
+import selectors
 import threading
-from PyQt6.QtCore import QObject, pyqtSignal
+import time
+from collections import deque
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from protocol import (
+    CMD_STOP, CMD_GOTO, CMD_MANUAL, CMD_ANALOG, CMD_TRAJECTORY, CMD_CONFIG, LEGACY_COMMANDS,
+    PROTOCOL_LEGACY, PROTOCOL_FRAMED, MSG_CONFIG_SET, CONFIG_MESSAGES, FramedEncoder, FramedDecoder,
+)
+from calibration import EncoderCalibration
+
+FRAME_SIZE = 8
+RECV_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_HOST = os.environ.get("GONIOMETR_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("GONIOMETR_PORT", "2137"))
+MAX_OUTBOUND_QUEUE = 256
+# Komendy ruchu, które STOP usuwa z kolejki, zanim trafią do kontrolera
+MOTION_COMMANDS = {CMD_GOTO, CMD_MANUAL, CMD_ANALOG, CMD_TRAJECTORY}
+# Przy pełnej kolejce nowsza komenda ruchu zastępuje najstarszą z tych - pozostałych nie wolno gubić
+SUPERSEDED_COMMANDS = {CMD_MANUAL, CMD_ANALOG}
+STOP_LATENCY_HISTORY = 100
+# Komend kodowanych na jeden zapis do gniazda - pętla nie koduje całej kolejki, gdy może przyjść STOP
+WRITE_BATCH = 32
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 10.0
+
+ANALOG_RATE_HZ = 50
+ANALOG_DEADBAND = 0.02
+ANALOG_STOP_THRESHOLD = 0.01
+
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
 
 
 class CommandBuilder:
     @staticmethod
     def build_goto_command(x: float, y: float) -> bytes:
-        return struct.pack('Bff', 2, x, y)
+        return LEGACY_COMMANDS[CMD_GOTO].pack(CMD_GOTO, x, y)
 
     @staticmethod
     def build_manual_command(direction_code: int) -> bytes:
-        return struct.pack('Bi', 3, direction_code)
+        return LEGACY_COMMANDS[CMD_MANUAL].pack(CMD_MANUAL, direction_code)
 
     @staticmethod
     def build_analog_manual_command(x: float, y: float) -> bytes:
-        return struct.pack('Bff', 4, x, y)
+        return LEGACY_COMMANDS[CMD_ANALOG].pack(CMD_ANALOG, x, y)
 
     @staticmethod
     def build_stop_command() -> bytes:
-        return struct.pack('B', 1)
+        return LEGACY_COMMANDS[CMD_STOP].pack(CMD_STOP)
 
     @staticmethod
     def build_config_packet(px, ix, dx, py, iy, dy, max_x, max_y, tol_x, tol_y) -> bytes:
-        return struct.pack('B10f', 6, px, ix, dx, py, iy, dy, max_x, max_y, tol_x, tol_y)
+        return LEGACY_COMMANDS[CMD_CONFIG].pack(CMD_CONFIG, px, ix, dx, py, iy, dy, max_x, max_y, tol_x, tol_y)
 
     @staticmethod
     def build_trajectory_command(coeffs_x, coeffs_y):
         if len(coeffs_x) != 5 or len(coeffs_y) != 5:
             raise ValueError("Wymagane dokładnie 5 współczynników dla każdej osi")
 
-        return struct.pack('B10f', 5, *(coeffs_x + coeffs_y))
+        return LEGACY_COMMANDS[CMD_TRAJECTORY].pack(CMD_TRAJECTORY, *coeffs_x, *coeffs_y)
+
+
+class TelemetryDecoder:
+    framed = False
+
+    def __init__(self, capacity=RECV_BUFFER_SIZE):
+        if capacity < FRAME_SIZE:
+            raise ValueError("Bufor odbiorczy mniejszy niż jedna ramka")
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.pending = 0
+        self.bytes_received = 0
+
+    def recv_from(self, sock):
+        received = sock.recv_into(self.view[self.pending:])
+        if not received:
+            return None
+        self.pending += received
+        self.bytes_received += received
+        return self.decode()
+
+    def decode(self):
+        complete = self.pending - self.pending % FRAME_SIZE
+        frames = np.frombuffer(self.buffer, dtype='<u4', count=complete // 4).reshape(-1, 2).copy()
+        rest = self.pending - complete
+        if rest:
+            self.view[:rest] = self.view[complete:self.pending]
+        self.pending = rest
+        return frames
+
+    def reset(self):
+        self.pending = 0
+
+
+class SelectorLoop:
+    # Jeden wątek z pętlą selectors, który obsługuje gniazda wszystkich połączeń
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        self.calls = deque()
+        self.timers = []
+        self.timer_seq = 0
+        self.running = False
+        self.thread = None
+        # Wywoływane, gdy sama pętla przestaje działać - klienci oznaczają się wtedy jako rozłączeni
+        self.failure_callbacks = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake()
+
+    def wake(self):
+        try:
+            self.wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def call_soon(self, callback):
+        self.calls.append(callback)
+        if threading.current_thread() is not self.thread:
+            self.wake()
+
+    def call_later(self, delay, callback):
+        def schedule():
+            self.timer_seq += 1
+            heapq.heappush(self.timers, (time.monotonic() + delay, self.timer_seq, callback))
+        self.call_soon(schedule)
+
+    def run(self):
+        try:
+            while self.running:
+                timeout = None
+                if self.calls:
+                    timeout = 0
+                elif self.timers:
+                    timeout = max(0.0, self.timers[0][0] - time.monotonic())
+                for key, mask in self.selector.select(timeout):
+                    if key.data is None:
+                        try:
+                            while self.wake_r.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self._invoke(key.data, mask)
+                while self.calls:
+                    self._invoke(self.calls.popleft())
+                now = time.monotonic()
+                while self.timers and self.timers[0][0] <= now:
+                    self._invoke(heapq.heappop(self.timers)[2])
+        except Exception as e:
+            print(f"Pętla gniazd zatrzymana: {type(e).__name__}: {e}")
+            self.running = False
+            for callback in self.failure_callbacks:
+                self._invoke(callback)
+
+    @staticmethod
+    def _invoke(callback, *args):
+        # Pętla jest wspólna dla wszystkich połączeń - błąd jednego klienta nie może jej zatrzymać
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Błąd w pętli gniazd ({getattr(callback, '__qualname__', callback)}): {type(e).__name__}: {e}")
 
 
 class TCPClient(QObject):
     data_received = pyqtSignal(bytes)
+    batch_received = pyqtSignal(object, object)
+    setpoint_echo = pyqtSignal(float, float)
+    stop_sent = pyqtSignal(float)
+    config_reply = pyqtSignal(int, object)
+    state_changed = pyqtSignal(str)
+    connected = pyqtSignal()
+    disconnected = pyqtSignal()
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, per_sample=False, batch_interval=0.0, loop=None,
+                 max_queue=MAX_OUTBOUND_QUEUE, reconnect_min=RECONNECT_MIN, reconnect_max=RECONNECT_MAX,
+                 protocol=PROTOCOL_LEGACY, calibration=None):
         super().__init__()
         self.host = host
         self.port = port
+        self.protocol = protocol
+        # Liczniki enkodera przeliczane na stopnie raz, przy emisji paczki; nagranie zostaje surowe.
+        # Podmiana kalibracji to przypisanie referencji, więc można ją zmieniać z innego wątku.
+        self.calibration = calibration or EncoderCalibration()
+        self.per_sample = per_sample
+        self.batch_interval = batch_interval
+        self.loop = loop
+        self.owns_loop = loop is None
+        self.max_queue = max_queue
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.reconnect_delay = reconnect_min
         self.running = False
         self.socket = None
+        # Numer próby połączenia - wynik rozwiązywania nazwy z poprzedniej próby jest pomijany
+        self.connect_attempt = 0
+        self.state = STATE_DISCONNECTED
+        self.decoder = FramedDecoder() if protocol == PROTOCOL_FRAMED else TelemetryDecoder()
+        self.encoder = FramedEncoder() if protocol == PROTOCOL_FRAMED else None
+        self.clock_offset = None
+        self.last_controller_time = None
+        self.last_echo = None
+        self.recorder = None
+        # Kolejka surowych komend; numer sekwencji ramki nadawany dopiero przy wysyłce (_take_outbox)
+        self.outbox = deque()
+        self.outbox_lock = threading.Lock()
+        self.out_pending = b""
+        self.in_flight = deque()
+        self.in_flight_sent = 0
+        self.dropped_commands = 0
+        self.rejected_commands = 0
+        self.purged_commands = 0
+        self.stop_requests = deque()
+        self.stop_latencies = deque(maxlen=STOP_LATENCY_HISTORY)
+        # Liczniki narastające; metryki liczą z nich tempo przez próbkowanie, bez logowania każdej ramki
+        self.frames_received = 0
+        self.frames_emitted = 0
+        self.commands_sent = dict.fromkeys(LEGACY_COMMANDS, 0)
+        self.pending = []
+        self.pending_times = []
+        self.flush_scheduled = False
 
     def start(self):
+        if self.loop is None:
+            self.loop = SelectorLoop()
+        if self._on_loop_failed not in self.loop.failure_callbacks:
+            self.loop.failure_callbacks.append(self._on_loop_failed)
         self.running = True
-        self.thread = threading.Thread(target=self.listen, daemon=True)
-        self.thread.start()
+        self.loop.start()
+        self.loop.call_soon(self._connect)
+
+    def set_address(self, host, port):
+        self.host = host
+        self.port = port
+        if self.running:
+            self.loop.call_soon(self._reconnect_now)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        self.state_changed.emit(state)
+        if state == STATE_CONNECTED:
+            self.connected.emit()
+        elif state == STATE_DISCONNECTED:
+            self.disconnected.emit()
+
+    def _connect(self):
+        if not self.running or self.socket is not None:
+            return
+        self.connect_attempt += 1
+        self._set_state(STATE_CONNECTING)
+        # Rozwiązywanie nazwy blokuje (DNS), więc nie w wątku pętli wspólnej dla wszystkich połączeń
+        threading.Thread(target=self._resolve, args=(self.connect_attempt, self.host, self.port),
+                         daemon=True).start()
 
-    def listen(self):
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.connect((self.host, self.port))
-        buffer = b""
+    def _resolve(self, attempt, host, port):
         try:
-            while self.running:
-                data = self.socket.recv(1024)
-                if data:
-                    buffer += data
-                    while len(buffer) >= 8:
-                        chunk = buffer[:8]
-                        buffer = buffer[8:]
-                        self.data_received.emit(chunk)
-        finally:
+            address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)[0][4]
+        except OSError as e:
+            print(f"Nie można rozwiązać adresu {host}:{port}: {e}")
+            address = None
+        self.loop.call_soon(lambda: self._on_resolved(attempt, address))
+
+    def _on_resolved(self, attempt, address):
+        if attempt != self.connect_attempt or not self.running or self.socket is not None:
+            return
+        if address is None:
+            self._drop_connection()
+            return
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setblocking(False)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.connect_ex(address)
+            self.loop.selector.register(self.socket, selectors.EVENT_WRITE, self._on_connect_event)
+        except OSError as e:
+            print(f"Błąd połączenia z {self.host}:{self.port}: {e}")
+            self._drop_connection()
+
+    def _on_connect_event(self, mask):
+        try:
+            error = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except OSError:
+            error = True
+        if error:
+            self._drop_connection()
+            return
+        self.decoder.reset()
+        self.clock_offset = None
+        self.last_controller_time = None
+        if self.encoder:
+            self.encoder = FramedEncoder()
+        self.reconnect_delay = self.reconnect_min
+        self.loop.selector.modify(self.socket, self._interest(), self._on_event)
+        self._set_state(STATE_CONNECTED)
+
+    def _interest(self):
+        if self.out_pending or self.outbox:
+            return selectors.EVENT_READ | selectors.EVENT_WRITE
+        return selectors.EVENT_READ
+
+    def _on_event(self, mask):
+        try:
+            if mask & selectors.EVENT_READ:
+                self._on_readable()
+            if self.socket is not None and mask & selectors.EVENT_WRITE:
+                self._on_writable()
+        except (ConnectionError, OSError):
+            self._drop_connection()
+        except Exception as e:
+            # Nieobsłużone gniazdo zgłaszałoby gotowość w kółko - połączenie jest zamykane i nawiązywane od nowa
+            print(f"Błąd obsługi połączenia {self.host}:{self.port}: {type(e).__name__}: {e}")
+            self._drop_connection()
+
+    def _on_readable(self):
+        try:
+            frames = self.decoder.recv_from(self.socket)
+        except BlockingIOError:
+            return
+        received_at = time.time()
+        if frames is None:
+            self._drop_connection()
+            return
+        if self.decoder.framed:
+            for msg_type, values in self.decoder.commands:
+                if msg_type in CONFIG_MESSAGES:
+                    self.config_reply.emit(msg_type, values)
+        if not len(frames):
+            return
+        self.frames_received += len(frames)
+        if self.recorder:
+            self.recorder.record_rx(received_at, frames)
+        if self.per_sample:
+            # Dotychczasowy format dla zewnętrznych odbiorców: surowe liczniki 'II' ramka po ramce.
+            # Stopnie po kalibracji idą zawsze ścieżką paczek (batch_received)
+            for frame in frames:
+                self.data_received.emit(frame.tobytes())
+        self.pending.append(frames)
+        if self.decoder.framed:
+            self.pending_times.append(self._controller_timestamps(received_at))
+            self._check_setpoint_echo()
+        else:
+            self.pending_times.append(np.full(len(frames), received_at))
+        if self.batch_interval <= 0:
+            self._flush_batch()
+        elif not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_later(self.batch_interval, self._flush_batch)
+
+    def _controller_timestamps(self, received_at):
+        # Czas kontrolera przeliczany na czas hosta; przesunięcie to najmniejsze zaobserwowane opóźnienie
+        controller_times = self.decoder.times * 1e-6
+        if self.last_controller_time is not None and controller_times[0] < self.last_controller_time:
+            self.clock_offset = None
+        self.last_controller_time = controller_times[-1]
+        offset = received_at - controller_times[-1]
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        return controller_times + self.clock_offset
+
+    def _check_setpoint_echo(self):
+        echo = self.decoder.setpoints[-1]
+        if self.last_echo is None or not np.array_equal(echo, self.last_echo, equal_nan=True):
+            self.last_echo = echo
+            self.setpoint_echo.emit(float(echo[0]), float(echo[1]))
+
+    def _flush_batch(self):
+        self.flush_scheduled = False
+        if not self.pending:
+            return
+        self.frames_emitted += sum(len(frames) for frames in self.pending)
+        if len(self.pending) == 1:
+            self.batch_received.emit(self.pending_times[0], self.calibration.to_degrees(self.pending[0]))
+        else:
+            self.batch_received.emit(np.concatenate(self.pending_times),
+                                     self.calibration.to_degrees(np.concatenate(self.pending)))
+        self.pending = []
+        self.pending_times = []
+
+    def _on_writable(self):
+        if not self.out_pending:
+            # Wszystkie oczekujące pakiety sklejane w jeden zapis do gniazda
+            self.in_flight.extend(self._encoded(self._take_outbox(WRITE_BATCH)))
+            self.out_pending = b"".join(wire for _, wire in self.in_flight)
+        if self.out_pending:
+            try:
+                sent = self.socket.send(self.out_pending)
+            except BlockingIOError:
+                sent = 0
+            self.out_pending = self.out_pending[sent:]
+            self._settle_in_flight(sent)
+        self.loop.selector.modify(self.socket, self._interest(), self._on_event)
+
+    def _take_outbox(self, limit=None):
+        with self.outbox_lock:
+            if limit is None or len(self.outbox) <= limit:
+                messages = list(self.outbox)
+                self.outbox.clear()
+            else:
+                messages = [self.outbox.popleft() for _ in range(limit)]
+        return messages
+
+    def _encoded(self, messages):
+        # Tylko w wątku pętli, w kolejności wysyłki - kontroler dostaje ciągłe numery sekwencji
+        if self.encoder is None:
+            return [(message, message) for message in messages]
+        return [(message, self.encoder.encode_command(message)) for message in messages]
+
+    def _settle_in_flight(self, sent):
+        self.in_flight_sent += sent
+        sent_at = None
+        while self.in_flight and self.in_flight_sent >= len(self.in_flight[0][1]):
+            message, wire = self.in_flight.popleft()
+            self.in_flight_sent -= len(wire)
+            if sent_at is None:
+                sent_at = time.time()
+            if self.recorder:
+                self.recorder.record_tx(sent_at, message)
+            command = CMD_CONFIG if message[0] == MSG_CONFIG_SET else message[0]
+            if command in self.commands_sent:
+                self.commands_sent[command] += 1
+            if message[0] == CMD_STOP:
+                self._record_stop_latency()
+
+    def _record_stop_latency(self):
+        # Każdy wysłany STOP obsługuje wszystkie wcześniejsze żądania zatrzymania
+        with self.outbox_lock:
+            requests = list(self.stop_requests)
+            self.stop_requests.clear()
+        if not requests:
+            return
+        now = time.perf_counter()
+        for requested_at in requests:
+            self.stop_latencies.append(now - requested_at)
+        self.stop_sent.emit(now - requests[0])
+
+    def _preempt(self):
+        # Wywoływane w wątku pętli po pilnej komendzie: z niewysłanych bajtów zostaje tylko
+        # rozpoczęty pakiet (nie można go przerwać), potem od razu STOP i komendy inne niż ruch
+        if self.socket is None or self.state != STATE_CONNECTED:
+            return
+        keep = deque()
+        if self.in_flight and self.in_flight_sent:
+            keep.append(self.in_flight.popleft())
+        # Ramki, z których nic jeszcze nie poszło, były zakodowane jako ostatnie - numery sekwencji
+        # są cofane i nadawane od nowa w nowej kolejności, bez luk po usuniętych komendach ruchu
+        if self.encoder is not None:
+            self.encoder.seq = (self.encoder.seq - len(self.in_flight)) & 0xFFFF
+        messages = self._take_outbox()
+        for message, _ in self.in_flight:
+            if message[0] in MOTION_COMMANDS:
+                self.purged_commands += 1
+            else:
+                messages.append(message)
+        keep.extend(self._encoded(messages))
+        self.in_flight = keep
+        self.out_pending = b"".join(wire for _, wire in keep)[self.in_flight_sent:]
+        try:
+            self._on_writable()
+        except (ConnectionError, OSError):
+            self._drop_connection()
+
+    def stop_latency_stats(self):
+        if not self.stop_latencies:
+            return None
+        latencies = np.array(self.stop_latencies)
+        return {"last": float(latencies[-1]), "median": float(np.median(latencies)), "max": float(latencies.max())}
+
+    def _want_write(self):
+        if self.state == STATE_CONNECTED and self.socket is not None:
+            self.loop.selector.modify(self.socket, self._interest(), self._on_event)
+
+    def _close_socket(self):
+        self._flush_batch()
+        self.connect_attempt += 1
+        if self.socket is not None:
+            try:
+                self.loop.selector.unregister(self.socket)
+            except (KeyError, ValueError):
+                # Gniazdo, którego rejestracja się nie udała
+                pass
             self.socket.close()
+            self.socket = None
+        self.out_pending = b""
+        self.in_flight.clear()
+        self.in_flight_sent = 0
+        with self.outbox_lock:
+            self.outbox.clear()
+            self.stop_requests.clear()
+
+    def _drop_connection(self):
+        self._close_socket()
+        self._set_state(STATE_DISCONNECTED)
+        if self.running:
+            self.loop.call_later(self.reconnect_delay, self._connect)
+            self.reconnect_delay = min(self.reconnect_delay * 2, self.reconnect_max)
+
+    def _on_loop_failed(self):
+        # Pętla nie działa, więc nic już nie zostanie wysłane ani odebrane
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+        with self.outbox_lock:
+            self.outbox.clear()
+            self.stop_requests.clear()
+        self._set_state(STATE_DISCONNECTED)
+
+    def _reconnect_now(self):
+        self._close_socket()
+        self.reconnect_delay = self.reconnect_min
+        self._connect()
 
-    def send(self, message: bytes):
-        if self.socket:
-            self.socket.sendall(message)
+    def send(self, message: bytes, urgent=False):
+        if self.state != STATE_CONNECTED:
+            return False
+        requested_at = time.perf_counter()
+        urgent = urgent or message[0] == CMD_STOP
+        with self.outbox_lock:
+            if urgent:
+                # Pilne komendy (STOP) wyprzedzają kolejkę, a oczekujące komendy ruchu są usuwane
+                kept = deque(queued for queued in self.outbox if queued[0] not in MOTION_COMMANDS)
+                self.purged_commands += len(self.outbox) - len(kept)
+                self.outbox = kept
+                # STOP nie czeka na miejsce i niczego nie wypiera - kolejka może chwilowo przekroczyć limit
+                self.outbox.appendleft(message)
+                if message[0] == CMD_STOP:
+                    self.stop_requests.append(requested_at)
+            else:
+                if len(self.outbox) >= self.max_queue and not self._drop_superseded(message):
+                    self.rejected_commands += 1
+                    return False
+                self.outbox.append(message)
+        self.loop.call_soon(self._preempt if urgent else self._want_write)
+        return True
+
+    def _drop_superseded(self, message):
+        if message[0] not in MOTION_COMMANDS:
+            return False
+        for queued in self.outbox:
+            if queued[0] in SUPERSEDED_COMMANDS:
+                self.outbox.remove(queued)
+                self.dropped_commands += 1
+                return True
+        return False
+
+    def send_error(self):
+        # Powód odmowy send() do komunikatów dla użytkownika
+        if self.state != STATE_CONNECTED:
+            return "brak połączenia"
+        return "kolejka komend pełna"
 
     def stop(self):
         self.running = False
-        if self.socket:
-            self.socket.close()
+        if self.loop is None:
+            return
+        self.loop.call_soon(self._shutdown)
+
+    def _shutdown(self):
+        self._close_socket()
+        self._set_state(STATE_DISCONNECTED)
+        if self.owns_loop:
+            self.loop.stop()
 
 
-tcp_client = TCPClient("127.0.0.1", 2137)
-tcp_client.start()
+class AnalogCommandScheduler(QObject):
+    # Wysyła najnowszy wektor joysticka co najwyżej rate_hz razy na sekundę; stop idzie od razu
+    def __init__(self, client, rate_hz=ANALOG_RATE_HZ, deadband=ANALOG_DEADBAND, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.deadband = deadband
+        self.latest = None
+        self.last_sent = None
+        # Czy od ostatniego STOP poszła jakaś komenda ruchu - drgania wokół środka nie generują serii STOP
+        self.moving = False
+        self.sent = 0
+        self.coalesced = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, round(1000 / rate_hz)))
+        self.timer.timeout.connect(self.tick)
+
+    def set_vector(self, x, y):
+        if abs(x) < ANALOG_STOP_THRESHOLD and abs(y) < ANALOG_STOP_THRESHOLD:
+            self.stop()
+            return
+        if self.latest is not None:
+            self.coalesced += 1
+        self.latest = (x, y)
+        if not self.timer.isActive():
+            self.timer.start()
+            self.tick()
+
+    def tick(self):
+        if self.latest is None:
+            self.timer.stop()
+            return
+        x, y = self.latest
+        self.latest = None
+        if self.last_sent is not None and max(abs(x - self.last_sent[0]), abs(y - self.last_sent[1])) < self.deadband:
+            self.coalesced += 1
+            return
+        if not self.client.send(CommandBuilder.build_analog_manual_command(x, y)):
+            # Przy pełnej kolejce wektor czeka na następny takt (o ile nie przyszedł nowszy);
+            # po utracie połączenia jest porzucany, żeby nie ruszyć montażu po ponownym połączeniu
+            if self.latest is None and self.client.state == STATE_CONNECTED:
+                self.latest = (x, y)
+            return
+        self.last_sent = (x, y)
+        self.moving = True
+        self.sent += 1
+
+    def stop(self):
+        if self.latest is not None:
+            self.coalesced += 1
+        self.latest = None
+        self.last_sent = None
+        self.timer.stop()
+        if not self.moving:
+            return
+        # Nieudany STOP (brak połączenia) zostaje do ponowienia przy następnym puszczeniu joysticka
+        self.moving = not self.client.send(CommandBuilder.build_stop_command(), urgent=True)
@@ -0,0 +1,214 @@
+import zlib
+import struct
+import numpy as np
+
+CMD_STOP = 1
+CMD_GOTO = 2
+CMD_MANUAL = 3
+CMD_ANALOG = 4
+CMD_TRAJECTORY = 5
+CMD_CONFIG = 6
+# Kody kierunku w komendzie MANUAL
+MANUAL_DIRECTIONS = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+
+# Dotychczasowy format bez nagłówka (natywne wyrównanie, jak struct.pack('Bff', ...))
+LEGACY_COMMANDS = {
+    CMD_STOP: struct.Struct('B'),
+    CMD_GOTO: struct.Struct('Bff'),
+    CMD_MANUAL: struct.Struct('Bi'),
+    CMD_ANALOG: struct.Struct('Bff'),
+    CMD_TRAJECTORY: struct.Struct('B10f'),
+    CMD_CONFIG: struct.Struct('B10f'),
+}
+
+PROTOCOL_LEGACY = "legacy"
+PROTOCOL_FRAMED = "framed"
+
+# Ramka: magic, wersja, typ, numer sekwencyjny, długość danych | dane | CRC32 (bez magic)
+MAGIC = b'\x5a\xa5'
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct('<2sBBHH')
+CRC = struct.Struct('<I')
+MAX_PAYLOAD = 0xFFFF
+FRAMED_BUFFER_SIZE = 256 * 1024
+
+MSG_TELEMETRY = 0x10
+# Synchronizacja konfiguracji (tylko protokół ramkowy). Żądania niosą token, który kontroler
+# odsyła w odpowiedzi; ponowienie z tym samym tokenem jest idempotentne.
+MSG_CONFIG_SET = 0x20
+MSG_CONFIG_ACK = 0x21
+MSG_CONFIG_READ = 0x22
+MSG_CONFIG_STATE = 0x23
+CONFIG_VALUES = 10
+CONFIG_SET_HEADER = struct.Struct('<HH')
+CONFIG_VALUE = struct.Struct('<f')
+CONFIG_STATUS_OK = 0
+CONFIG_STATUS_REJECTED = 1
+
+CONFIG_MESSAGES = {
+    MSG_CONFIG_ACK: struct.Struct('<HHB'),
+    MSG_CONFIG_READ: struct.Struct('<H'),
+    MSG_CONFIG_STATE: struct.Struct('<H10f'),
+}
+
+FRAMED_COMMANDS = {
+    CMD_STOP: struct.Struct('<'),
+    CMD_GOTO: struct.Struct('<ff'),
+    CMD_MANUAL: struct.Struct('<i'),
+    CMD_ANALOG: struct.Struct('<ff'),
+    CMD_TRAJECTORY: struct.Struct('<10f'),
+    CMD_CONFIG: struct.Struct('<10f'),
+}
+
+TELEMETRY_RECORD = np.dtype([
+    ('t_us', '<u8'),
+    ('x', '<u4'),
+    ('y', '<u4'),
+    ('x_setpoint', '<f4'),
+    ('y_setpoint', '<f4'),
+])
+RECORDS_PER_MESSAGE = MAX_PAYLOAD // TELEMETRY_RECORD.itemsize
+
+
+class FramedEncoder:
+    def __init__(self):
+        self.seq = 0
+
+    def encode(self, msg_type, payload):
+        header = HEADER.pack(MAGIC, PROTOCOL_VERSION, msg_type, self.seq, len(payload))
+        self.seq = (self.seq + 1) & 0xFFFF
+        crc = zlib.crc32(payload, zlib.crc32(header[len(MAGIC):]))
+        return header + payload + CRC.pack(crc)
+
+    def encode_command(self, packet):
+        command = packet[0]
+        if command not in LEGACY_COMMANDS:
+            # Wiadomości konfiguracji nie mają odpowiednika bez ramek - bajt typu + gotowe dane
+            return self.encode(command, packet[1:])
+        values = LEGACY_COMMANDS[command].unpack(packet)[1:]
+        return self.encode(command, FRAMED_COMMANDS[command].pack(*values))
+
+    def encode_telemetry(self, records):
+        return b"".join(
+            self.encode(MSG_TELEMETRY, records[start:start + RECORDS_PER_MESSAGE].tobytes())
+            for start in range(0, len(records), RECORDS_PER_MESSAGE))
+
+
+class FramedDecoder:
+    framed = True
+
+    def __init__(self, capacity=FRAMED_BUFFER_SIZE):
+        if capacity < HEADER.size + MAX_PAYLOAD + CRC.size:
+            raise ValueError("Bufor odbiorczy mniejszy niż największa ramka")
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.pending = 0
+        self.bytes_received = 0
+        self.times = None
+        self.setpoints = None
+        self.commands = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.expected_seq = None
+        self.messages = 0
+        self.dropped = 0
+        self.corrupt = 0
+        self.skipped_bytes = 0
+
+    def reset(self):
+        self.pending = 0
+        self.expected_seq = None
+
+    def recv_from(self, sock):
+        received = sock.recv_into(self.view[self.pending:])
+        if not received:
+            return None
+        self.pending += received
+        self.bytes_received += received
+        return self.decode()
+
+    def decode(self):
+        parts = []
+        self.commands = []
+        pos = 0
+        while self.pending - pos >= HEADER.size:
+            if self.buffer[pos:pos + len(MAGIC)] != MAGIC:
+                found = self.buffer.find(MAGIC, pos + 1, self.pending)
+                skip_to = found if found >= 0 else self.pending - 1
+                self.skipped_bytes += skip_to - pos
+                pos = skip_to
+                continue
+            _, version, msg_type, seq, length = HEADER.unpack_from(self.buffer, pos)
+            if version != PROTOCOL_VERSION:
+                self.corrupt += 1
+                pos += 1
+                continue
+            end = pos + HEADER.size + length
+            if self.pending < end + CRC.size:
+                break
+            crc = zlib.crc32(self.view[pos + len(MAGIC):end])
+            if crc != CRC.unpack_from(self.buffer, end)[0] or not self._valid_length(msg_type, length):
+                # Uszkodzona ramka - szukamy następnego znacznika od kolejnego bajtu
+                self.corrupt += 1
+                pos += 1
+                continue
+            if self.expected_seq is not None and seq != self.expected_seq:
+                self.dropped += (seq - self.expected_seq) & 0xFFFF
+            self.expected_seq = (seq + 1) & 0xFFFF
+            self.messages += 1
+            start = pos + HEADER.size
+            if msg_type == MSG_TELEMETRY:
+                parts.append(np.frombuffer(self.buffer, dtype=TELEMETRY_RECORD,
+                                           count=length // TELEMETRY_RECORD.itemsize, offset=start))
+            elif msg_type == MSG_CONFIG_SET:
+                token, mask = CONFIG_SET_HEADER.unpack_from(self.buffer, start)
+                count = bin(mask).count("1")
+                if CONFIG_SET_HEADER.size + count * CONFIG_VALUE.size == length:
+                    values = struct.unpack_from(f'<{count}f', self.buffer, start + CONFIG_SET_HEADER.size)
+                    self.commands.append((msg_type, (token, mask) + values))
+                else:
+                    self.corrupt += 1
+            elif msg_type in CONFIG_MESSAGES:
+                self.commands.append((msg_type, CONFIG_MESSAGES[msg_type].unpack_from(self.buffer, start)))
+            else:
+                self.commands.append((msg_type, FRAMED_COMMANDS[msg_type].unpack_from(self.buffer, start)))
+            pos = end + CRC.size
+
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=TELEMETRY_RECORD)
+        rest = self.pending - pos
+        if rest and pos:
+            self.view[:rest] = self.view[pos:self.pending]
+        self.pending = rest
+        self.times = records['t_us']
+        self.setpoints = np.column_stack((records['x_setpoint'], records['y_setpoint']))
+        return np.column_stack((records['x'], records['y']))
+
+    @staticmethod
+    def _valid_length(msg_type, length):
+        if msg_type == MSG_TELEMETRY:
+            return length % TELEMETRY_RECORD.itemsize == 0
+        if msg_type == MSG_CONFIG_SET:
+            return length > CONFIG_SET_HEADER.size and (length - CONFIG_SET_HEADER.size) % CONFIG_VALUE.size == 0
+        command = FRAMED_COMMANDS.get(msg_type) or CONFIG_MESSAGES.get(msg_type)
+        return command is not None and command.size == length
+
+
+def build_config_set(token, mask, values):
+    # values: wszystkie 10 wartości; wysyłane są tylko pola z ustawionym bitem maski
+    changed = [values[i] for i in range(CONFIG_VALUES) if mask & (1 << i)]
+    return (bytes([MSG_CONFIG_SET]) + CONFIG_SET_HEADER.pack(token, mask)
+            + struct.pack(f'<{len(changed)}f', *changed))
+
+
+def build_config_read(token):
+    return bytes([MSG_CONFIG_READ]) + CONFIG_MESSAGES[MSG_CONFIG_READ].pack(token)
+
+
+def apply_config_set(config, mask, changed):
+    config = list(config)
+    values = iter(changed)
+    for i in range(CONFIG_VALUES):
+        if mask & (1 << i):
+            config[i] = next(values)
+    return config
@@ -0,0 +1,288 @@
+import os
+import json
+import mmap
+import time
+import queue
+import struct
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from calibration import EncoderCalibration
+
+RECORD_HEADER = struct.Struct('<BdI')
+RECORD_RX = 1
+RECORD_TX = 2
+FRAME_SIZE = 8
+INDEX_BLOCK = 65536
+INDEX_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('frame_offset', '<i8'),
+    ('offset', '<u4'),
+    ('length', '<u4'),
+    ('segment', '<u2'),
+    ('kind', 'u1'),
+])
+INDEX_FILE = "index.npy"
+INDEX_STAMP_FILE = "index.json"
+SEGMENT_SIZE = 64 * 1024 * 1024
+FSYNC_INTERVAL = 1.0
+
+
+class SessionRecorder:
+    # Zapis na dysk (segmenty i okresowy fsync) w osobnym wątku. Wątek pętli gniazd tylko wrzuca
+    # rekordy do kolejki, więc wolny dysk nie opóźnia odbioru ramek ani wysyłki STOP
+    def __init__(self, directory, segment_size=SEGMENT_SIZE, fsync_interval=FSYNC_INTERVAL):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.records = queue.SimpleQueue()
+        self.closed = False
+        self.segment_index = 0
+        self.segment_bytes = 0
+        self.unsynced = False
+        self.last_fsync = time.monotonic()
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+        self._open_segment()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def create(cls, root="sessions", **kwargs):
+        return cls(os.path.join(root, time.strftime("%Y%m%d_%H%M%S")), **kwargs)
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"segment_{self.segment_index:05d}.bin")
+        self.file = open(path, "ab")
+        self.segment_bytes = self.file.tell()
+
+    def record_rx(self, timestamp, frames):
+        self._put(RECORD_RX, timestamp, frames.tobytes())
+
+    def record_tx(self, timestamp, message):
+        self._put(RECORD_TX, timestamp, message)
+
+    def _put(self, kind, timestamp, payload):
+        if not self.closed:
+            self.records.put((kind, timestamp, payload))
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    record = self.records.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    record = ()
+                if record is None:
+                    break
+                if record:
+                    self._write(*record)
+                if self.unsynced and time.monotonic() - self.last_fsync >= self.fsync_interval:
+                    self._sync()
+            self._sync()
+        except OSError as e:
+            # Bez dalszego zapisu - inaczej kolejka rosłaby bez końca
+            self.closed = True
+            print(f"Błąd zapisu nagrania {self.directory}: {e}")
+        finally:
+            self.file.close()
+            self.file = None
+
+    def _write(self, kind, timestamp, payload):
+        if self.segment_bytes >= self.segment_size:
+            self._sync()
+            self.file.close()
+            self.segment_index += 1
+            self._open_segment()
+        self.file.write(RECORD_HEADER.pack(kind, timestamp, len(payload)))
+        self.file.write(payload)
+        self.segment_bytes += RECORD_HEADER.size + len(payload)
+        self.unsynced = True
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = False
+        self.last_fsync = time.monotonic()
+
+    def close(self):
+        # Czeka na zapis wszystkiego, co już jest w kolejce - po powrocie nagranie jest kompletne
+        self.closed = True
+        self.records.put(None)
+        self.thread.join()
+
+
+class SessionReader:
+    # Rekordy czytane bezpośrednio z plików przez mmap. Posortowany indeks rekordów jest zapisywany
+    # w katalogu nagrania (index.npy) i przy kolejnym otwarciu mapowany z dysku, a nie wczytywany
+    def __init__(self, directory):
+        self.directory = directory
+        self.maps = []
+        stamp = []
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith("segment_") and name.endswith(".bin")):
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    continue
+                self.maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            stamp.append([name, size])
+        index = self._load_index(stamp)
+        if index is None:
+            index = self._build_index()
+            self._save_index(index, stamp)
+        self.index = index
+        self.kinds = index['kind']
+        self.segments = index['segment']
+        self.offsets = index['offset']
+        self.lengths = index['length']
+        # Czasy jako ciągła tablica w pamięci, bo wyszukiwanie binarne po nich jest przy każdym widoku
+        self.times = np.ascontiguousarray(index['time'])
+        self.total_frames = int(index['frame_offset'][-1] + self._frames_in(len(index) - 1)) if len(index) else 0
+
+    def _load_index(self, stamp):
+        try:
+            with open(os.path.join(self.directory, INDEX_STAMP_FILE), "r") as f:
+                if json.load(f) != stamp:
+                    return None
+            index = np.load(os.path.join(self.directory, INDEX_FILE), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return index if index.dtype == INDEX_DTYPE else None
+
+    def _save_index(self, index, stamp):
+        try:
+            np.save(os.path.join(self.directory, INDEX_FILE), index)
+            with open(os.path.join(self.directory, INDEX_STAMP_FILE), "w") as f:
+                json.dump(stamp, f)
+        except OSError:
+            pass
+
+    def _build_index(self):
+        blocks = []
+        for segment, data in enumerate(self.maps):
+            records = []
+            offset = 0
+            unpack = RECORD_HEADER.unpack_from
+            # Niedokończony ostatni rekord (np. po awarii albo w trwającym nagraniu) jest pomijany
+            while offset + RECORD_HEADER.size <= len(data):
+                kind, timestamp, length = unpack(data, offset)
+                offset += RECORD_HEADER.size
+                if offset + length > len(data):
+                    break
+                records.append((timestamp, 0, offset, length, segment, kind))
+                offset += length
+                # Krotki zamieniane na tablicę partiami - sama lista zajęłaby więcej pamięci niż nagranie
+                if len(records) >= INDEX_BLOCK:
+                    blocks.append(np.array(records, dtype=INDEX_DTYPE))
+                    records = []
+            blocks.append(np.array(records, dtype=INDEX_DTYPE))
+        index = np.concatenate(blocks) if blocks else np.empty(0, dtype=INDEX_DTYPE)
+        # Odbiór i wysyłka znakują czas w różnych wątkach, więc kolejność w pliku może minimalnie odbiegać od czasu
+        index = index[np.argsort(index['time'], kind="stable")]
+        counts = np.where(index['kind'] == RECORD_RX, index['length'] // FRAME_SIZE, 0)
+        index['frame_offset'] = np.cumsum(counts) - counts
+        return index
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _frames_in(self, i):
+        return int(self.lengths[i]) // FRAME_SIZE if self.kinds[i] == RECORD_RX else 0
+
+    def frame_offset(self, i):
+        return self.total_frames if i >= len(self) else int(self.index['frame_offset'][i])
+
+    def frame_count(self, start=0, stop=None):
+        return self.frame_offset(len(self) if stop is None else stop) - self.frame_offset(start)
+
+    def payload(self, index):
+        data = self.maps[self.segments[index]]
+        return memoryview(data)[self.offsets[index]:self.offsets[index] + self.lengths[index]]
+
+    def frames(self, start=0, stop=None):
+        indices = np.flatnonzero(self.kinds[start:stop] == RECORD_RX) + start
+        counts = self.lengths[indices].astype(np.int64) // FRAME_SIZE
+        total = int(counts.sum())
+        frames = np.empty((total, 2), dtype='<u4')
+        if not total:
+            return np.empty(0), frames
+        # Pozycja każdej ramki w pliku liczona wektorowo, bez pętli po rekordach
+        first = np.cumsum(counts) - counts
+        positions = (np.repeat(self.offsets[indices].astype(np.int64) - first * FRAME_SIZE, counts)
+                     + np.arange(total) * FRAME_SIZE)
+        out = frames.view(np.uint8).reshape(total, FRAME_SIZE)
+        record_segments = self.segments[indices]
+        used = np.unique(record_segments)
+        segments = np.repeat(record_segments, counts) if len(used) > 1 else None
+        for segment in used:
+            mask = slice(None) if segments is None else segments == segment
+            # Widok "ramka od każdego bajtu" - zbieranie całych ramek jednym indeksowaniem
+            windows = sliding_window_view(np.frombuffer(self.maps[segment], dtype=np.uint8), FRAME_SIZE)
+            out[mask] = windows[positions[mask]]
+            del windows
+        return np.repeat(self.times[indices], counts), frames
+
+    def iter_frames(self, chunk_frames):
+        # Kolejne fragmenty po około chunk_frames ramek - stała pamięć niezależnie od długości nagrania
+        bounds = np.searchsorted(self.index['frame_offset'], np.arange(chunk_frames, self.total_frames, chunk_frames))
+        edges = [0] + [int(bound) for bound in bounds] + [len(self)]
+        for start, stop in zip(edges, edges[1:]):
+            if stop > start:
+                yield self.frames(start, stop)
+
+    def commands(self, start=0, stop=None):
+        indices = np.flatnonzero(self.kinds[start:stop] == RECORD_TX) + start
+        return [(self.times[i], bytes(self.payload(i))) for i in indices]
+
+    def close(self):
+        self.index = self.kinds = self.segments = self.offsets = self.lengths = None
+        for data in self.maps:
+            data.close()
+        self.maps = []
+
+
+class SessionReplayer(QObject):
+    batch_received = pyqtSignal(object, object)
+    command_replayed = pyqtSignal(bytes)
+    finished = pyqtSignal()
+
+    def __init__(self, reader, speed=1.0, interval_ms=20, calibration=None, parent=None):
+        super().__init__(parent)
+        self.reader = reader
+        self.speed = speed
+        # Nagranie trzyma surowe liczniki - przeliczane tak samo jak na żywo w TCPClient
+        self.calibration = calibration or EncoderCalibration()
+        self.position = 0
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        if not len(self.reader):
+            self.finished.emit()
+            return
+        self.session_start = self.reader.times[0]
+        self.wall_start = time.monotonic()
+        self.position = 0
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        clock = self.session_start + (time.monotonic() - self.wall_start) * self.speed
+        end = int(np.searchsorted(self.reader.times, clock, side="right"))
+        if end > self.position:
+            # Komendy przed ramkami z tej samej paczki, żeby wartości zadane zgadzały się z wykresem
+            for _, message in self.reader.commands(self.position, end):
+                self.command_replayed.emit(message)
+            timestamps, frames = self.reader.frames(self.position, end)
+            if len(frames):
+                self.batch_received.emit(timestamps, self.calibration.to_degrees(frames))
+            self.position = end
+        if self.position >= len(self.reader):
+            self.timer.stop()
+            self.finished.emit()
@@ -1,15 +1,19 @@
 from PyQt6.QtWidgets import (
-    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QMessageBox, QFileDialog, QScrollArea
+    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QMessageBox, QFileDialog, QListView
 )
-import os
+from PyQt6.QtCore import Qt, QSortFilterProxyModel
 import json
-from processing import CommandBuilder, tcp_client
+from context import CONFIG_FIELDS
+from presets import PresetRepository, PresetListModel, diff_config
 
 
 class SettingsPanel(QWidget):
-    def __init__(self):
+    def __init__(self, context):
         super().__init__()
-        self.client = tcp_client
+        self.context = context
+        self.client = context.client
+        self.presets = PresetRepository(parent=self)
+        self.selected_preset = None
         self.init_ui()
 
     def init_ui(self):
@@ -30,13 +34,46 @@ class SettingsPanel(QWidget):
         self.load_btn.clicked.connect(self.load_from_json)
         btn_layout.addWidget(self.load_btn)
 
+        self.read_btn = QPushButton("Odczytaj z kontrolera")
+        self.read_btn.clicked.connect(self.read_config)
+        btn_layout.addWidget(self.read_btn)
+
         layout.addLayout(btn_layout)
 
-        # Presety z folderu ./presets
-        self.preset_container = QVBoxLayout()
+        self.config_status = QLabel()
+        self.config_status.setWordWrap(True)
+        layout.addWidget(self.config_status)
+        sync = self.context.config_sync
+        sync.applied.connect(self.on_config_applied)
+        sync.unconfirmed.connect(self.on_config_unconfirmed)
+        sync.failed.connect(self.on_config_failed)
+        sync.read_back.connect(self.on_config_read_back)
+        sync.read_failed.connect(self.on_config_read_failed)
+
+        # Presety z folderu ./presets - indeks w pamięci odświeżany przez QFileSystemWatcher
         layout.addWidget(QLabel("Dostępne presety:"))
-        self.load_presets()
-        layout.addLayout(self.preset_container)
+        self.preset_filter = QLineEdit()
+        self.preset_filter.setPlaceholderText("Szukaj presetu...")
+        layout.addWidget(self.preset_filter)
+
+        self.preset_model = PresetListModel(self.presets, self)
+        self.preset_proxy = QSortFilterProxyModel(self)
+        self.preset_proxy.setSourceModel(self.preset_model)
+        self.preset_proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.preset_filter.textChanged.connect(self.preset_proxy.setFilterFixedString)
+
+        self.preset_list = QListView()
+        self.preset_list.setModel(self.preset_proxy)
+        self.preset_list.setUniformItemSizes(True)
+        self.preset_list.clicked.connect(self.show_preset_diff)
+        self.preset_list.doubleClicked.connect(self.apply_preset)
+        layout.addWidget(self.preset_list)
+
+        self.preset_diff = QLabel()
+        self.preset_diff.setWordWrap(True)
+        layout.addWidget(self.preset_diff)
+        self.presets.changed.connect(self.update_preset_errors)
+        self.update_preset_errors()
 
         layout.addWidget(QLabel("PID - Oś X"))
         self.p_x = QLineEdit()
@@ -86,41 +123,49 @@ class SettingsPanel(QWidget):
 
         self.setLayout(layout)
 
-    def load_presets(self):
-        self.clear_layout(self.preset_container)
-        presets_dir = "presets"
-        if not os.path.exists(presets_dir):
-            os.makedirs(presets_dir)
-        for fname in os.listdir(presets_dir):
-            if fname.endswith(".json"):
-                btn = QPushButton(fname)
-                btn.clicked.connect(lambda _, f=fname: self.load_preset_file(os.path.join(presets_dir, f)))
-                self.preset_container.addWidget(btn)
+    def update_preset_errors(self):
+        if self.presets.errors:
+            self.preset_list.setToolTip("Pominięte presety:\n" + "\n".join(
+                f"{name}: {error}" for name, error in sorted(self.presets.errors.items())))
+        else:
+            self.preset_list.setToolTip("")
+        if self.selected_preset is not None and self.presets.get(self.selected_preset) is None:
+            self.selected_preset = None
+            self.preset_diff.setText("")
+
+    def show_preset_diff(self, index):
+        self.selected_preset = self.preset_proxy.data(index)
+        preset = self.presets.get(self.selected_preset)
+        if preset is None:
+            return
+        if not self.context.active_config:
+            self.preset_diff.setText("Brak aktywnej konfiguracji do porównania")
+            return
+        changes = diff_config(preset, self.context.active_config)
+        if not changes:
+            self.preset_diff.setText(f"{self.selected_preset}: zgodny z aktywną konfiguracją")
+            return
+        self.preset_diff.setText(f"{self.selected_preset} względem aktywnej konfiguracji: " + ", ".join(
+            f"{field} {active:g} → {value:g}" for field, value, active in changes))
+
+    def apply_preset(self, index):
+        name = self.preset_proxy.data(index)
+        preset = self.presets.get(name)
+        if preset is not None:
+            self.fill_fields(preset)
+
+    def fill_fields(self, config):
+        for field in CONFIG_FIELDS:
+            getattr(self, field).setText(str(config.get(field, "")))
 
     def load_preset_file(self, filepath):
         try:
             with open(filepath, "r") as f:
-                config = json.load(f)
-                self.p_x.setText(config.get("p_x", ""))
-                self.i_x.setText(config.get("i_x", ""))
-                self.d_x.setText(config.get("d_x", ""))
-                self.p_y.setText(config.get("p_y", ""))
-                self.i_y.setText(config.get("i_y", ""))
-                self.d_y.setText(config.get("d_y", ""))
-                self.max_speed_x.setText(config.get("max_speed_x", ""))
-                self.max_speed_y.setText(config.get("max_speed_y", ""))
-                self.tolerance_x.setText(config.get("tolerance_x", ""))
-                self.tolerance_y.setText(config.get("tolerance_y", ""))
+                self.fill_fields(json.load(f))
             QMessageBox.information(self, "Preset wczytany", f"Wczytano preset z {filepath}")
         except Exception as e:
             QMessageBox.critical(self, "Błąd", f"Nie udało się wczytać presetu: {e}")
 
-    def clear_layout(self, layout):
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
     def send_config(self):
         try:
             values = [
@@ -129,12 +174,50 @@ class SettingsPanel(QWidget):
                 float(self.max_speed_x.text()), float(self.max_speed_y.text()),
                 float(self.tolerance_x.text()), float(self.tolerance_y.text())
             ]
-            packet = CommandBuilder.build_config_packet(*values)
-            self.client.send(packet)
-            QMessageBox.information(self, "Sukces", "Konfiguracja została wysłana")
+            # Status przed wysłaniem - wynik może przyjść od razu, jeśli kontroler ma już tę konfigurację
+            self.show_config_status("Wysłano konfigurację, oczekiwanie na potwierdzenie...", "orange")
+            if not self.context.send_config(values):
+                self.show_config_status("", "black")
+                QMessageBox.warning(self, "Brak połączenia", "Konfiguracja nie została wysłana - brak połączenia")
         except ValueError:
             QMessageBox.critical(self, "Błąd", "Wprowadź poprawne wartości liczbowe")
 
+    def show_config_status(self, text, color):
+        self.config_status.setText(text)
+        self.config_status.setStyleSheet(f"color: {color};")
+
+    def on_config_applied(self, values, latency):
+        if latency == 0.0:
+            self.show_config_status("Konfiguracja kontrolera już zgodna - nic nie wysłano", "green")
+        else:
+            self.show_config_status(f"Konfiguracja potwierdzona przez kontroler ({latency * 1000:.1f} ms)", "green")
+
+    def on_config_unconfirmed(self, values):
+        self.show_config_status("Konfiguracja wysłana (protokół bez potwierdzeń)", "orange")
+
+    def on_config_failed(self, message):
+        self.show_config_status(message, "red")
+        QMessageBox.warning(self, "Konfiguracja", message)
+
+    def read_config(self):
+        if not self.context.read_config():
+            QMessageBox.warning(self, "Odczyt konfiguracji",
+                                "Odczyt wymaga połączenia w protokole ramkowym (--protocol framed)")
+            return
+        self.show_config_status("Odczyt konfiguracji z kontrolera...", "orange")
+
+    def on_config_read_back(self, live, differences):
+        if not differences:
+            self.show_config_status("Konfiguracja kontrolera: " + ", ".join(
+                f"{field}={value:g}" for field, value in zip(CONFIG_FIELDS, live)), "green")
+            return
+        self.show_config_status("Konfiguracja kontrolera różni się od wysłanej: " + ", ".join(
+            f"{CONFIG_FIELDS[i]}: wysłano {sent:g}, kontroler {actual:g}" for i, sent, actual in differences), "red")
+
+    def on_config_read_failed(self, message):
+        # Bez okna - odczyt idzie też automatycznie po każdym połączeniu
+        self.show_config_status(message, "red")
+
     def save_to_json(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Zapisz konfigurację", "config.json", "JSON Files (*.json)")
         if not file_path:
@@ -149,7 +232,6 @@ class SettingsPanel(QWidget):
             with open(file_path, "w") as f:
                 json.dump(config, f, indent=4)
             QMessageBox.information(self, "Sukces", f"Zapisano konfigurację do {file_path}")
-            self.load_presets()
         except Exception as e:
             QMessageBox.critical(self, "Błąd", f"Nie udało się zapisać: {e}")
 
@@ -0,0 +1,206 @@
+import time
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from processing import CommandBuilder
+from trajectory import horner
+
+MOUNT_ALTAZ = "altaz"
+MOUNT_EQUATORIAL = "equatorial"
+SIDEREAL_DEG_PER_DAY = 360.98564736629
+J2000_UNIX = 946728000.0
+GRID_STEP = 1.0
+MIN_SEGMENT_POINTS = 6
+POLY_DEGREE = 4
+# Skok azymutu między próbkami uznawany za przejście przez zenit (azymut zmienia się tam o 180°)
+ZENITH_FLIP_STEP = 45.0
+MAX_SEGMENT_DURATION = 4 * 3600.0
+# Dopasowanie ma zapas na śledzenie i zaokrąglenie współczynników do float32 w pakiecie
+FIT_MARGIN = 0.5
+SEND_LEAD = 0.02
+
+
+def local_sidereal_degrees(unix_times, longitude):
+    days = (np.asarray(unix_times, dtype=np.float64) - J2000_UNIX) / 86400.0
+    return np.mod(280.46061837 + SIDEREAL_DEG_PER_DAY * days + longitude, 360.0)
+
+
+def mount_path(ra_hours, dec_deg, latitude, longitude, unix_times, mount=MOUNT_ALTAZ):
+    # Zwraca (N, 2) kątów osi [°]; oś obrotowa rozwinięta, żeby przejście przez 0/360 nie robiło skoku
+    hour_angle = np.radians(local_sidereal_degrees(unix_times, longitude) - ra_hours * 15.0)
+    if mount == MOUNT_EQUATORIAL:
+        ha = np.degrees(np.unwrap(hour_angle))
+        return np.column_stack((ha, np.full_like(ha, dec_deg)))
+    dec = np.radians(dec_deg)
+    lat = np.radians(latitude)
+    sin_alt = np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(hour_angle)
+    alt = np.arcsin(np.clip(sin_alt, -1.0, 1.0))
+    az = np.arctan2(np.sin(hour_angle), np.cos(hour_angle) * np.sin(lat) - np.tan(dec) * np.cos(lat)) + np.pi
+    return np.column_stack(_zenith_flips(np.degrees(np.unwrap(az)), np.degrees(alt)))
+
+
+def _zenith_flips(az, alt):
+    # Przy przejściu (prawie) przez zenit azymut obraca się o 180° między kolejnymi próbkami.
+    # Zamiast tego montaż przechodzi ponad zenitem: dalej ten sam azymut, wysokość 180° - alt.
+    # Próbki w samym zenicie (azymut nieokreślony) dostają azymut sprzed przejścia
+    steps = np.diff(az)
+    big = np.flatnonzero(np.abs(steps) > ZENITH_FLIP_STEP)
+    for run in np.split(big, np.flatnonzero(np.diff(big) > 1) + 1) if len(big) else []:
+        first, last = run[0], run[-1]
+        shift = steps[first:last + 1].sum()
+        if abs(abs(shift) - 180.0) > ZENITH_FLIP_STEP:
+            continue
+        az[first + 1:last + 1] = az[first]
+        az[last + 1:] -= shift
+        alt[last + 1:] = 180.0 - alt[last + 1:]
+    return az, alt
+
+
+class TrackingSegment:
+    def __init__(self, start, duration, coeffs_x, coeffs_y, max_error):
+        self.start = start
+        self.duration = duration
+        self.coeffs_x = coeffs_x
+        self.coeffs_y = coeffs_y
+        self.max_error = max_error
+
+    def end_position(self):
+        # Wielomian w czasie lokalnym - a₀ to początek segmentu, koniec to wartość dla t = duration
+        return float(horner(self.coeffs_x, self.duration)), float(horner(self.coeffs_y, self.duration))
+
+
+def _fit(t, values, i, j):
+    # Czas lokalny segmentu liczony od jego początku; dopasowanie na znormalizowanym czasie
+    # dla uwarunkowania, potem przeskalowanie do sekund i zaokrąglenie jak w pakiecie (float32)
+    # Krótkie segmenty (mniej niż 5 punktów) - niższy stopień, wyższe współczynniki zerowe
+    tau = t[i:j] - t[i]
+    scale = tau[-1] or 1.0
+    degree = min(POLY_DEGREE, j - i - 1)
+    powers = scale ** np.arange(degree, -1, -1)
+    coeffs = np.zeros((POLY_DEGREE + 1, values.shape[1]))
+    coeffs[POLY_DEGREE - degree:] = np.polyfit(tau / scale, values[i:j], degree) / powers[:, None]
+    coeffs = coeffs.astype(np.float32).astype(np.float64)
+    errors = [np.abs(horner(coeffs[:, axis], tau) - values[i:j, axis]).max() for axis in range(values.shape[1])]
+    return coeffs, errors
+
+
+def fit_segments(t, values, tolerance, min_points=MIN_SEGMENT_POINTS, max_duration=MAX_SEGMENT_DURATION):
+    # Zachłannie: dla każdego początku najdłuższy segment mieszczący się w tolerancji
+    # (podwajanie, potem wyszukiwanie binarne długości)
+    limits = np.asarray(tolerance, dtype=np.float64) * FIT_MARGIN
+    n = len(t)
+    if n < 2:
+        raise ValueError("Plan śledzenia wymaga co najmniej dwóch punktów")
+    segments = []
+    i = 0
+    while i < n - 1:
+        max_end = min(n, int(np.searchsorted(t, t[i] + max_duration, side="right")))
+
+        def fits(end):
+            coeffs, errors = _fit(t, values, i, end)
+            return (coeffs, errors) if np.all(np.array(errors) <= limits) else None
+
+        good_end = min(i + min_points, max_end)
+        best = _fit(t, values, i, good_end)
+        if not np.all(np.array(best[1]) <= limits):
+            # Tor zmienia się szybciej, niż da się opisać nawet najkrótszym segmentem (np. tuż obok zenitu)
+            raise ValueError(f"Tor nie mieści się w tolerancji w {t[i]:.0f} s planu "
+                             f"(błąd {max(best[1]):.4f}°, dopuszczalny {limits.min():.4f}°)")
+        bad_end = None
+        step = good_end - i
+        while good_end < max_end:
+            candidate = min(i + 2 * step, max_end)
+            result = fits(candidate)
+            if result is None:
+                bad_end = candidate
+                break
+            good_end, best, step = candidate, result, candidate - i
+        if bad_end is not None:
+            while bad_end - good_end > 1:
+                middle = (good_end + bad_end) // 2
+                result = fits(middle)
+                if result is None:
+                    bad_end = middle
+                else:
+                    good_end, best = middle, result
+        coeffs, errors = best
+        segments.append(TrackingSegment(float(t[i]), float(t[good_end - 1] - t[i]),
+                                        coeffs[:, 0].tolist(), coeffs[:, 1].tolist(), tuple(errors)))
+        # Kolejny segment zaczyna się w ostatnim punkcie poprzedniego - tor jest ciągły
+        i = good_end - 1
+    return segments
+
+
+def plan_tracking(ra_hours, dec_deg, latitude, longitude, start_unix, duration, tolerance,
+                  mount=MOUNT_ALTAZ, step=GRID_STEP):
+    t = np.arange(0.0, duration + step, step)
+    path = mount_path(ra_hours, dec_deg, latitude, longitude, start_unix + t, mount)
+    return t, path, fit_segments(t, path, tolerance)
+
+
+def segment_profile(t, path):
+    return {"t": t, "x": path[:, 0], "y": path[:, 1],
+            "vx": np.gradient(path[:, 0], t), "vy": np.gradient(path[:, 1], t)}
+
+
+class TrackingStreamer(QObject):
+    segment_sent = pyqtSignal(int)
+    finished = pyqtSignal()
+
+    # Każdy segment wysyłany tuż przed swoim początkiem (SEND_LEAD na opóźnienie łącza),
+    # bo kontroler zaczyna wykonywać trajektorię w chwili odbioru
+    def __init__(self, client, lead=SEND_LEAD, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.lead = lead
+        self.segments = []
+        self.start_time = None
+        self.next_index = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._send_due)
+        # Osobny timer końca planu, żeby stop() mógł go anulować przed startem kolejnego planu
+        self.finish_timer = QTimer(self)
+        self.finish_timer.setSingleShot(True)
+        self.finish_timer.timeout.connect(self._finish)
+
+    def active(self):
+        return self.start_time is not None
+
+    def start(self, segments, start_time):
+        self.segments = segments
+        self.start_time = start_time
+        self.next_index = 0
+        self.finish_timer.stop()
+        self._schedule()
+
+    def stop(self):
+        self.timer.stop()
+        self.finish_timer.stop()
+        self.start_time = None
+
+    def _schedule(self):
+        if self.next_index >= len(self.segments):
+            last = self.segments[-1] if self.segments else None
+            end = self.start_time + (last.start + last.duration if last else 0.0)
+            self.finish_timer.start(max(0, int((end - time.time()) * 1000)))
+            return
+        due = self.start_time + self.segments[self.next_index].start - self.lead
+        self.timer.start(max(0, int((due - time.time()) * 1000)))
+
+    def _send_due(self):
+        if self.start_time is None:
+            return
+        index = self.next_index
+        segment = self.segments[index]
+        if not self.client.send(CommandBuilder.build_trajectory_command(segment.coeffs_x, segment.coeffs_y)):
+            print(f"Segment {index + 1}/{len(self.segments)} nie został wysłany - {self.client.send_error()}")
+        else:
+            self.segment_sent.emit(index)
+        self.next_index += 1
+        self._schedule()
+
+    def _finish(self):
+        if self.start_time is None or self.next_index < len(self.segments):
+            return
+        self.start_time = None
+        self.finished.emit()
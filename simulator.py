@@ -0,0 +1,372 @@
+import sys
+import time
+import socket
+import argparse
+import threading
+import numpy as np
+from processing import DEFAULT_PORT
+from protocol import (
+    CMD_STOP, CMD_GOTO, CMD_MANUAL, CMD_ANALOG, CMD_TRAJECTORY, CMD_CONFIG, LEGACY_COMMANDS,
+    PROTOCOL_LEGACY, PROTOCOL_FRAMED, TELEMETRY_RECORD, FramedDecoder, FramedEncoder,
+    MSG_CONFIG_SET, MSG_CONFIG_ACK, MSG_CONFIG_READ, MSG_CONFIG_STATE, CONFIG_MESSAGES,
+    CONFIG_STATUS_OK, CONFIG_STATUS_REJECTED, apply_config_set,
+)
+from calibration import COUNTS_PER_DEGREE
+
+PHYSICS_DT = 0.001
+CHUNK_STEPS = 10
+MOTOR_TAU = 0.05
+TRAJECTORY_DURATION = 1.0
+SENSOR_NOISE = 0.0
+# Nieliniowość enkodera (do sprawdzania kalibracji): błąd A*sin(2*pi*pozycja/okres)
+ENCODER_ERROR_PERIOD = 10.0
+AUTOPILOT_RANGE = 5.0
+DEFAULT_CONFIG = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0, 2.0, 2.0, 0.01, 0.01)
+# Kody kierunków z ControlPanel.direction_map: UP, DOWN, LEFT, RIGHT
+MANUAL_DIRECTIONS = {0: (0.0, 1.0), 1: (0.0, -1.0), 2: (-1.0, 0.0), 3: (1.0, 0.0)}
+
+
+class AxisModel:
+    def __init__(self):
+        self.position = 0.0
+        self.velocity = 0.0
+        self.integral = 0.0
+        self.previous_error = 0.0
+        self.target = None
+        self.velocity_command = 0.0
+        self.configure(1.0, 0.0, 0.0, 2.0, 0.01)
+
+    def configure(self, kp, ki, kd, max_speed, tolerance):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.max_speed = max_speed
+        self.tolerance = tolerance
+
+    def goto(self, target):
+        if self.target is None:
+            self.integral = 0.0
+            self.previous_error = target - self.position
+        self.target = target
+
+    def move(self, velocity_command):
+        self.target = None
+        self.velocity_command = velocity_command
+
+    def stop(self):
+        self.target = None
+        self.velocity_command = 0.0
+
+    def step(self, dt):
+        if self.target is not None:
+            error = self.target - self.position
+            self.integral += error * dt
+            derivative = (error - self.previous_error) / dt
+            self.previous_error = error
+            if abs(error) <= self.tolerance:
+                command = 0.0
+            else:
+                command = self.kp * error + self.ki * self.integral + self.kd * derivative
+        else:
+            command = self.velocity_command * self.max_speed
+        command = min(max(command, -self.max_speed), self.max_speed)
+        # Silnik z bezwładnością nie osiąga zadanej prędkości natychmiast
+        self.velocity += (command - self.velocity) * min(1.0, dt / MOTOR_TAU)
+        self.position += self.velocity * dt
+
+
+class GoniometerModel:
+    def __init__(self, config=DEFAULT_CONFIG):
+        self.x = AxisModel()
+        self.y = AxisModel()
+        self.time = 0.0
+        self.trajectory = None
+        self.configure(*config)
+
+    def configure(self, px, ix, dx, py, iy, dy, max_x, max_y, tol_x, tol_y):
+        # Kontroler przechowuje konfigurację jako float32 - odczyt zwrotny ma te same zaokrąglenia
+        self.config = [float(np.float32(value)) for value in (px, ix, dx, py, iy, dy, max_x, max_y, tol_x, tol_y)]
+        self.x.configure(px, ix, dx, max_x, tol_x)
+        self.y.configure(py, iy, dy, max_y, tol_y)
+
+    def apply(self, command, values):
+        if command != CMD_CONFIG:
+            self.trajectory = None
+        if command == CMD_STOP:
+            self.x.stop()
+            self.y.stop()
+        elif command == CMD_GOTO:
+            self.x.goto(values[0])
+            self.y.goto(values[1])
+        elif command == CMD_MANUAL:
+            dx, dy = MANUAL_DIRECTIONS.get(values[0], (0.0, 0.0))
+            self.x.move(dx)
+            self.y.move(dy)
+        elif command == CMD_ANALOG:
+            self.x.move(values[0])
+            self.y.move(values[1])
+        elif command == CMD_TRAJECTORY:
+            self.trajectory = (values[:5], values[5:], self.time)
+        elif command == CMD_CONFIG:
+            self.configure(*values)
+
+    def set_config(self, mask, changed):
+        config = apply_config_set(self.config, mask, changed)
+        if not all(np.isfinite(value) and value >= 0 for value in config):
+            return CONFIG_STATUS_REJECTED
+        self.configure(*config)
+        return CONFIG_STATUS_OK
+
+    def step(self, dt):
+        if self.trajectory is not None:
+            coeffs_x, coeffs_y, start = self.trajectory
+            t = min(self.time - start, TRAJECTORY_DURATION)
+            self.x.goto(float(np.polyval(coeffs_x, t)))
+            self.y.goto(float(np.polyval(coeffs_y, t)))
+            if t >= TRAJECTORY_DURATION:
+                self.trajectory = None
+        self.x.step(dt)
+        self.y.step(dt)
+        self.time += dt
+
+
+class CommandParser:
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data):
+        self.buffer += data
+        commands = []
+        while self.buffer:
+            command = self.buffer[0]
+            if command not in LEGACY_COMMANDS:
+                self.buffer = self.buffer[1:]
+                continue
+            codec = LEGACY_COMMANDS[command]
+            if len(self.buffer) < codec.size:
+                break
+            commands.append((command, codec.unpack_from(self.buffer)[1:]))
+            self.buffer = self.buffer[codec.size:]
+        return commands
+
+
+class FramedCommandParser:
+    def __init__(self):
+        self.decoder = FramedDecoder()
+
+    def feed(self, data):
+        commands = []
+        data = memoryview(data)
+        while data:
+            free = len(self.decoder.buffer) - self.decoder.pending
+            chunk = data[:free]
+            self.decoder.view[self.decoder.pending:self.decoder.pending + len(chunk)] = chunk
+            self.decoder.pending += len(chunk)
+            data = data[len(chunk):]
+            self.decoder.decode()
+            commands.extend(self.decoder.commands)
+        return commands
+
+
+class SimulatorServer:
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, rate_hz=1000, realtime=True, speed=1.0,
+                 start_on_command=False, noise=SENSOR_NOISE, counts_per_degree=COUNTS_PER_DEGREE,
+                 config=DEFAULT_CONFIG, autopilot_interval=None, protocol=PROTOCOL_LEGACY,
+                 config_delay=0.0, ack_loss=0.0, encoder_error=0.0):
+        self.host = host
+        self.requested_port = port
+        self.rate_hz = rate_hz
+        self.realtime = realtime
+        self.speed = speed
+        self.start_on_command = start_on_command
+        self.noise = noise
+        self.encoder_error = encoder_error
+        self.counts_per_degree = counts_per_degree
+        self.config = config
+        self.autopilot_interval = autopilot_interval
+        self.protocol = protocol
+        # Czas zapisu konfiguracji w kontrolerze i odsetek zgubionych potwierdzeń (test ponowień)
+        self.config_delay = config_delay
+        self.ack_loss = ack_loss
+        self.running = False
+        self.server = None
+        self.thread = None
+        self.commands_received = 0
+        # Luki w numerach sekwencji ramek komend (tylko protokół ramkowy) - zgubione lub przestawione ramki
+        self.command_seq_gaps = 0
+        self.frames_sent = 0
+
+    @property
+    def port(self):
+        return self.server.getsockname()[1]
+
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.requested_port))
+        self.server.listen()
+        self.server.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        if self.server is not None:
+            self.server.close()
+
+    def serve(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except (socket.timeout, OSError):
+                continue
+            try:
+                self.handle(conn)
+            except OSError:
+                pass
+            finally:
+                conn.close()
+
+    def encode(self, times, positions, setpoints, encoder=None):
+        if self.encoder_error:
+            positions = positions + self.encoder_error * np.sin(2 * np.pi * positions / ENCODER_ERROR_PERIOD)
+        if self.noise:
+            positions = positions + np.random.normal(0.0, self.noise, positions.shape)
+        counts = (np.round(positions * self.counts_per_degree).astype(np.int64) & 0xFFFFFFFF).astype('<u4')
+        if encoder is None:
+            return counts.tobytes()
+        records = np.empty(len(counts), dtype=TELEMETRY_RECORD)
+        records['t_us'] = np.round(times * 1e6)
+        records['x'] = counts[:, 0]
+        records['y'] = counts[:, 1]
+        records['x_setpoint'] = setpoints[:, 0]
+        records['y_setpoint'] = setpoints[:, 1]
+        return encoder.encode_telemetry(records)
+
+    def config_reply(self, model, command, values, encoder, rng):
+        if command == MSG_CONFIG_SET:
+            token, mask = values[:2]
+            status = model.set_config(mask, values[2:])
+            if rng.random() < self.ack_loss:
+                return None
+            return encoder.encode(MSG_CONFIG_ACK, CONFIG_MESSAGES[MSG_CONFIG_ACK].pack(token, mask, status))
+        if command == MSG_CONFIG_READ:
+            return encoder.encode(MSG_CONFIG_STATE, CONFIG_MESSAGES[MSG_CONFIG_STATE].pack(values[0], *model.config))
+        return None
+
+    def handle(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        model = GoniometerModel(self.config)
+        framed = self.protocol == PROTOCOL_FRAMED
+        parser = FramedCommandParser() if framed else CommandParser()
+        encoder = FramedEncoder() if framed else None
+        started = not self.start_on_command
+        wall_start = time.monotonic()
+        sample_period = 1.0 / self.rate_hz
+        next_sample = 0.0
+        previous = np.array([model.x.position, model.y.position])
+        rng = np.random.default_rng()
+        next_autopilot = 0.0
+        replies = []
+        seq_gaps = 0
+        while self.running:
+            conn.setblocking(False)
+            try:
+                data = conn.recv(65536)
+                if not data:
+                    return
+            except BlockingIOError:
+                data = b""
+            commands = parser.feed(data)
+            if framed and parser.decoder.dropped != seq_gaps:
+                self.command_seq_gaps += parser.decoder.dropped - seq_gaps
+                seq_gaps = parser.decoder.dropped
+            for command, values in commands:
+                self.commands_received += 1
+                if command in CONFIG_MESSAGES or command == MSG_CONFIG_SET:
+                    reply = self.config_reply(model, command, values, encoder, rng)
+                    if reply is not None:
+                        replies.append((time.monotonic() + self.config_delay, reply))
+                    continue
+                model.apply(command, values)
+                started = True
+            while replies and replies[0][0] <= time.monotonic():
+                conn.setblocking(True)
+                conn.sendall(replies.pop(0)[1])
+                conn.setblocking(False)
+            if not started:
+                time.sleep(0.001)
+                wall_start = time.monotonic()
+                continue
+
+            steps = CHUNK_STEPS
+            if self.realtime:
+                behind = (time.monotonic() - wall_start) * self.speed - model.time
+                steps = min(int(behind / PHYSICS_DT), 10 * CHUNK_STEPS)
+                if steps <= 0:
+                    time.sleep(PHYSICS_DT / self.speed)
+                    continue
+
+            if self.autopilot_interval and model.time >= next_autopilot:
+                # Bez komend z GUI symulator sam wykonuje losowe ruchy GOTO
+                model.apply(CMD_GOTO, tuple(rng.uniform(-AUTOPILOT_RANGE, AUTOPILOT_RANGE, 2)))
+                next_autopilot = model.time + self.autopilot_interval
+
+            chunks = []
+            times = []
+            setpoints = []
+            for _ in range(steps):
+                t0 = model.time
+                model.step(PHYSICS_DT)
+                current = np.array([model.x.position, model.y.position])
+                # Próbki wyjściowe z częstotliwością rate_hz interpolowane między krokami fizyki
+                sample_times = np.arange(next_sample, model.time, sample_period)
+                if len(sample_times):
+                    fraction = ((sample_times - t0) / PHYSICS_DT)[:, None]
+                    chunks.append(previous + (current - previous) * fraction)
+                    times.append(sample_times)
+                    target = [np.nan if axis.target is None else axis.target for axis in (model.x, model.y)]
+                    setpoints.append(np.tile(target, (len(sample_times), 1)))
+                    next_sample = sample_times[-1] + sample_period
+                previous = current
+            if chunks:
+                positions = np.concatenate(chunks)
+                payload = self.encode(np.concatenate(times), positions, np.concatenate(setpoints), encoder)
+                conn.setblocking(True)
+                conn.sendall(payload)
+                self.frames_sent += len(positions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symulator kontrolera goniometru (STM32)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=1000, help="częstotliwość ramek telemetrii [Hz]")
+    parser.add_argument("--noise", type=float, default=SENSOR_NOISE, help="szum enkodera [°]")
+    parser.add_argument("--encoder-error", type=float, default=0.0,
+                        help=f"amplituda nieliniowości enkodera [°], okres {ENCODER_ERROR_PERIOD:g}°")
+    parser.add_argument("--autopilot", type=float, default=None, help="co ile sekund losowy ruch GOTO")
+    parser.add_argument("--protocol", choices=[PROTOCOL_LEGACY, PROTOCOL_FRAMED], default=PROTOCOL_LEGACY)
+    parser.add_argument("--config-delay", type=float, default=0.0, help="opóźnienie potwierdzenia konfiguracji [s]")
+    parser.add_argument("--ack-loss", type=float, default=0.0, help="odsetek gubionych potwierdzeń (0-1)")
+    args = parser.parse_args()
+
+    server = SimulatorServer(args.host, args.port, rate_hz=args.rate, noise=args.noise,
+                             autopilot_interval=args.autopilot, protocol=args.protocol,
+                             config_delay=args.config_delay, ack_loss=args.ack_loss,
+                             encoder_error=args.encoder_error)
+    server.start()
+    print(f"Symulator nasłuchuje na {args.host}:{server.port}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
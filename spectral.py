@@ -0,0 +1,153 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+WINDOW_SIZE = 1024
+HOP_SIZE = 512
+WELCH_AVERAGES = 8
+SPECTROGRAM_ROWS = 200
+MIN_FREQUENCY = 5.0
+# Próg wartości skutecznej drgań w paśmie powyżej MIN_FREQUENCY, w stopniach (5 impulsów enkodera)
+DEFAULT_THRESHOLD = 0.005
+
+
+class SpectrumSnapshot:
+    def __init__(self, version, freqs, psd, spectrogram, band_rms, peak_freqs):
+        self.version = version
+        self.freqs = freqs
+        self.psd = psd
+        self.spectrogram = spectrogram
+        self.band_rms = band_rms
+        self.peak_freqs = peak_freqs
+
+
+class SpectralMonitor:
+    # Welch przyrostowo: nowe próbki trafiają do bufora, każde pełne okno (co HOP_SIZE próbek)
+    # jest liczone raz, a średnia PSD to suma ostatnich WELCH_AVERAGES widm w pierścieniu.
+    # Okno, trend liniowy i skalowanie są wyliczone raz przy tworzeniu.
+    def __init__(self, window=WINDOW_SIZE, hop=HOP_SIZE, averages=WELCH_AVERAGES, rows=SPECTROGRAM_ROWS,
+                 min_frequency=MIN_FREQUENCY, threshold=DEFAULT_THRESHOLD, channels=2):
+        if not 0 < hop <= window:
+            raise ValueError("Krok okna musi być w zakresie (0, window]")
+        self.window = window
+        self.hop = hop
+        self.channels = channels
+        self.min_frequency = min_frequency
+        self.threshold = threshold
+        self.taper = np.hanning(window)
+        self.taper_power = float(np.sum(self.taper ** 2))
+        self.ramp = np.arange(window) - (window - 1) / 2.0
+        self.ramp_norm = float(np.sum(self.ramp ** 2))
+        self.base_freqs = np.fft.rfftfreq(window, 1.0)
+        bins = len(self.base_freqs)
+        self.one_sided = np.full(bins, 2.0)
+        self.one_sided[0] = 1.0
+        if window % 2 == 0:
+            self.one_sided[-1] = 1.0
+
+        self.data = np.empty((1 + channels, 4 * window))
+        self.filled = 0
+        self.history = np.zeros((averages, channels, bins))
+        self.history_sum = np.zeros((channels, bins))
+        self.history_index = 0
+        self.history_count = 0
+        self.spectrogram = np.zeros((rows, channels, bins), dtype=np.float32)
+        self.spectrogram_index = 0
+        self.sample_rate = None
+        self.alarm = [False] * channels
+        self.version = 0
+
+    def clear(self):
+        self.filled = 0
+        self.history[:] = 0.0
+        self.history_sum[:] = 0.0
+        self.history_count = 0
+        self.spectrogram[:] = 0.0
+        self.sample_rate = None
+        self.alarm = [False] * self.channels
+        self.version += 1
+
+    def update(self, t, *values):
+        n = len(t)
+        if not n:
+            return []
+        if self.filled + n > self.data.shape[1]:
+            grown = np.empty((self.data.shape[0], 2 * (self.filled + n)))
+            grown[:, :self.filled] = self.data[:, :self.filled]
+            self.data = grown
+        end = self.filled + n
+        self.data[0, self.filled:end] = t
+        for channel, channel_values in enumerate(values, start=1):
+            self.data[channel, self.filled:end] = channel_values
+        self.filled = end
+        if self.filled < self.window:
+            return []
+
+        segments = (self.filled - self.window) // self.hop + 1
+        consumed = segments * self.hop
+        last = (segments - 1) * self.hop + self.window - 1
+        # Przy partiach ze wspólnym znacznikiem czasu częstotliwość liczona z rozpiętości wielu partii
+        span = self.data[0, last] - self.data[0, 0]
+        if span > 0:
+            rate = last / span
+            self.sample_rate = rate if self.sample_rate is None else 0.8 * self.sample_rate + 0.2 * rate
+        if self.sample_rate is not None:
+            frames = sliding_window_view(self.data[1:, :self.filled], self.window, axis=1)[:, :consumed:self.hop]
+            self._add_spectra(frames)
+        rest = self.filled - consumed
+        self.data[:, :rest] = self.data[:, consumed:self.filled]
+        self.filled = rest
+        return self._check_alarms() if self.sample_rate is not None else []
+
+    def _add_spectra(self, frames):
+        # frames: (kanały, segmenty, okno); trend liniowy usuwany, żeby skoki zadanej nie zalewały widma
+        mean = frames.mean(axis=2, keepdims=True)
+        slope = (frames @ self.ramp)[..., None] / self.ramp_norm
+        tapered = (frames - mean - slope * self.ramp) * self.taper
+        psd = np.abs(np.fft.rfft(tapered, axis=2)) ** 2
+        psd *= self.one_sided / (self.sample_rate * self.taper_power)
+        for segment in range(psd.shape[1]):
+            spectrum = psd[:, segment, :]
+            self.history_sum += spectrum - self.history[self.history_index]
+            self.history[self.history_index] = spectrum
+            self.history_index = (self.history_index + 1) % len(self.history)
+            self.history_count = min(self.history_count + 1, len(self.history))
+            self.spectrogram[self.spectrogram_index] = spectrum
+            self.spectrogram_index = (self.spectrogram_index + 1) % len(self.spectrogram)
+        self.version += 1
+
+    def freqs(self):
+        return self.base_freqs * (self.sample_rate or 0.0)
+
+    def psd(self):
+        return self.history_sum / max(self.history_count, 1)
+
+    def band(self):
+        freqs = self.freqs()
+        band = freqs >= self.min_frequency
+        psd = self.psd()[:, band]
+        if not psd.shape[1]:
+            return np.zeros(self.channels), np.full(self.channels, np.nan)
+        df = self.sample_rate / self.window
+        rms = np.sqrt(np.maximum(psd.sum(axis=1) * df, 0.0))
+        peaks = freqs[band][np.argmax(psd, axis=1)]
+        return rms, peaks
+
+    def _check_alarms(self):
+        # Zwraca tylko nowe przekroczenia progu (z histerezą 20%), nie każde okno ponad progiem
+        rms, peaks = self.band()
+        raised = []
+        for channel in range(self.channels):
+            if not self.alarm[channel] and rms[channel] > self.threshold:
+                self.alarm[channel] = True
+                raised.append((channel, float(peaks[channel]), float(rms[channel])))
+            elif self.alarm[channel] and rms[channel] < 0.8 * self.threshold:
+                self.alarm[channel] = False
+        return raised
+
+    def snapshot(self):
+        if self.sample_rate is None:
+            return None
+        rms, peaks = self.band()
+        # Spektrogram od najstarszego wiersza
+        spectrogram = np.roll(self.spectrogram, -self.spectrogram_index, axis=0)
+        return SpectrumSnapshot(self.version, self.freqs(), self.psd(), spectrogram, rms, peaks)
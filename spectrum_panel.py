@@ -0,0 +1,84 @@
+import numpy as np
+import pyqtgraph as pg
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox
+from PyQt6.QtCore import QTimer
+
+SPECTRUM_REFRESH_MS = 250
+AXIS_NAMES = ["X", "Y"]
+
+
+class SpectrumPanel(QWidget):
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+        self.worker = context.worker
+        self.shown_version = -1
+
+        layout = QVBoxLayout()
+        self.spectrum_plot = pg.PlotWidget(title="Widmo mocy (Welch)")
+        self.spectrum_plot.setLogMode(y=True)
+        self.spectrum_plot.setLabel('bottom', "Częstotliwość [Hz]")
+        self.spectrum_plot.addLegend()
+        self.curve_x = self.spectrum_plot.plot(pen='b', name="X")
+        self.curve_y = self.spectrum_plot.plot(pen='g', name="Y")
+        layout.addWidget(self.spectrum_plot, stretch=2)
+
+        self.spectrogram_plot = pg.PlotWidget(title="Spektrogram")
+        self.spectrogram_plot.setLabel('left', "Częstotliwość [Hz]")
+        self.spectrogram = pg.ImageItem()
+        self.spectrogram.setColorMap(pg.colormap.get("viridis"))
+        self.spectrogram_plot.addItem(self.spectrogram)
+        layout.addWidget(self.spectrogram_plot, stretch=2)
+
+        options = QHBoxLayout()
+        self.axis_select = QComboBox()
+        self.axis_select.addItems([f"Oś {name}" for name in AXIS_NAMES])
+        self.axis_select.currentIndexChanged.connect(self.force_refresh)
+        options.addWidget(QLabel("Spektrogram:"))
+        options.addWidget(self.axis_select)
+        options.addWidget(QLabel("Próg RMS drgań:"))
+        self.threshold_input = QLineEdit(str(self.worker.spectrum.threshold))
+        self.threshold_input.editingFinished.connect(self.set_threshold)
+        options.addWidget(self.threshold_input)
+        options.addStretch()
+        layout.addLayout(options)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(SPECTRUM_REFRESH_MS)
+
+    def set_threshold(self):
+        try:
+            self.worker.spectrum.threshold = float(self.threshold_input.text())
+        except ValueError:
+            self.threshold_input.setText(str(self.worker.spectrum.threshold))
+
+    def force_refresh(self):
+        self.shown_version = -1
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        snapshot = self.worker.snapshot
+        spectrum = snapshot.spectrum if snapshot is not None else None
+        if spectrum is None or spectrum.version == self.shown_version:
+            return
+        self.shown_version = spectrum.version
+        # Pomijamy składową stałą - na skali logarytmicznej tylko przeszkadza
+        self.curve_x.setData(spectrum.freqs[1:], spectrum.psd[0, 1:])
+        self.curve_y.setData(spectrum.freqs[1:], spectrum.psd[1, 1:])
+
+        axis = self.axis_select.currentIndex()
+        image = np.log10(spectrum.spectrogram[:, axis, :] + 1e-12)
+        self.spectrogram.setImage(image, autoLevels=True)
+        self.spectrogram.setRect(0, 0, len(image), spectrum.freqs[-1])
+
+        threshold = self.worker.spectrum.threshold
+        self.status_label.setText("   ".join(
+            f"{name}: RMS {rms:.3g} przy {peak:.1f} Hz" + (" ⚠ powyżej progu" if rms > threshold else "")
+            for name, rms, peak in zip(AXIS_NAMES, spectrum.band_rms, spectrum.peak_freqs)))
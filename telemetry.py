@@ -0,0 +1,136 @@
+import os
+import numpy as np
+
+SAMPLE_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('x', '<f8'),
+    ('y', '<f8'),
+    ('x_setpoint', '<f8'),
+    ('y_setpoint', '<f8'),
+])
+
+DEFAULT_CAPACITY = 500_000
+
+
+class TelemetryBuffer:
+    # Każda próbka jest zapisywana dwa razy (pod i oraz i + capacity), dzięki czemu
+    # dowolne okno ostatnich N próbek jest ciągłym wycinkiem tablicy - bez kopiowania.
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill_path=None):
+        if capacity <= 0:
+            raise ValueError("Pojemność bufora musi być dodatnia")
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=SAMPLE_DTYPE)
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.version = 0
+        self.x_setpoint = np.nan
+        self.y_setpoint = np.nan
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.spilled = 0
+
+    def __len__(self):
+        return self.count
+
+    def set_setpoint(self, x, y):
+        self.x_setpoint = x
+        self.y_setpoint = y
+
+    def append(self, t, x, y):
+        if self.count == self.capacity and self.spill_path:
+            self._spill(self.last(self.capacity)[:1])
+        row = (t, x, y, self.x_setpoint, self.y_setpoint)
+        self.data[self.head] = row
+        self.data[self.head + self.capacity] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+        self.version += 1
+
+    def extend(self, t, x, y):
+        n = len(x)
+        if not n:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        rows = np.empty(n, dtype=SAMPLE_DTYPE)
+        rows['t'] = t
+        rows['x'] = x
+        rows['y'] = y
+        rows['x_setpoint'] = self.x_setpoint
+        rows['y_setpoint'] = self.y_setpoint
+        self.extend_rows(rows)
+        return rows
+
+    def extend_rows(self, rows):
+        n = len(rows)
+        if not n:
+            return
+        evicted = self.count + n - self.capacity
+        if evicted > 0 and self.spill_path:
+            from_buffer = min(evicted, self.count)
+            self._spill(self.last(self.count)[:from_buffer])
+            if evicted > from_buffer:
+                self._spill(rows[:evicted - from_buffer])
+        if n > self.capacity:
+            rows = rows[-self.capacity:]
+        self._write(rows)
+        self.count = min(self.count + n, self.capacity)
+        self.total += n
+        self.version += 1
+
+    def _write(self, rows):
+        n = len(rows)
+        start = self.head
+        first = min(n, self.capacity - start)
+        for offset in (0, self.capacity):
+            self.data[offset + start:offset + start + first] = rows[:first]
+            self.data[offset:offset + n - first] = rows[first:]
+        self.head = (start + n) % self.capacity
+
+    def last(self, n):
+        n = min(n, self.count)
+        end = self.head + self.capacity
+        return self.data[end - n:end]
+
+    def view(self):
+        return self.last(self.count)
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.version += 1
+        self.x_setpoint = np.nan
+        self.y_setpoint = np.nan
+        self._discard_spill()
+
+    def _discard_spill(self):
+        # Plik jest usuwany, a nie obcinany - trwający eksport może go jeszcze mieć zmapowanego
+        self.close()
+        self.spilled = 0
+        if self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+
+    def _spill(self, rows):
+        if self.spill_file is None:
+            # Nowy plik przy pierwszym przelaniu - bez danych z poprzednich uruchomień
+            self.spill_file = open(self.spill_path, "wb")
+        rows.tofile(self.spill_file)
+        self.spilled += len(rows)
+
+    def read_spill(self):
+        if not self.spill_path or not self.spilled:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        self.spill_file.flush()
+        try:
+            return np.memmap(self.spill_path, dtype=SAMPLE_DTYPE, mode="r", shape=(self.spilled,))
+        except (FileNotFoundError, ValueError):
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
@@ -0,0 +1,38 @@
+import numpy as np
+
+TRAJECTORY_POINTS = 2000
+
+
+def horner(coeffs, t):
+    # Współczynniki od najwyższej potęgi, jak w polu X(t) = a₄·t⁴ + ... + a₀
+    result = np.full_like(t, coeffs[0], dtype=np.float64)
+    for c in coeffs[1:]:
+        result *= t
+        result += c
+    return result
+
+
+def evaluate_trajectory(coeffs_x, coeffs_y, duration, points=TRAJECTORY_POINTS):
+    t = np.linspace(0.0, duration, points)
+    profile = {"t": t}
+    for axis, coeffs in (("x", coeffs_x), ("y", coeffs_y)):
+        coeffs = np.asarray(coeffs, dtype=np.float64)
+        velocity = np.polyder(coeffs)
+        profile[axis] = horner(coeffs, t)
+        profile["v" + axis] = horner(velocity, t)
+        profile["a" + axis] = horner(np.polyder(velocity), t)
+    return profile
+
+
+def speed_violations(profile, max_speed_x=None, max_speed_y=None):
+    violations = []
+    for axis, limit in (("x", max_speed_x), ("y", max_speed_y)):
+        if limit is None:
+            continue
+        speed = np.abs(profile["v" + axis])
+        peak = int(np.argmax(speed))
+        if speed[peak] > limit:
+            violations.append(
+                f"Oś {axis.upper()}: prędkość {speed[peak]:.3f} °/s w t={profile['t'][peak]:.3f} s "
+                f"przekracza limit {limit} °/s")
+    return violations
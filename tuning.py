@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from processing import CommandBuilder, FRAME_SIZE
+from simulator import SimulatorServer
+from calibration import EncoderCalibration
+from analytics import AxisResponse
+from context import CONFIG_FIELDS
+
+STEP_TARGET = (1.0, -0.5)
+TRIAL_DURATION = 5.0
+TRIAL_RATE_HZ = 1000
+UNSETTLED_PENALTY = 2.0
+
+
+def run_trial(params):
+    kp, ki, kd, max_speed, tolerance, duration, rate_hz = params
+    server = SimulatorServer(port=0, rate_hz=rate_hz, realtime=False, start_on_command=True)
+    server.start()
+    try:
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            sock.sendall(
+                CommandBuilder.build_config_packet(kp, ki, kd, kp, ki, kd, max_speed, max_speed, tolerance, tolerance)
+                + CommandBuilder.build_goto_command(*STEP_TARGET))
+            samples = int(duration * rate_hz)
+            data = bytearray(samples * FRAME_SIZE)
+            view = memoryview(data)
+            received = 0
+            while received < len(data):
+                n = sock.recv_into(view[received:])
+                if not n:
+                    break
+                received += n
+    finally:
+        server.stop()
+
+    frames = np.frombuffer(data, dtype='<u4', count=received // 4).reshape(-1, 2)
+    degrees = EncoderCalibration().to_degrees(frames)
+    t = np.arange(len(degrees)) / rate_hz
+    summaries = []
+    score = 0.0
+    for i, (name, target) in enumerate(zip(("X", "Y"), STEP_TARGET)):
+        response = AxisResponse(name, 0.0, 0.0, target, tolerance)
+        response.update(t, degrees[:, i])
+        summary = response.summary()
+        summaries.append(summary)
+        settle = summary["czas ustalania (s)"]
+        score += summary["blad RMS"] / abs(target)
+        score += settle if settle is not None else UNSETTLED_PENALTY * duration
+        score += (summary["przeregulowanie (%)"] or 0.0) / 100.0
+    return (kp, ki, kd), score, summaries
+
+
+def sweep(p_values, i_values, d_values, max_speed, tolerance, duration=TRIAL_DURATION,
+          rate_hz=TRIAL_RATE_HZ, workers=None):
+    params = [(p, i, d, max_speed, tolerance, duration, rate_hz)
+              for p, i, d in itertools.product(p_values, i_values, d_values)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_trial, params))
+    return sorted(results, key=lambda result: result[1])
+
+
+def write_presets(results, max_speed, tolerance, count, directory="presets"):
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    paths = []
+    for rank, ((kp, ki, kd), score, _) in enumerate(results[:count], start=1):
+        values = [kp, ki, kd, kp, ki, kd, max_speed, max_speed, tolerance, tolerance]
+        config = {field: str(value) for field, value in zip(CONFIG_FIELDS, values)}
+        path = os.path.join(directory, f"tuned_{stamp}_{rank}.json")
+        with open(path, "w") as f:
+            json.dump(config, f, indent=4)
+        paths.append(path)
+    return paths
+
+
+def parse_values(text):
+    return [float(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Przegląd nastaw PID na symulatorze goniometru")
+    parser.add_argument("--p", type=parse_values, default=[0.5, 1, 2, 4, 8])
+    parser.add_argument("--i", type=parse_values, default=[0, 0.1, 0.5])
+    parser.add_argument("--d", type=parse_values, default=[0, 0.05, 0.2])
+    parser.add_argument("--max-speed", type=float, default=2.0)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    parser.add_argument("--duration", type=float, default=TRIAL_DURATION)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--no-write", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = sweep(args.p, args.i, args.d, args.max_speed, args.tolerance, args.duration, workers=args.workers)
+    print(f"{len(results)} prób w {time.perf_counter() - started:.1f} s")
+    for (kp, ki, kd), score, summaries in results[:args.top]:
+        settle = [s["czas ustalania (s)"] for s in summaries]
+        overshoot = [s["przeregulowanie (%)"] for s in summaries]
+        print(f"P={kp} I={ki} D={kd}: wynik {score:.3f}, ustalanie {settle}, przeregulowanie {overshoot}")
+    if not args.no_write:
+        for path in write_presets(results, args.max_speed, args.tolerance, args.top):
+            print(f"Zapisano {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import csv
+import json
+import time
+import threading
+import numpy as np
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from processing import CommandBuilder
+
+SETTLE_SAMPLES = 5
+
+
+def load_waypoints(path):
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            points = json.load(f)
+        rows = [(p["x"], p["y"]) if isinstance(p, dict) else (p[0], p[1]) for p in points]
+    else:
+        with open(path, "r", newline="") as f:
+            rows = [(row[0], row[1]) for row in csv.reader(f) if row and not row[0].startswith("#")]
+    try:
+        return np.array(rows, dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        # Plik CSV z nagłówkiem
+        return np.array(rows[1:], dtype=np.float64).reshape(-1, 2)
+
+
+class WaypointQueue(QObject):
+    waypoint_dispatched = pyqtSignal(int, float, float)
+    waypoint_reached = pyqtSignal(int, float)
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal()
+
+    # Postęp sprawdzany jest bezpośrednio w wątku transportu (DirectConnection),
+    # więc kolejny GOTO wychodzi bez czekania na pętlę zdarzeń GUI
+    def __init__(self, client, tolerance, settle_samples=SETTLE_SAMPLES, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.tolerance = tolerance
+        self.settle_samples = settle_samples
+        self.lock = threading.Lock()
+        self.points = np.empty((0, 2))
+        self.packets = []
+        self.index = -1
+        self.run_length = 0
+        self.dispatched_at = 0.0
+        self.log = []
+        client.batch_received.connect(self.on_batch, Qt.ConnectionType.DirectConnection)
+
+    def load(self, points):
+        with self.lock:
+            self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+            self.packets = [CommandBuilder.build_goto_command(x, y) for x, y in self.points.tolist()]
+            self.index = -1
+            self.log = []
+
+    def active(self):
+        return 0 <= self.index < len(self.packets)
+
+    def start(self):
+        with self.lock:
+            self.log = []
+            self.tol = np.asarray(self.tolerance(), dtype=np.float64)
+            self._dispatch(0)
+
+    def stop(self):
+        with self.lock:
+            self.index = -1
+
+    def _dispatch(self, index):
+        self.index = index
+        self.run_length = 0
+        if index >= len(self.packets):
+            self.index = -1
+            self.finished.emit()
+            return
+        self.dispatched_at = time.time()
+        if not self.client.send(self.packets[index]):
+            self.index = -1
+            self.failed.emit(index, self.client.send_error())
+            return
+        x, y = self.points[index].tolist()
+        self.waypoint_dispatched.emit(index, x, y)
+
+    def on_batch(self, timestamps, frames):
+        with self.lock:
+            timestamps = np.broadcast_to(timestamps, len(frames))
+            while self.active() and len(frames):
+                ok = np.all(np.abs(frames - self.points[self.index]) <= self.tol, axis=1)
+                positions = np.arange(len(ok))
+                last_bad = np.maximum.accumulate(np.where(ok, -1, positions))
+                runs = positions - last_bad + np.where(last_bad < 0, self.run_length, 0)
+                hits = np.flatnonzero(runs >= self.settle_samples)
+                if not len(hits):
+                    self.run_length = int(runs[-1])
+                    return
+                hit = hits[0]
+                settle = float(timestamps[hit] - self.dispatched_at)
+                x, y = self.points[self.index].tolist()
+                self.log.append((self.index, x, y, settle))
+                self.waypoint_reached.emit(self.index, settle)
+                self._dispatch(self.index + 1)
+                frames = frames[hit + 1:]
+                timestamps = timestamps[hit + 1:]
+
+    def save_log(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["index", "x", "y", "czas ustalania (s)"])
+            writer.writerows(self.log)
@@ -0,0 +1,120 @@
+import time
+import threading
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from telemetry import TelemetryBuffer, DEFAULT_CAPACITY
+from plotting import MinMaxDecimator
+from analytics import TrackingAnalytics
+from spectral import SpectralMonitor
+
+PLOT_CHANNELS = ['x', 'y', 'x_setpoint', 'y_setpoint']
+SNAPSHOT_INTERVAL_MS = 50
+HISTORY_WINDOW = 30.0
+
+
+class PlotSnapshot:
+    def __init__(self, version, t, values, moves, spectrum=None):
+        self.version = version
+        self.t = t
+        self.values = values
+        self.moves = moves
+        self.spectrum = spectrum
+
+
+class TelemetryWorker(QObject):
+    oscillation_detected = pyqtSignal(int, float, float)
+
+    # Żyje we własnym QThread: dekodowane paczki, bufor, piramida i analiza nie dotykają wątku GUI.
+    # GUI tylko odczytuje gotowy self.snapshot (podmiana referencji jest atomowa).
+    def __init__(self, tolerance, buffer_capacity=DEFAULT_CAPACITY, spill_path=None, history_window=HISTORY_WINDOW):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.buffer = TelemetryBuffer(buffer_capacity, spill_path)
+        self.history = MinMaxDecimator(len(PLOT_CHANNELS))
+        self.analytics = TrackingAnalytics(tolerance)
+        self.spectrum = SpectralMonitor()
+        self.history_window = history_window
+        self.start_time = time.time()
+        self.plot_width = 1000
+        self.processed = 0
+        self.snapshot = None
+        self.timer = None
+
+    @pyqtSlot()
+    def start_timer(self):
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.build_snapshot)
+        self.timer.start(SNAPSHOT_INTERVAL_MS)
+
+    @pyqtSlot()
+    def stop_timer(self):
+        if self.timer is not None:
+            self.timer.stop()
+
+    @pyqtSlot(object, object)
+    def handle_batch(self, timestamps, frames):
+        with self.lock:
+            rows = self.buffer.extend(timestamps, frames[:, 0], frames[:, 1])
+            self.analytics.update(rows)
+            self.history.extend(rows['t'], structured_to_unstructured(rows[PLOT_CHANNELS]))
+            alarms = self.spectrum.update(rows['t'], rows['x'], rows['y'])
+            self.processed += len(frames)
+        for axis, frequency, rms in alarms:
+            self.oscillation_detected.emit(axis, frequency, rms)
+
+    def recent(self, seconds):
+        with self.lock:
+            samples = self.buffer.view()
+            if not len(samples):
+                return samples.copy()
+            first = np.searchsorted(samples['t'], samples['t'][-1] - seconds)
+            return samples[first:].copy()
+
+    def set_setpoint(self, x, y):
+        with self.lock:
+            self.buffer.set_setpoint(x, y)
+
+    def clear(self, start_time=None):
+        with self.lock:
+            self.buffer.clear()
+            self.history.clear()
+            self.analytics.clear()
+            self.spectrum.clear()
+            self.start_time = time.time() if start_time is None else start_time
+            self.snapshot = None
+
+    @pyqtSlot()
+    def build_snapshot(self):
+        with self.lock:
+            version = self.buffer.version
+            if self.snapshot is not None and self.snapshot.version == version:
+                return
+            samples = self.buffer.view()
+            moves = [axis.summary() for axis in self.analytics.current] if self.analytics.current else []
+            spectrum = self.snapshot.spectrum if self.snapshot is not None else None
+            if spectrum is None or spectrum.version != self.spectrum.version:
+                spectrum = self.spectrum.snapshot()
+            if self.history_window is None or not len(samples):
+                t = samples['t'] - self.start_time
+                values = structured_to_unstructured(samples[PLOT_CHANNELS])
+            else:
+                # Ostatnie history_window sekund w pełnej rozdzielczości, starsza historia z piramidy min/max
+                first = np.searchsorted(samples['t'], samples['t'][-1] - self.history_window)
+                recent = samples[first:]
+                old_t, old_values = self.history.query(recent['t'][0], max(self.plot_width, 1))
+                t = np.concatenate((old_t, recent['t'])) - self.start_time
+                values = np.concatenate((old_values, structured_to_unstructured(recent[PLOT_CHANNELS])))
+        self.snapshot = PlotSnapshot(version, t, values, moves, spectrum)
+
+    def export_parts(self):
+        with self.lock:
+            return [self.buffer.read_spill(), self.buffer.view().copy()], self.start_time
+
+    def save_analytics(self, path):
+        with self.lock:
+            self.analytics.save_csv(path)
+
+    def close(self):
+        with self.lock:
+            self.buffer.close()